@@ -0,0 +1,225 @@
+"""
+Compare GET /clients/ served from the async (asyncpg) session against the
+same listing served from the blocking psycopg2 session, under many
+concurrent connections.
+
+Seeds a benchmark tenant of the configured PostgreSQL database (DB_HOST,
+DB_NAME, ...) with generated clients, starts the API with uvicorn plus a
+sync copy of the listing route, and keeps --concurrency connections busy
+against each route for --duration seconds. The tenant is removed again
+afterwards. Run from the app directory:
+
+    python -m benchmarks.clients_throughput --concurrency 500 --output clients.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+from fastapi import Depends, Response
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Docker path
+    from app.models import client
+    from app.models.database import engine, get_db
+    from app.schemas import client as client_schema
+except ImportError:
+    # Local path
+    from models import client
+    from models.database import engine, get_db
+    from schemas import client as client_schema
+
+TENANT_SLUG = "benchmark-clients-throughput"
+ROUTES = {
+    "async": "/clients/",
+    "sync": "/benchmark/clients-sync/",
+}
+
+
+def create_app():
+    """Return the API with a sync copy of the client listing, for uvicorn --factory."""
+    try:
+        from app import main
+    except ImportError:
+        import main
+
+    @main.app.get("/benchmark/clients-sync/", response_model=List[client_schema.Client])
+    def get_clients_sync(
+        response: Response,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        tenant_id: Optional[int] = None,
+        db: Session = Depends(get_db)
+    ):
+        # The listing as it ran before the async session: same queries, blocking driver
+        query = select(client.Client)
+        if tenant_id:
+            query = query.where(client.Client.tenant_id == tenant_id)
+        page = query
+        if after_id is not None:
+            page = page.where(client.Client.id > after_id)
+        limit = main.clamp_page_limit(limit)
+        rows = list(db.scalars(page.order_by(client.Client.id).limit(limit + 1)))
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        total = db.scalar(select(func.count()).select_from(query.subquery()))
+        main.set_page_headers(response, total, True, next_cursor)
+        return rows[:limit]
+
+    return main.app
+
+
+def seed(clients):
+    """Create the benchmark tenant with generated clients and return its id."""
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM tenants WHERE slug = :slug"), {"slug": TENANT_SLUG})
+        tenant_id = connection.execute(text(
+            "INSERT INTO tenants (name, slug, is_active) VALUES ('Benchmark', :slug, true) RETURNING id"
+        ), {"slug": TENANT_SLUG}).scalar()
+        connection.execute(text(
+            "INSERT INTO clients (first_name, last_name, id_number, email, tenant_id, is_active) "
+            "SELECT 'Client' || i, 'Benchmark ' || (i % 997), 'bench' || lpad(i::text, 8, '0'), "
+            "'client' || i || '@example.com', :tenant_id, true FROM generate_series(1, :clients) AS i"
+        ), {"clients": clients, "tenant_id": tenant_id})
+        connection.execute(text("ANALYZE clients"))
+    return tenant_id
+
+
+def cleanup(tenant_id):
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM clients WHERE tenant_id = :tenant_id"), {"tenant_id": tenant_id})
+        connection.execute(text("DELETE FROM tenants WHERE id = :tenant_id"), {"tenant_id": tenant_id})
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def load(base_url, path, params, concurrency, duration):
+    """Keep concurrency requests in flight for duration seconds and summarize them."""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(http):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await http.get(path, params=params)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            name: round(_percentile(latencies, fraction) * 1000, 2) if latencies else None
+            for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        },
+    }
+
+
+def _wait_until_ready(base_url, server, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("The API server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("The API server did not start")
+
+
+def run(clients, concurrency, duration, warmup, workers, port, keep):
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("The clients throughput benchmark needs PostgreSQL")
+
+    tenant_id = seed(clients)
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", "benchmarks.clients_throughput:create_app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+         "--backlog", str(max(2048, concurrency * 2)), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    try:
+        _wait_until_ready(base_url, server)
+        params = {"tenant_id": tenant_id, "limit": 100}
+        results = {}
+        for mode, path in ROUTES.items():
+            asyncio.run(load(base_url, path, params, concurrency, warmup))
+            results[mode] = asyncio.run(load(base_url, path, params, concurrency, duration))
+            print(
+                f"{mode:6} {results[mode]['requests_per_second']:>9.1f} req/s  "
+                f"p50 {results[mode]['latency_ms']['p50']} ms  p99 {results[mode]['latency_ms']['p99']} ms  "
+                f"errors {results[mode]['errors']}",
+                file=sys.stderr
+            )
+    finally:
+        server.terminate()
+        server.wait()
+        if not keep:
+            cleanup(tenant_id)
+
+    return {
+        "clients": clients,
+        "concurrency": concurrency,
+        "duration_seconds": duration,
+        "uvicorn_workers": workers,
+        "results": results,
+        "speedup": round(results["async"]["requests_per_second"] / max(results["sync"]["requests_per_second"], 0.1), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load per route")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured load per route first")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark tenant and its clients")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(
+        run(args.clients, args.concurrency, args.duration, args.warmup, args.workers, args.port, args.keep),
+        indent=2
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
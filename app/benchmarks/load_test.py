@@ -0,0 +1,377 @@
+"""
+End-to-end load test of the HTTP API against a throwaway database.
+
+Creates the schema in a fresh SQLite file (default, through aiosqlite from
+requirements-dev.txt) or in the PostgreSQL database given with
+--database-url, starts main.app under uvicorn with --limit-concurrency, and
+seeds tenants, clients (through /clients/import) and the sample form
+templates with field mappings. It then replays a traffic mix of client
+listings, template field views, PDF generation and downloads at each
+--concurrency level in turn.
+
+The report gives p50/p95/p99 latency and error rates per route and level,
+and the saturation point: the level after which throughput stops growing
+or errors appear. The exit status is non-zero when the busiest level below
+--limit-concurrency misses --gate-error-rate (or --gate-p99-ms), so the
+test can gate changes against that production setting. Run from the app directory:
+
+    python -m benchmarks.load_test --concurrency 10,50,100,150 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FORMS = [
+    os.path.join(APP_DIR, "../data/sample_forms/RA Builder App.pdf"),
+    os.path.join(APP_DIR, "../data/sample_forms/Risk Profile Questionnaire.pdf"),
+    os.path.join(APP_DIR, "../data/sample_forms/Lifestyle Protector Risk New Business Single Life Assured.pdf"),
+]
+
+# Share of requests per scenario in the default mix
+DEFAULT_MIX = "list_clients=50,template_fields=20,generate_pdf=15,download_pdf=15"
+
+# Client attribute filled into fields of each semantic type, as a user would map them
+SEMANTIC_MAPPINGS = {
+    "id_number": "id_number", "name": "first_name", "email": "email", "phone": "phone_number",
+    "address": "address", "city": "city", "postal_code": "postal_code", "country": "country",
+    "date_of_birth": "date_of_birth", "tax_number": "tax_number", "bank_name": "bank_name",
+    "account_number": "account_number", "branch_code": "branch_code",
+}
+
+LAST_NAMES = ["Naidoo", "Smith", "Botha", "Dlamini", "van der Merwe", "Pillay", "Nkosi", "Jacobs", "Khumalo", "Fourie"]
+
+
+def create_schema(database_url):
+    """Create the tables in the stand-in database; returns the engine to drop them with."""
+    os.environ["DATABASE_URL"] = database_url
+    # Imported only now, so the models bind to the stand-in database
+    sys.path.append(APP_DIR)
+    from sqlalchemy import create_engine, inspect, text
+
+    from models import client, pdf_template, tenant  # noqa: F401 (registers the tables)
+    from models.database import Base
+
+    engine = create_engine(database_url)
+    if inspect(engine).get_table_names():
+        # The tables are dropped again afterwards, so never run against a database in use
+        raise SystemExit("The load test needs an empty database")
+    if engine.dialect.name == "sqlite":
+        # Readers don't wait for writers, as on PostgreSQL
+        with engine.connect() as connection:
+            connection.execute(text("PRAGMA journal_mode=WAL"))
+    Base.metadata.create_all(engine)
+    return engine, Base
+
+
+def start_server(database_url, work_dir, port, limit_concurrency, workers):
+    environment = dict(os.environ, DATABASE_URL=database_url)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+         "--limit-concurrency", str(limit_concurrency), "--log-level", "warning"],
+        # Templates and generated PDFs go under ./data of the working directory
+        cwd=work_dir, env=environment,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("The API server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    raise SystemExit("The API server did not start")
+
+
+def seed(base_url, tenants, clients_per_tenant, forms):
+    """Create tenants, clients and templates through the API and return their ids."""
+    with httpx.Client(base_url=base_url, timeout=300) as http:
+        tenant_ids = []
+        for number in range(tenants):
+            response = http.post("/tenants/", json={"name": f"Load test {number}", "slug": f"load-test-{number}"})
+            response.raise_for_status()
+            tenant_ids.append(response.json()["id"])
+
+        for tenant_id in tenant_ids:
+            rows = "\n".join(
+                json.dumps({
+                    "first_name": f"Client{number}", "last_name": LAST_NAMES[number % len(LAST_NAMES)],
+                    "id_number": f"{tenant_id:03d}{number:010d}", "date_of_birth": f"{1950 + number % 50}-01-01",
+                    "email": f"client{number}@example.com",
+                    "phone_number": "0821234567", "address": f"{number} Main Road", "city": "Cape Town",
+                    "postal_code": "8001", "country": "South Africa", "tax_number": f"{number:010d}",
+                    "bank_name": "FNB", "account_number": f"62{number:09d}", "branch_code": "250655", "account_type": "cheque",
+                })
+                for number in range(clients_per_tenant)
+            )
+            response = http.post(f"/clients/import?tenant_id={tenant_id}&format=ndjson", content=rows.encode())
+            response.raise_for_status()
+            if response.json()["invalid"]:
+                raise SystemExit(f"Seeding clients failed: {response.json()['errors'][:3]}")
+
+        client_ids = []
+        for tenant_id in tenant_ids:
+            after_id = None
+            while True:
+                params = {"tenant_id": tenant_id, "limit": 1000, **({"after_id": after_id} if after_id else {})}
+                response = http.get("/clients/", params=params)
+                response.raise_for_status()
+                client_ids.extend(row["id"] for row in response.json())
+                after_id = response.headers.get("X-Next-Cursor")
+                if not after_id:
+                    break
+
+        template_ids = []
+        for path in forms:
+            with open(path, "rb") as f:
+                response = http.post(
+                    "/pdf-templates/", data={"name": os.path.basename(path)},
+                    files={"file": (os.path.basename(path), f, "application/pdf")}
+                )
+            response.raise_for_status()
+            template_id = response.json()["id"]
+            fields = http.get(f"/pdf-templates/{template_id}/fields").json()["fields"]
+            mappings = {
+                name: SEMANTIC_MAPPINGS[info["semantic_fingerprint"].split(":")[0]]
+                for name, info in fields.items()
+                if info.get("semantic_fingerprint", "").split(":")[0] in SEMANTIC_MAPPINGS
+            }
+            http.put(f"/pdf-templates/{template_id}/mappings", json={"mappings": mappings}).raise_for_status()
+            template_ids.append(template_id)
+
+    return {"tenant_ids": tenant_ids, "client_ids": client_ids, "template_ids": template_ids}
+
+
+class TrafficMix:
+    """Picks and sends the requests of the scenarios in proportion to their weights."""
+
+    def __init__(self, weights, seeded):
+        self.scenarios = list(weights)
+        self.weights = [weights[name] for name in self.scenarios]
+        self.seeded = seeded
+        # Ids of generated PDFs, so downloads fetch documents that exist
+        self.generated_ids = []
+
+    async def request(self, http, scenario):
+        """Send one request of a scenario; returns (route, response)."""
+        if scenario == "download_pdf" and not self.generated_ids:
+            scenario = "generate_pdf"
+        if scenario == "list_clients":
+            params = {"tenant_id": random.choice(self.seeded["tenant_ids"]), "limit": 50}
+            if random.random() < 0.3:
+                params["search"] = random.choice(LAST_NAMES)[:3]
+            return "GET /clients/", await http.get("/clients/", params=params)
+        if scenario == "template_fields":
+            template_id = random.choice(self.seeded["template_ids"])
+            return "GET /pdf-templates/{id}/fields", await http.get(f"/pdf-templates/{template_id}/fields")
+        if scenario == "generate_pdf":
+            response = await http.post("/generate-pdf/", json={
+                "client_id": random.choice(self.seeded["client_ids"]),
+                "template_id": random.choice(self.seeded["template_ids"]),
+            })
+            if response.status_code == 200:
+                self.generated_ids.append(response.json()["id"])
+            return "POST /generate-pdf/", response
+        if scenario == "download_pdf":
+            generated_id = random.choice(self.generated_ids)
+            return "GET /generate-pdf/{id}", await http.get(f"/generate-pdf/{generated_id}")
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_level(base_url, mix, concurrency, duration):
+    """Keep concurrency requests in flight for duration seconds; summarize them per route."""
+    latencies = defaultdict(list)
+    errors = defaultdict(lambda: defaultdict(int))
+    deadline = time.perf_counter() + duration
+
+    async def worker(http):
+        while time.perf_counter() < deadline:
+            scenario = random.choices(mix.scenarios, mix.weights)[0]
+            started = time.perf_counter()
+            try:
+                route, response = await mix.request(http, scenario)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                route, status = scenario, type(e).__name__
+            latencies[route].append(time.perf_counter() - started)
+            if status != 200:
+                # 503 is uvicorn turning requests away above --limit-concurrency
+                errors[route][str(status)] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route, values in sorted(latencies.items()):
+        values.sort()
+        failed = sum(errors[route].values())
+        routes[route] = {
+            "requests": len(values),
+            "error_rate": round(failed / len(values), 4),
+            "errors": dict(errors[route]),
+            "latency_ms": {
+                "p50": round(_percentile(values, 0.50) * 1000, 1),
+                "p95": round(_percentile(values, 0.95) * 1000, 1),
+                "p99": round(_percentile(values, 0.99) * 1000, 1),
+            },
+        }
+    total = sum(len(values) for values in latencies.values())
+    failed = sum(sum(route_errors.values()) for route_errors in errors.values())
+    ok = total - failed
+    every_latency = sorted(value for values in latencies.values() for value in values)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "successful_per_second": round(ok / elapsed, 1),
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "rejected_503": sum(route_errors.get("503", 0) for route_errors in errors.values()),
+        "latency_ms": {
+            name: round(_percentile(every_latency, fraction) * 1000, 1) if every_latency else None
+            for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        },
+        "routes": routes,
+    }
+
+
+def saturation_point(levels, min_gain, max_error_rate):
+    """
+    Return the highest level worth running at: past it throughput grows by
+    less than min_gain, or errors exceed max_error_rate.
+    """
+    best = None
+    for level in levels:
+        if level["error_rate"] > max_error_rate:
+            break
+        if best is not None and level["successful_per_second"] < best["successful_per_second"] * (1 + min_gain):
+            break
+        best = level
+    return best["concurrency"] if best else None
+
+
+def _parse_mix(text):
+    weights = {}
+    for entry in text.split(","):
+        name, _, weight = entry.partition("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as work_dir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(work_dir, 'load_test.db')}"
+        engine, Base = create_schema(database_url)
+        server, base_url = start_server(database_url, work_dir, args.port, args.limit_concurrency, args.workers)
+        try:
+            started = time.perf_counter()
+            seeded = seed(base_url, args.tenants, args.clients, args.forms)
+            seed_seconds = time.perf_counter() - started
+            mix = TrafficMix(_parse_mix(args.mix), seeded)
+            if args.warmup:
+                asyncio.run(run_level(base_url, mix, min(args.concurrency), args.warmup))
+
+            levels = []
+            for concurrency in args.concurrency:
+                level = asyncio.run(run_level(base_url, mix, concurrency, args.duration))
+                levels.append(level)
+                print(
+                    f"concurrency {concurrency:>4}: {level['successful_per_second']:>8.1f} ok/s  "
+                    f"p50 {level['latency_ms']['p50']} ms  p99 {level['latency_ms']['p99']} ms  "
+                    f"errors {level['error_rate']:.2%} (503: {level['rejected_503']})",
+                    file=sys.stderr
+                )
+        finally:
+            server.terminate()
+            server.wait()
+            if args.database_url and not args.keep:
+                Base.metadata.drop_all(engine)
+            engine.dispose()
+
+    report = {
+        "database": engine.dialect.name,
+        "limit_concurrency": args.limit_concurrency,
+        "uvicorn_workers": args.workers,
+        "mix": _parse_mix(args.mix),
+        "seed": {"tenants": args.tenants, "clients": args.tenants * args.clients,
+                 "templates": len(args.forms), "seconds": round(seed_seconds, 1)},
+        "duration_seconds": args.duration,
+        "levels": levels,
+        "saturation_concurrency": saturation_point(levels, args.min_gain, args.gate_error_rate),
+    }
+
+    # uvicorn counts open connections against the limit, so the limit itself already sees 503s;
+    # the gate checks the busiest level the limit is meant to admit
+    admitted = [level for level in levels if level["concurrency"] < args.limit_concurrency]
+    if admitted:
+        gate_level = admitted[-1]
+        failures = []
+        if args.gate_p99_ms is not None and gate_level["latency_ms"]["p99"] > args.gate_p99_ms:
+            failures.append(f"p99 {gate_level['latency_ms']['p99']} ms > {args.gate_p99_ms} ms")
+        if gate_level["error_rate"] > args.gate_error_rate:
+            failures.append(f"error rate {gate_level['error_rate']:.2%} > {args.gate_error_rate:.2%}")
+        report["gate"] = {"concurrency": gate_level["concurrency"], "passed": not failures, "failures": failures}
+    return report
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty PostgreSQL database to create the schema in (default: a temporary SQLite file)")
+    parser.add_argument("--keep", action="store_true", help="Keep the tables created in --database-url")
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=2000, help="Clients per tenant")
+    parser.add_argument("--forms", nargs="*", default=SAMPLE_FORMS, help="PDF templates to upload")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. list_clients=50,generate_pdf=50")
+    parser.add_argument("--concurrency", type=_int_list, default=[10, 25, 50, 95, 150, 200],
+                        help="Concurrent connections of each load level, in order")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load per level")
+    parser.add_argument("--warmup", type=float, default=10, help="Seconds of unmeasured load before the first level")
+    parser.add_argument("--limit-concurrency", type=int, default=100, help="uvicorn --limit-concurrency, as in production")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--min-gain", type=float, default=0.05,
+                        help="Throughput growth below which a level counts as saturated")
+    parser.add_argument("--gate-p99-ms", type=float, help="Fail when p99 of the last level below --limit-concurrency exceeds this")
+    parser.add_argument("--gate-error-rate", type=float, default=0.01,
+                        help="Fail when the error rate of the last level below --limit-concurrency exceeds this")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if not report.get("gate", {}).get("passed", True):
+        print(f"Gate failed at concurrency {report['gate']['concurrency']}: {'; '.join(report['gate']['failures'])}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
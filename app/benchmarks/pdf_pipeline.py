@@ -0,0 +1,246 @@
+"""
+Measure the PDF pipeline on the sample forms and on synthetic forms of
+growing size: latency, throughput and peak memory of extract_form_fields
+(first call, parsing the file, and cached), get_similar_fields,
+fill_pdf_form in each output mode and generate_filled_pdf.
+
+Synthetic forms are built with utils/create_test_form.py for every
+combination of --fields and --pages. None of the measured calls touch the
+database, so the benchmark runs offline without one. Run from the app
+directory and compare two commits with --compare:
+
+    python -m benchmarks.pdf_pipeline --output before.json
+    python -m benchmarks.pdf_pipeline --output after.json --compare before.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Docker path
+    from app.services.pdf_service import PDF_OUTPUT_MODES, PDFService
+    from app.services.template_cache import TemplateCache
+    from app.utils.create_test_form import create_scaled_test_form
+except ImportError:
+    # Local path
+    from services.pdf_service import PDF_OUTPUT_MODES, PDFService
+    from services.template_cache import TemplateCache
+    from utils.create_test_form import create_scaled_test_form
+
+SAMPLE_FORMS = [
+    "../data/sample_forms/RA Builder App.pdf",
+    "../data/sample_forms/Risk Profile Questionnaire.pdf",
+    "../data/sample_forms/Lifestyle Protector Risk New Business Single Life Assured.pdf",
+]
+
+# Client record used by generate_filled_pdf; mapped onto the form's fields in turn
+CLIENT_DATA = {
+    "first_name": "Jane", "last_name": "Doe", "id_number": "8001015009087",
+    "date_of_birth": "1980-01-01", "email": "jane.doe@example.com", "phone_number": "0821234567",
+    "address": "1 Main Road", "city": "Cape Town", "postal_code": "8001", "country": "South Africa",
+    "tax_number": "0123456789", "bank_name": "FNB", "account_number": "62000000000",
+    "branch_code": "250655", "account_type": "cheque",
+}
+
+
+def _latency_summary(seconds):
+    ordered = sorted(seconds)
+    return {
+        "min": round(ordered[0] * 1000, 3),
+        "median": round(statistics.median(ordered) * 1000, 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure(operation, repeat, setup=None):
+    """
+    Time operation repeat times, then run it once more under tracemalloc.
+
+    setup, if given, runs before every call outside the timed region and its
+    result is passed to operation.
+    """
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        started = time.perf_counter()
+        operation(argument)
+        timings.append(time.perf_counter() - started)
+
+    # Tracing slows allocation down, so memory is measured in a separate run
+    argument = setup() if setup else None
+    tracemalloc.start()
+    try:
+        operation(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "runs": repeat,
+        "latency_ms": _latency_summary(timings),
+        "throughput_per_second": round(repeat / sum(timings), 3) if sum(timings) else None,
+        "peak_memory_kb": peak // 1024,
+    }
+
+
+def _text_fields(service, path):
+    """Return the names of the form's text fields, which any string can be filled into."""
+    acro_fields = service.get_template_analysis(path).acro_fields or {}
+    names = [name for name, field in acro_fields.items() if field.get("/FT") == "/Tx"]
+    return names or list(service.extract_form_fields(path))
+
+
+def benchmark_form(path, work_dir, repeat, modes):
+    template_dir = os.path.join(work_dir, "templates")
+    output_dir = os.path.join(work_dir, "output")
+    service = PDFService(template_dir, output_dir)
+
+    def fresh_service():
+        # A new cache makes every call parse and analyze the file again
+        return PDFService(template_dir, output_dir, template_cache=TemplateCache())
+
+    operations = {
+        "extract_form_fields_cold": measure(lambda cold: cold.extract_form_fields(path), repeat, setup=fresh_service),
+    }
+    # Warm the shared service's cache for the remaining operations
+    fields = service.extract_form_fields(path)
+    operations["extract_form_fields"] = measure(lambda _: service.extract_form_fields(path), repeat)
+    operations["get_similar_fields"] = measure(lambda _: service.get_similar_fields(path), repeat)
+
+    text_fields = _text_fields(service, path)
+    field_data = {name: f"Benchmark value {number}" for number, name in enumerate(text_fields)}
+    output_path = os.path.join(output_dir, "filled.pdf")
+    for mode in modes:
+        operations[f"fill_pdf_form_{mode}"] = measure(
+            lambda _, mode=mode: service.fill_pdf_form(path, output_path, field_data, mode), repeat
+        )
+
+    client_fields = list(CLIENT_DATA)
+    mappings = {name: client_fields[number % len(client_fields)] for number, name in enumerate(text_fields)}
+    generated = []
+    operations["generate_filled_pdf"] = measure(
+        lambda _: generated.append(service.generate_filled_pdf(path, CLIENT_DATA, mappings)), repeat
+    )
+    for generated_path in generated:
+        os.remove(generated_path)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    return {
+        "bytes": os.path.getsize(path),
+        "fields": len(fields),
+        "text_fields": len(text_fields),
+        "pages": len(service.get_template_analysis(path).reader.pages),
+        "operations": operations,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(field_counts, page_counts, samples, repeat, modes):
+    started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    forms = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        sources = [("sample", path, None, None) for path in samples]
+        for field_count in field_counts:
+            for page_count in page_counts:
+                if page_count > field_count:
+                    continue
+                path = os.path.join(work_dir, f"synthetic_{field_count}f_{page_count}p.pdf")
+                sources.append(("synthetic", path, field_count, page_count))
+
+        for kind, path, field_count, page_count in sources:
+            if kind == "synthetic":
+                create_scaled_test_form(path, field_count, page_count)
+            name = os.path.basename(path)
+            print(f"Benchmarking {name}", file=sys.stderr)
+            forms.append({"name": name, "kind": kind, **benchmark_form(path, work_dir, repeat, modes)})
+
+    return {
+        "environment": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "started_at": started_at,
+            # ru_maxrss is in kB on Linux
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "settings": {"repeat": repeat, "modes": modes, "field_counts": field_counts, "page_counts": page_counts},
+        "forms": forms,
+    }
+
+
+def compare(report, baseline):
+    """Print the median latency of each form and operation against a baseline report."""
+    baseline_forms = {form["name"]: form for form in baseline["forms"]}
+    print(f"Compared with {baseline['environment'].get('commit') or 'baseline'} (median ms, after/before)", file=sys.stderr)
+    for form in report["forms"]:
+        before = baseline_forms.get(form["name"])
+        if before is None:
+            continue
+        for operation, result in form["operations"].items():
+            if operation not in before["operations"]:
+                continue
+            old = before["operations"][operation]["latency_ms"]["median"]
+            new = result["latency_ms"]["median"]
+            print(f"{form['name'][:40]:40} {operation:28} {old:>10.2f} -> {new:>10.2f}  ({new / old if old else 0:.2f}x)",
+                  file=sys.stderr)
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fields", type=_int_list, default=[10, 100, 1000, 5000], help="Field counts of the synthetic forms")
+    parser.add_argument("--pages", type=_int_list, default=[1, 20, 200], help="Page counts of the synthetic forms")
+    parser.add_argument("--samples", nargs="*", default=SAMPLE_FORMS, help="Real forms to include")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per operation")
+    parser.add_argument("--modes", default="rewrite,incremental,delta", help="fill_pdf_form output modes to measure")
+    parser.add_argument("--compare", help="Baseline JSON report to compare median latencies against")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = [mode for mode in modes if mode not in PDF_OUTPUT_MODES]
+    if unknown:
+        parser.error(f"Unknown output modes: {', '.join(unknown)}")
+
+    report = run(args.fields, args.pages, args.samples, args.repeat, modes)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    report = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
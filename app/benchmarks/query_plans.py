@@ -0,0 +1,226 @@
+"""
+Compare query plans and timings of the tenant-scoped list queries with and
+without the composite indexes of the tenant_composite_indexes migration.
+
+Seeds a throwaway schema of the configured PostgreSQL database (DB_HOST,
+DB_NAME, ...) with generated clients and PDFs, runs each query under
+EXPLAIN ANALYZE before and after creating the indexes, and drops the schema
+again. Run from the app directory:
+
+    python -m benchmarks.query_plans --clients 1000000 --output plans.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Docker path
+    from app.models import client, pdf_template, tenant  # noqa: F401 (registers the tables)
+    from app.models.database import Base, engine
+except ImportError:
+    # Local path
+    from models import client, pdf_template, tenant  # noqa: F401 (registers the tables)
+    from models.database import Base, engine
+
+SCHEMA = "benchmark_query_plans"
+
+# The indexes under test, as declared on the models
+COMPOSITE_INDEXES = [
+    index
+    for table in (client.Client.__table__, pdf_template.PDFTemplate.__table__, pdf_template.GeneratedPDF.__table__)
+    for index in table.indexes
+    if index.name in (
+        "ix_clients_tenant_id_id_number",
+        "ix_clients_tenant_id_last_name_first_name",
+        "ix_pdf_templates_tenant_id",
+        "ix_generated_pdfs_template_id_created_at",
+        "ix_generated_pdfs_client_id_created_at",
+    )
+]
+
+LAST_NAMES = ["Naidoo", "Smith", "Botha", "Dlamini", "van der Merwe", "Pillay", "Nkosi", "Jacobs", "Khumalo", "Fourie"]
+
+# name -> (SQL, description); :tenant_id, :template_id and :client_id pick a mid-sized tenant
+QUERIES = {
+    "duplicate_check": (
+        "SELECT id FROM clients WHERE id_number = :id_number AND tenant_id = :tenant_id LIMIT 1",
+        "create_client's duplicate check",
+    ),
+    "tenant_clients_by_name": (
+        "SELECT * FROM clients WHERE tenant_id = :tenant_id ORDER BY last_name, first_name LIMIT 100",
+        "first page of a tenant's clients sorted by name",
+    ),
+    "tenant_client_count": (
+        "SELECT count(*) FROM clients WHERE tenant_id = :tenant_id",
+        "number of clients of a tenant",
+    ),
+    "tenant_templates": (
+        "SELECT * FROM pdf_templates WHERE tenant_id = :tenant_id ORDER BY id LIMIT 100",
+        "GET /pdf-templates/?tenant_id=",
+    ),
+    "template_recent_pdfs": (
+        "SELECT * FROM generated_pdfs WHERE template_id = :template_id ORDER BY created_at DESC LIMIT 50",
+        "latest PDFs generated from a template",
+    ),
+    "template_export_range": (
+        "SELECT id, file_path FROM generated_pdfs WHERE template_id = :template_id "
+        "AND created_at >= now() - interval '7 days' ORDER BY id",
+        "ZIP export of a template's PDFs from the last week",
+    ),
+    "client_pdfs": (
+        "SELECT * FROM generated_pdfs WHERE client_id = :client_id ORDER BY created_at DESC",
+        "PDFs generated for one client",
+    ),
+}
+
+
+def seed(connection, clients, tenants, templates, pdfs):
+    """Fill the benchmark schema with generated rows, entirely inside the database."""
+    connection.execute(text(
+        "INSERT INTO tenants (id, name, slug, is_active) "
+        "SELECT i, 'Tenant ' || i, 'tenant-' || i, true FROM generate_series(1, :tenants) AS i"
+    ), {"tenants": tenants})
+    connection.execute(text(
+        "INSERT INTO clients (id, first_name, last_name, id_number, email, tenant_id, is_active) "
+        "SELECT i, 'Client' || i, (:last_names)[1 + i % :name_count] || ' ' || (i % 997), "
+        "lpad(i::text, 13, '0'), 'client' || i || '@example.com', 1 + i % :tenants, true "
+        "FROM generate_series(1, :clients) AS i"
+    ), {"clients": clients, "tenants": tenants, "last_names": LAST_NAMES, "name_count": len(LAST_NAMES)})
+    connection.execute(text(
+        "INSERT INTO pdf_templates (id, name, file_path, tenant_id, is_active, created_at) "
+        "SELECT i, 'Template ' || i, '/dev/null', 1 + i % :tenants, true, now() FROM generate_series(1, :templates) AS i"
+    ), {"templates": templates, "tenants": tenants})
+    connection.execute(text(
+        "INSERT INTO generated_pdfs (id, file_path, storage, client_id, template_id, created_at) "
+        "SELECT i, '/dev/null', 'file', 1 + i % :clients, 1 + i % :templates, "
+        "now() - (i % 525600) * interval '1 minute' FROM generate_series(1, :pdfs) AS i"
+    ), {"pdfs": pdfs, "clients": clients, "templates": templates})
+    connection.execute(text("ANALYZE"))
+
+
+def explain(connection, sql, params, repeat):
+    """Run a query under EXPLAIN ANALYZE and return its plan and best execution time."""
+    best_ms = None
+    plan = None
+    for _ in range(repeat):
+        result = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()
+        execution_ms = result[0]["Execution Time"]
+        if best_ms is None or execution_ms < best_ms:
+            best_ms = execution_ms
+            plan = result[0]["Plan"]
+    return {
+        "execution_ms": round(best_ms, 3),
+        "plan": _summarize(plan),
+        "shared_blocks": plan.get("Shared Read Blocks", 0) + plan.get("Shared Hit Blocks", 0),
+    }
+
+
+def _summarize(plan):
+    """Return the plan's nodes as 'Node Type on relation using index' lines, outermost first."""
+    label = plan["Node Type"]
+    if "Relation Name" in plan:
+        label += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        label += f" using {plan['Index Name']}"
+    return [label] + [line for child in plan.get("Plans", []) for line in _summarize(child)]
+
+
+def run_queries(connection, params, repeat):
+    return {
+        name: explain(connection, sql, params, repeat)
+        for name, (sql, _) in QUERIES.items()
+    }
+
+
+def run(clients, tenants, templates, pdfs, repeat, keep):
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("The query plan benchmark needs PostgreSQL")
+
+    with engine.connect() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        # Unqualified names, including the model tables, now resolve to the benchmark schema
+        connection.execute(text(f"SET search_path TO {SCHEMA}"))
+        Base.metadata.create_all(connection)
+        for index in COMPOSITE_INDEXES:
+            index.drop(connection)
+
+        started = time.perf_counter()
+        seed(connection, clients, tenants, templates, pdfs)
+        connection.commit()
+        seed_seconds = time.perf_counter() - started
+
+        # A tenant and template in the middle of the generated data
+        params = {
+            "tenant_id": tenants // 2 or 1,
+            "id_number": str(clients // 2).zfill(13),
+            "template_id": templates // 2 or 1,
+            "client_id": clients // 2 or 1,
+        }
+        results = {"without_indexes": run_queries(connection, params, repeat)}
+
+        started = time.perf_counter()
+        for index in COMPOSITE_INDEXES:
+            index.create(connection)
+        connection.execute(text("ANALYZE"))
+        connection.commit()
+        index_seconds = time.perf_counter() - started
+        results["with_indexes"] = run_queries(connection, params, repeat)
+
+        if not keep:
+            connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            connection.commit()
+
+    return {
+        "rows": {"clients": clients, "tenants": tenants, "templates": templates, "generated_pdfs": pdfs},
+        "seed_seconds": round(seed_seconds, 1),
+        "index_build_seconds": round(index_seconds, 1),
+        "queries": {
+            name: {
+                "description": description,
+                "without_indexes": results["without_indexes"][name],
+                "with_indexes": results["with_indexes"][name],
+                "speedup": round(
+                    results["without_indexes"][name]["execution_ms"] / max(results["with_indexes"][name]["execution_ms"], 0.001), 1
+                ),
+            }
+            for name, (_, description) in QUERIES.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1_000_000)
+    parser.add_argument("--tenants", type=int, default=200)
+    parser.add_argument("--templates", type=int, default=500)
+    parser.add_argument("--pdfs", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query; the fastest is reported")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema for manual inspection")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args.clients, args.tenants, args.templates, args.pdfs, args.repeat, args.keep)
+    for name, query in report["queries"].items():
+        print(
+            f"{name:24} {query['without_indexes']['execution_ms']:>10.3f} ms -> "
+            f"{query['with_indexes']['execution_ms']:>8.3f} ms  ({query['speedup']}x)",
+            file=sys.stderr
+        )
+
+    report = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compare the resident memory of fill engine workers with templates read into
+each process (TEMPLATE_STORE_MMAP=0) against memory-mapped templates.
+
+Every worker fills each template once, then reports its own memory from
+/proc (Linux only). Run from the app directory:
+
+    python -m benchmarks.template_rss --workers 4 --output rss.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Docker path
+    from app.services import fill_engine
+except ImportError:
+    # Local path
+    from services import fill_engine
+
+DEFAULT_TEMPLATES = [
+    "../data/sample_forms/RA Builder App.pdf",
+    "../data/sample_forms/Lifestyle Protector Risk New Business Single Life Assured.pdf",
+    "../data/sample_forms/Risk Profile Questionnaire.pdf",
+]
+
+
+def _memory_kb():
+    """Return this process's Rss, Pss and private memory in kB."""
+    stats = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                stats[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_kb": stats.get("Rss", 0),
+        "pss_kb": stats.get("Pss", 0),
+        "private_kb": stats.get("Private_Clean", 0) + stats.get("Private_Dirty", 0),
+        "shared_kb": stats.get("Shared_Clean", 0) + stats.get("Shared_Dirty", 0),
+    }
+
+
+def _fill_and_measure(service, templates, output_dir, barrier):
+    for template_path in templates:
+        fields = service.extract_form_fields(template_path)
+        field_data = {field_name: "benchmark" for field_name in fields}
+        service.fill_pdf_form(template_path, os.path.join(output_dir, f"{os.getpid()}.pdf"), field_data)
+    # Hold every worker here so each one takes exactly one task
+    barrier.wait()
+    return {"pid": os.getpid(), **_memory_kb()}
+
+
+async def _measure(engine, templates, output_dir, barrier):
+    loop = asyncio.get_running_loop()
+    futures = [
+        loop.run_in_executor(
+            engine._executor, fill_engine._call_in_worker_with_metrics, False, _fill_and_measure, templates, output_dir, barrier
+        )
+        for _ in range(engine.workers)
+    ]
+    # Each result is (value, timing spans, counters, profile stats)
+    return [result for result, _, _, _ in await asyncio.gather(*futures)]
+
+
+def run(templates, workers):
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir, multiprocessing.Manager() as manager:
+        for mode, use_mmap in (("read", "0"), ("mmap", "1")):
+            # Spawned workers read the setting when they import the template store
+            os.environ["TEMPLATE_STORE_MMAP"] = use_mmap
+            engine = fill_engine.FillEngine(output_dir=output_dir, workers=workers, start_method="spawn")
+            engine.start()
+            try:
+                per_worker = asyncio.run(_measure(engine, templates, output_dir, manager.Barrier(workers)))
+            finally:
+                engine.shutdown()
+
+            results[mode] = {
+                "workers": per_worker,
+                "total_pss_kb": sum(w["pss_kb"] for w in per_worker),
+                "total_private_kb": sum(w["private_kb"] for w in per_worker),
+                "mean_rss_kb": sum(w["rss_kb"] for w in per_worker) // len(per_worker),
+            }
+
+    return {
+        "templates": [os.path.basename(t) for t in templates],
+        "template_bytes": sum(os.path.getsize(t) for t in templates),
+        "worker_count": workers,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("templates", nargs="*", default=DEFAULT_TEMPLATES)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args.templates, args.workers), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
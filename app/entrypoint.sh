@@ -33,4 +33,4 @@ cd /app && python -m alembic.config -c /app/app/alembic.ini upgrade head
 
 # Start the application with increased timeout
 echo "Launching uvicorn server..."
-exec python -m uvicorn app.main:app --host 0.0.0.0 --port 8001 --reload --log-level debug --limit-concurrency 100 --timeout-keep-alive 120
+exec python -m uvicorn app.main:app --host 0.0.0.0 --port 8001 --reload --log-level "${UVICORN_LOG_LEVEL:-info}" --limit-concurrency 100 --timeout-keep-alive 120
@@ -1,62 +1,106 @@
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, status
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Header, Request, Response, status
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from starlette.datastructures import UploadFile as StarletteUploadFile
+from fastapi.concurrency import run_in_threadpool as fastapi_run_in_threadpool
+import asyncio
+import hmac
 import os
 import shutil
 import sys
 from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import json
+from datetime import datetime
 import uvicorn
 
 # Handle both local development and Docker environment imports
 try:
     # Try Docker path first
     from app.models import client, pdf_template, database, tenant
-    from app.models.database import get_db, engine
+    from app.models.database import get_db, get_async_db, get_pool_status, engine, async_engine, SessionLocal
     from app.schemas import client as client_schema
     from app.schemas import pdf_template as pdf_schema
-    from app.services.pdf_service import PDFService
-    print("Using Docker import paths")
+    from app.services.pdf_service import PDFService, FIELD_ANALYZER_VERSION, PDF_OUTPUT_MODE
+    from app.services.fill_plan import FillPlan
+    from app.services.fill_engine import FillEngine, FillEngineTimeout
+    from app.services.job_queue import PDFJobQueue
+    from app.services.zip_stream import stream_files, stream_zip
+    from app.services.render_cache import RenderCache
+    from app.services.pagination import PAGINATION_MAX_LIMIT, count_rows, keyset_page, prefix_filter
+    from app.services.client_import import CLIENT_IMPORT_FORMATS, ClientImporter, iter_csv_records, iter_ndjson_records
+    from app.services.pdf_download import (
+        DOWNLOAD_CACHE_CONTROL, RangeNotSatisfiable, accel_redirect_uri, content_etag, etag_matches,
+        parse_byte_range, stream_file_range
+    )
+    from app.services.template_upload import TEMPLATE_UPLOAD_CHUNK_SIZE, InvalidPDFError, TemplateTooLargeError
+    from app.services.log_config import configure_logging, dropped_records, get_logger
+    from app.services.metrics import METRICS_ENABLED, METRIC_PREFIX, MetricsMiddleware, format_labels, instrument_engine, registry
+    from app.services import profiling
+    from app.services.profiling import PROFILE_ADMIN_TOKEN, PROFILING_ENABLED, ProfileStore, ProfilingMiddleware
+    IMPORT_PATHS = "Docker"
 except ImportError:
     # Fall back to local development paths
     from models import client, pdf_template, database, tenant
-    from models.database import get_db, engine
+    from models.database import get_db, get_async_db, get_pool_status, engine, async_engine, SessionLocal
     from schemas import client as client_schema
     from schemas import pdf_template as pdf_schema
-    from services.pdf_service import PDFService
-    print("Using local import paths")
+    from services.pdf_service import PDFService, FIELD_ANALYZER_VERSION, PDF_OUTPUT_MODE
+    from services.fill_plan import FillPlan
+    from services.fill_engine import FillEngine, FillEngineTimeout
+    from services.job_queue import PDFJobQueue
+    from services.zip_stream import stream_files, stream_zip
+    from services.render_cache import RenderCache
+    from services.pagination import PAGINATION_MAX_LIMIT, count_rows, keyset_page, prefix_filter
+    from services.client_import import CLIENT_IMPORT_FORMATS, ClientImporter, iter_csv_records, iter_ndjson_records
+    from services.pdf_download import (
+        DOWNLOAD_CACHE_CONTROL, RangeNotSatisfiable, accel_redirect_uri, content_etag, etag_matches,
+        parse_byte_range, stream_file_range
+    )
+    from services.template_upload import TEMPLATE_UPLOAD_CHUNK_SIZE, InvalidPDFError, TemplateTooLargeError
+    from services.log_config import configure_logging, dropped_records, get_logger
+    from services.metrics import METRICS_ENABLED, METRIC_PREFIX, MetricsMiddleware, format_labels, instrument_engine, registry
+    from services import profiling
+    from services.profiling import PROFILE_ADMIN_TOKEN, PROFILING_ENABLED, ProfileStore, ProfilingMiddleware
+    IMPORT_PATHS = "local"
+
+# Log records are written by a background thread (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT)
+configure_logging()
+logger = get_logger("main")
+logger.info("Using %s import paths", IMPORT_PATHS)
 
 # NOTE: No longer creating tables directly - using Alembic for migrations
 # Tables will be created by running alembic upgrade head
 
+# Initialize PDF service
+pdf_service = PDFService()
+
+# CPU-bound PDF work runs in worker processes (FILL_ENGINE_WORKERS, FILL_ENGINE_TASK_TIMEOUT)
+fill_engine = FillEngine(pdf_service=pdf_service)
+
+# PDFs stored as field values are rendered on download into a bounded cache (RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB)
+render_cache = RenderCache()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    fill_engine.start()
+    pdf_job_queue.start()
+    yield
+    await pdf_job_queue.stop()
+    fill_engine.shutdown()
+    await async_engine.dispose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="DocuMantis PDF Automation",
     description="API for managing client data and automating PDF form filling",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Override FastAPI's default UploadFile max size (increase to 50MB)
-# This is a monkey patch to allow larger file uploads
-def _get_with_increased_limit():
-    orig_init = StarletteUploadFile.__init__
-
-    def new_init(self, *args, **kwargs):
-        if "max_size" in kwargs:
-            kwargs["max_size"] = 50 * 1024 * 1024  # 50MB
-        orig_init(self, *args, **kwargs)
-
-    StarletteUploadFile.__init__ = new_init
-
-# Apply the monkey patch
-_get_with_increased_limit()
-
-# Initialize PDF service
-pdf_service = PDFService()
-
 # Set up CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -64,18 +108,163 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination and download metadata is read by the frontend
+    expose_headers=["X-Total-Count", "X-Total-Count-Estimated", "X-Next-Cursor", "Content-Disposition", "ETag", "X-Profile-Id"],
 )
 
-# Mount static files
+# Per-stage timings: Server-Timing on every response and histograms on /metrics (METRICS_ENABLED)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+# Opt-in cProfile of requests sent with the admin token or sampled at random (PROFILE_ADMIN_TOKEN, PROFILE_SAMPLE_PERCENT)
+profile_store = ProfileStore() if PROFILING_ENABLED else None
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, store=profile_store)
+
 os.makedirs("./data", exist_ok=True)
 os.makedirs("./data/generated_pdfs", exist_ok=True)
-app.mount("/downloads", StaticFiles(directory="./data/generated_pdfs"), name="downloads")
+
+async def run_in_threadpool(func, *args):
+    """Run blocking work in the threadpool, under its own profiler when the request is profiled."""
+    # The threadpool runs func in a copy of the request's context, which carries its profile
+    return await fastapi_run_in_threadpool(profiling.profile_in_thread, func, *args)
+
+def clamp_page_limit(limit: int) -> int:
+    return max(1, min(limit, PAGINATION_MAX_LIMIT))
+
+def set_page_headers(response: Response, total: int, exact: bool, next_cursor: Optional[int]) -> None:
+    """Describe a page of a list endpoint in its response headers."""
+    response.headers["X-Total-Count"] = str(total)
+    if not exact:
+        # Large totals come from the query planner and are only approximate
+        response.headers["X-Total-Count-Estimated"] = "true"
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+
+async def get_template_field_analysis(db_template: pdf_template.PDFTemplate, db: Session) -> Dict:
+    """Return the stored field analysis for a template, recomputing it only when stale."""
+    if pdf_service.is_field_analysis_current(db_template.field_analysis, db_template.file_path):
+        return db_template.field_analysis
+    
+    template_path = db_template.file_path
+    # Return the connection to the pool while a worker analyzes the template
+    await run_in_threadpool(db.commit)
+    field_analysis = await fill_engine.build_field_analysis(template_path)
+    db_template.field_analysis = field_analysis
+    db_template.analyzer_version = field_analysis["analyzer_version"]
+    # The fill plan was compiled from the old analysis
+    db_template.fill_plan = None
+    await run_in_threadpool(db.commit)
+    return field_analysis
+
+async def compile_template_fill_plan(db_template: pdf_template.PDFTemplate, db: Session) -> FillPlan:
+    """Compile the template's fill plan from its mappings and field analysis and store it."""
+    field_analysis = await get_template_field_analysis(db_template, db)
+    client_fields = [column.name for column in client.Client.__table__.columns]
+    plan = pdf_service.build_fill_plan(db_template.field_mappings or {}, field_analysis, client_fields)
+    db_template.fill_plan = plan.to_dict()
+    return plan
+
+async def get_template_fill_plan(db_template: pdf_template.PDFTemplate, db: Session) -> FillPlan:
+    """Return the stored fill plan for a template, compiling it if missing or outdated."""
+    field_analysis = await get_template_field_analysis(db_template, db)
+    if db_template.fill_plan:
+        plan = FillPlan.from_dict(db_template.fill_plan)
+        if plan.analyzer_version == field_analysis["analyzer_version"]:
+            return plan
+    
+    plan = await compile_template_fill_plan(db_template, db)
+    await run_in_threadpool(db.commit)
+    return plan
+
+def count_template_references(file_path: str, db: Session, content_hash: Optional[str] = None) -> int:
+    """Count the templates stored at the given path and the generated PDFs that still need it."""
+    references = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.file_path == file_path).count()
+    if content_hash:
+        references += db.query(pdf_template.GeneratedPDF).filter(
+            pdf_template.GeneratedPDF.template_hash == content_hash,
+            pdf_template.GeneratedPDF.storage.in_(["delta", "values"])
+        ).count()
+    return references
+
+def get_shared_field_analysis(content_hash: str, file_path: str, db: Session) -> Optional[Dict]:
+    """Return a current field analysis stored by another template with the same content, if any."""
+    candidates = (
+        db.query(pdf_template.PDFTemplate)
+        .filter(
+            pdf_template.PDFTemplate.content_hash == content_hash,
+            pdf_template.PDFTemplate.analyzer_version == FIELD_ANALYZER_VERSION
+        )
+        .all()
+    )
+    for candidate in candidates:
+        if candidate.file_path == file_path and pdf_service.is_field_analysis_current(candidate.field_analysis, file_path):
+            return candidate.field_analysis
+    return None
+
+def get_template(template_id: int, db: Session) -> pdf_template.PDFTemplate:
+    """Load a template or answer 404."""
+    db_template = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.id == template_id).first()
+    if db_template is None:
+        raise HTTPException(status_code=404, detail="PDF template not found")
+    return db_template
+
+def save_row(db: Session, instance) -> None:
+    """Insert or update a row and reload it, e.g. for its server defaults."""
+    db.add(instance)
+    db.commit()
+    db.refresh(instance)
 
 # Health check endpoint
 @app.get("/health")
 def health_check():
-    """Health check endpoint for Docker."""
-    return {"status": "healthy", "database": "PostgreSQL"}
+    """Health check endpoint for Docker, with connection pool statistics."""
+    return {"status": "healthy", "database": "PostgreSQL", "pool": get_pool_status(), "log_records_dropped": dropped_records()}
+
+# get_pool_status fields exported on /metrics, with their Prometheus types
+POOL_METRICS = {
+    "size": "gauge", "checked_out": "gauge", "idle": "gauge", "overflow": "gauge",
+    "checkouts": "counter", "connects": "counter", "invalidations": "counter", "timeouts": "counter",
+    "wait_seconds_total": "counter", "wait_seconds_max": "gauge",
+}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Stage timings, cache and write counters and pool statistics in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    lines = registry.render()
+    pool_status = get_pool_status()
+    for field, metric_type in POOL_METRICS.items():
+        name = f"{METRIC_PREFIX}_db_pool_{field}"
+        lines.append(f"# TYPE {name} {metric_type}")
+        for pool_name, status in pool_status.items():
+            lines.append(f"{name}{format_labels((('pool', pool_name),))} {status[field]}")
+    lines.append(f"# TYPE {METRIC_PREFIX}_log_records_dropped counter")
+    lines.append(f"{METRIC_PREFIX}_log_records_dropped {dropped_records()}")
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+def require_profile_admin(x_profile: Optional[str] = Header(None)) -> None:
+    """Profiles reveal code paths and form contents, so they are only served with the admin token."""
+    if not PROFILING_ENABLED or not PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if x_profile is None or not hmac.compare_digest(x_profile.encode("latin-1"), PROFILE_ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Profiling admin token required in X-Profile")
+
+@app.get("/profiles/", dependencies=[Depends(require_profile_admin)])
+def list_profiles(route: Optional[str] = None, template_id: Optional[int] = None, limit: int = 100):
+    """List stored request profiles, newest first, optionally only those of one route or template."""
+    return profile_store.list(route, template_id, clamp_page_limit(limit))
+
+@app.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_admin)])
+def download_profile(profile_id: str):
+    """Download a profile as a pstats file, for snakeviz, flameprof or python -m pstats."""
+    path = profile_store.path_for(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
 
 # Root endpoint
 @app.get("/")
@@ -85,7 +274,7 @@ def read_root():
 
 # Tenant routes
 @app.post("/tenants/", response_model=dict)
-def create_tenant(tenant_data: dict, db: Session = Depends(get_db)):
+async def create_tenant(tenant_data: dict, db: AsyncSession = Depends(get_async_db)):
     """Create a new tenant."""
     db_tenant = tenant.Tenant(
         name=tenant_data.get("name"),
@@ -93,27 +282,26 @@ def create_tenant(tenant_data: dict, db: Session = Depends(get_db)):
         is_active=True
     )
     db.add(db_tenant)
-    db.commit()
-    db.refresh(db_tenant)
+    await db.commit()
+    await db.refresh(db_tenant)
     return {"id": db_tenant.id, "name": db_tenant.name, "slug": db_tenant.slug}
 
 @app.get("/tenants/")
-def get_tenants(db: Session = Depends(get_db)):
+async def get_tenants(db: AsyncSession = Depends(get_async_db)):
     """Get all tenants."""
-    tenants = db.query(tenant.Tenant).all()
+    tenants = (await db.scalars(select(tenant.Tenant))).all()
     return [{"id": t.id, "name": t.name, "slug": t.slug, "is_active": t.is_active} for t in tenants]
 
 # Client routes
 @app.post("/clients/", response_model=client_schema.Client, status_code=status.HTTP_201_CREATED)
-def create_client(client_data: client_schema.ClientCreate, tenant_id: Optional[int] = None, db: Session = Depends(get_db)):
+async def create_client(client_data: client_schema.ClientCreate, tenant_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
     """Create a new client."""
     # Check if client with same ID number exists in the same tenant
-    query = db.query(client.Client).filter(client.Client.id_number == client_data.id_number)
+    query = select(client.Client.id).where(client.Client.id_number == client_data.id_number)
     if tenant_id:
-        query = query.filter(client.Client.tenant_id == tenant_id)
+        query = query.where(client.Client.tenant_id == tenant_id)
     
-    db_client = query.first()
-    if db_client:
+    if await db.scalar(query.limit(1)) is not None:
         raise HTTPException(status_code=400, detail="Client with this ID number already exists")
     
     # Create client data dictionary
@@ -125,34 +313,95 @@ def create_client(client_data: client_schema.ClientCreate, tenant_id: Optional[i
     
     db_client = client.Client(**client_dict)
     db.add(db_client)
-    db.commit()
-    db.refresh(db_client)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request created the same client first (unique tenant_id, id_number)
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Client with this ID number already exists")
+    await db.refresh(db_client)
     return db_client
 
+@app.post("/clients/import", response_model=client_schema.ClientImportResult)
+async def import_clients(
+    request: Request,
+    format: Optional[str] = None,
+    tenant_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Create many clients from a CSV or NDJSON request body.
+    
+    The body is read as it arrives and inserted in batches. Rows that fail
+    validation or whose ID number the tenant already has (or that appears
+    earlier in the file) are skipped and reported with their row number.
+    The format is taken from the format parameter, else from Content-Type.
+    """
+    import_format = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    if import_format not in CLIENT_IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format: {import_format}")
+    
+    importer = ClientImporter(db, client.Client, client_schema.ClientCreate, tenant_id or None)
+    parse = iter_ndjson_records if import_format == "ndjson" else iter_csv_records
+    try:
+        async for row_number, record, parse_error in parse(request.stream()):
+            if importer.add(row_number, record, parse_error):
+                await run_in_threadpool(importer.flush)
+        await run_in_threadpool(importer.flush)
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        logger.error("Error importing clients: %s", e)
+        raise HTTPException(status_code=500, detail=f"Import stopped after {importer.imported} clients: {str(e)}")
+    
+    logger.info("Imported %d of %d clients", importer.imported, importer.total_rows)
+    return importer.result()
+
 @app.get("/clients/", response_model=List[client_schema.Client])
-def get_clients(skip: int = 0, limit: int = 100, tenant_id: Optional[int] = None, db: Session = Depends(get_db)):
-    """Get all clients, optionally filtered by tenant."""
-    query = db.query(client.Client)
+async def get_clients(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    tenant_id: Optional[int] = None,
+    search: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get clients ordered by id, a page at a time, optionally filtered by tenant.
+    
+    search matches the start of the last name, ID number or email. The total
+    is sent in X-Total-Count and the cursor of the next page, to pass as
+    after_id, in X-Next-Cursor.
+    """
+    query = select(client.Client)
     
     # Filter by tenant if specified
     if tenant_id:
-        query = query.filter(client.Client.tenant_id == tenant_id)
-        
-    clients = query.offset(skip).limit(limit).all()
+        query = query.where(client.Client.tenant_id == tenant_id)
+    
+    search = (search or "").strip()
+    if search:
+        query = query.where(or_(
+            prefix_filter(client.Client.last_name, search),
+            prefix_filter(client.Client.id_number, search, case_sensitive=True),
+            prefix_filter(client.Client.email, search)
+        ))
+    
+    clients, next_cursor = await keyset_page(db, query, client.Client.id, after_id, clamp_page_limit(limit))
+    set_page_headers(response, *await count_rows(db, query), next_cursor)
     return clients
 
 @app.get("/clients/{client_id}", response_model=client_schema.Client)
-def get_client(client_id: int, db: Session = Depends(get_db)):
+async def get_client(client_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific client by ID."""
-    db_client = db.query(client.Client).filter(client.Client.id == client_id).first()
+    db_client = await db.get(client.Client, client_id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     return db_client
 
 @app.put("/clients/{client_id}", response_model=client_schema.Client)
-def update_client(client_id: int, client_update: client_schema.ClientUpdate, db: Session = Depends(get_db)):
+async def update_client(client_id: int, client_update: client_schema.ClientUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update a client's information."""
-    db_client = db.query(client.Client).filter(client.Client.id == client_id).first()
+    db_client = await db.get(client.Client, client_id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -161,19 +410,19 @@ def update_client(client_id: int, client_update: client_schema.ClientUpdate, db:
     for key, value in update_data.items():
         setattr(db_client, key, value)
     
-    db.commit()
-    db.refresh(db_client)
+    await db.commit()
+    await db.refresh(db_client)
     return db_client
 
 @app.delete("/clients/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_client(client_id: int, db: Session = Depends(get_db)):
+async def delete_client(client_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a client."""
-    db_client = db.query(client.Client).filter(client.Client.id == client_id).first()
+    db_client = await db.get(client.Client, client_id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    db.delete(db_client)
-    db.commit()
+    await db.delete(db_client)
+    await db.commit()
     return {"ok": True}
 
 # PDF Template routes
@@ -192,197 +441,518 @@ async def create_pdf_template(
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
             
-        # Save the uploaded PDF
-        file_content = await file.read()
-        file_path = pdf_service.save_pdf_template(file_content, file.filename)
-        
-        # Extract form fields - handle any errors gracefully
+        # Stream the upload to disk in chunks and store it under its content hash;
+        # the file writes and hashing run in the threadpool, off the event loop
+        upload = await run_in_threadpool(pdf_service.open_template_upload)
         try:
-            form_fields = pdf_service.extract_form_fields(file_path)
-        except Exception as e:
-            print(f"Error extracting form fields: {e}")
-            form_fields = {}  # Use empty dict if extraction fails
+            while True:
+                chunk = await file.read(TEMPLATE_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await run_in_threadpool(upload.write, chunk)
+            file_path, content_hash = await run_in_threadpool(upload.commit)
+        finally:
+            await run_in_threadpool(upload.discard)
+        
+        # Identical content shares one analysis, so reuse it when another template has it
+        field_analysis = await run_in_threadpool(get_shared_field_analysis, content_hash, file_path, db)
+        if field_analysis is None:
+            field_analysis = await fill_engine.build_field_analysis(file_path)
         
         # Create template in database
         db_template = pdf_template.PDFTemplate(
             name=name,
             description=description,
             file_path=file_path,
+            content_hash=content_hash,
             field_mappings={},  # Initially empty, will be set through mapping endpoint
+            field_analysis=field_analysis,
+            analyzer_version=field_analysis["analyzer_version"],
             tenant_id=tenant_id
         )
-        
-        db.add(db_template)
-        db.commit()
-        db.refresh(db_template)
+        await compile_template_fill_plan(db_template, db)
+        await run_in_threadpool(save_row, db, db_template)
         
         return db_template
+    except TemplateTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidPDFError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in create_pdf_template: {e}")
-        if file_path and os.path.exists(file_path):
+        logger.exception("Error in create_pdf_template: %s", e)
+        # The stored file may belong to other templates with the same content
+        if file_path and await run_in_threadpool(count_template_references, file_path, db) == 0:
             try:
-                os.remove(file_path)
+                pdf_service.delete_template_file(file_path)
             except:
                 pass
         raise HTTPException(status_code=500, detail=f"Failed to process PDF template: {str(e)}")
 
 @app.get("/pdf-templates/", response_model=List[pdf_schema.PDFTemplate])
-def get_pdf_templates(skip: int = 0, limit: int = 100, tenant_id: Optional[int] = None, db: Session = Depends(get_db)):
-    """Get all PDF templates, optionally filtered by tenant."""
-    query = db.query(pdf_template.PDFTemplate)
+async def get_pdf_templates(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    tenant_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get PDF templates ordered by id, a page at a time, optionally filtered by tenant (see get_clients)."""
+    query = select(pdf_template.PDFTemplate)
     
     # Filter by tenant if specified
     if tenant_id:
-        query = query.filter(pdf_template.PDFTemplate.tenant_id == tenant_id)
-        
-    templates = query.offset(skip).limit(limit).all()
+        query = query.where(pdf_template.PDFTemplate.tenant_id == tenant_id)
+    
+    templates, next_cursor = await keyset_page(db, query, pdf_template.PDFTemplate.id, after_id, clamp_page_limit(limit))
+    set_page_headers(response, *await count_rows(db, query), next_cursor)
     return templates
 
 @app.get("/pdf-templates/{template_id}", response_model=pdf_schema.PDFTemplate)
-def get_pdf_template(template_id: int, db: Session = Depends(get_db)):
+async def get_pdf_template(template_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific PDF template by ID."""
-    db_template = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.id == template_id).first()
+    db_template = await db.get(pdf_template.PDFTemplate, template_id)
     if db_template is None:
         raise HTTPException(status_code=404, detail="PDF template not found")
     return db_template
 
 @app.get("/pdf-templates/{template_id}/fields")
-def get_pdf_template_fields(template_id: int, db: Session = Depends(get_db)):
+async def get_pdf_template_fields(template_id: int, db: Session = Depends(get_db)):
     """Get all form fields from a PDF template with categories and semantic groups."""
-    db_template = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.id == template_id).first()
-    if db_template is None:
-        raise HTTPException(status_code=404, detail="PDF template not found")
+    db_template = await run_in_threadpool(get_template, template_id, db)
     
-    # Extract fields with display names and semantic fingerprints
-    fields_with_display = pdf_service.extract_form_fields(db_template.file_path)
-    
-    # Get field categories
-    raw_fields = {field: "" for field in fields_with_display.keys()}
-    categories = pdf_service.categorize_fields(raw_fields)
-    
-    # Get semantic field groups
-    semantic_groups = pdf_service.get_similar_fields(db_template.file_path)
+    # Fields, categories and semantic groups were analyzed at upload time
+    field_analysis = await get_template_field_analysis(db_template, db)
     
     # Get current mappings
     current_mappings = db_template.field_mappings or {}
     
     # Create a response with fields, display names, categories, semantic groups and mappings
     response = {
-        "fields": fields_with_display,
-        "categories": categories,
-        "semantic_groups": semantic_groups,
+        "fields": field_analysis["fields"],
+        "categories": field_analysis["categories"],
+        "semantic_groups": field_analysis["semantic_groups"],
         "current_mappings": current_mappings
     }
     
     return response
 
 @app.put("/pdf-templates/{template_id}/mappings", response_model=pdf_schema.PDFTemplate)
-def update_field_mappings(template_id: int, mappings: pdf_schema.UpdateFieldMappings, db: Session = Depends(get_db)):
+async def update_field_mappings(template_id: int, mappings: pdf_schema.UpdateFieldMappings, db: Session = Depends(get_db)):
     """Update field mappings for a PDF template."""
-    db_template = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.id == template_id).first()
-    if db_template is None:
-        raise HTTPException(status_code=404, detail="PDF template not found")
+    db_template = await run_in_threadpool(get_template, template_id, db)
     
     db_template.field_mappings = mappings.mappings
-    db.commit()
-    db.refresh(db_template)
+    await compile_template_fill_plan(db_template, db)
+    await run_in_threadpool(save_row, db, db_template)
     return db_template
 
 @app.delete("/pdf-templates/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_pdf_template(template_id: int, db: Session = Depends(get_db)):
+async def delete_pdf_template(template_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a PDF template."""
-    db_template = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.id == template_id).first()
+    db_template = await db.get(pdf_template.PDFTemplate, template_id)
     if db_template is None:
         raise HTTPException(status_code=404, detail="PDF template not found")
     
-    # Delete the file
-    if os.path.exists(db_template.file_path):
-        os.remove(db_template.file_path)
+    file_path = db_template.file_path
+    content_hash = db_template.content_hash
+    await db.delete(db_template)
+    await db.commit()
     
-    db.delete(db_template)
-    db.commit()
+    # Templates with identical content share one file; remove it with the last reference
+    references = await db.run_sync(lambda sync_db: count_template_references(file_path, sync_db, content_hash))
+    if references == 0:
+        await asyncio.get_running_loop().run_in_executor(None, pdf_service.delete_template_file, file_path)
     return {"ok": True}
 
 # Generated PDF routes
+def get_client_and_template(client_id: int, template_id: int, db: Session):
+    """Load a client and template for PDF generation, checking they may be used together."""
+    db_client = db.query(client.Client).filter(client.Client.id == client_id).first()
+    if db_client is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    db_template = get_template(template_id, db)
+    
+    # Check if client and template belong to the same tenant if both have tenant_id
+    if db_client.tenant_id and db_template.tenant_id and db_client.tenant_id != db_template.tenant_id:
+        raise HTTPException(status_code=400, detail="Client and template belong to different tenants")
+    
+    return db_client, db_template
+
+def get_output_mode(db_template: pdf_template.PDFTemplate) -> str:
+    """Pick how new PDFs of a template are written (PDF_OUTPUT_MODE)."""
+    # Deltas and values need the template at a content-addressed path that outlives the fill
+    if PDF_OUTPUT_MODE in ("delta", "values") and not db_template.content_hash:
+        return "incremental"
+    return PDF_OUTPUT_MODE
+
+def get_storage(output_mode: str) -> str:
+    """Return the GeneratedPDF storage kind for an output mode."""
+    return output_mode if output_mode in ("delta", "values") else "file"
+
+async def render_generated_pdf(template_hash: str, field_values: Dict[str, str]) -> str:
+    """Return a rendered copy of a values-only PDF, rendering it into the render cache on a miss."""
+    key = render_cache.key_for(template_hash, field_values)
+    cached_path = render_cache.get(key)
+    if cached_path is not None:
+        return cached_path
+    
+    temp_path = render_cache.new_temp_path()
+    try:
+        await fill_engine.fill_pdf_form(
+            pdf_service.template_path_for_hash(template_hash),
+            temp_path,
+            field_values,
+            "incremental"
+        )
+        return render_cache.put(key, temp_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+async def get_generated_pdf_sources(db_generated_pdf: pdf_template.GeneratedPDF) -> List[str]:
+    """Return the files whose concatenated contents make up a generated PDF."""
+    if db_generated_pdf.storage == "values":
+        return [await render_generated_pdf(db_generated_pdf.template_hash, db_generated_pdf.field_values)]
+    if db_generated_pdf.storage == "delta":
+        return [pdf_service.template_path_for_hash(db_generated_pdf.template_hash), db_generated_pdf.file_path]
+    return [db_generated_pdf.file_path]
+
+def get_generated_pdf_filename(db_generated_pdf: pdf_template.GeneratedPDF) -> str:
+    """Return the download name of a generated PDF."""
+    if db_generated_pdf.file_path is None:
+        return f"generated_{db_generated_pdf.id}.pdf"
+    return os.path.splitext(os.path.basename(db_generated_pdf.file_path))[0] + ".pdf"
+
+async def create_generated_pdf(client_id: int, template_id: int, db: Session) -> pdf_template.GeneratedPDF:
+    """Fill a template for a client and record the generated PDF."""
+    db_client, db_template = await run_in_threadpool(get_client_and_template, client_id, template_id, db)
+    profiling.annotate(template_id=db_template.id)
+    
+    # The fill plan is compiled per template, so only the client's values are looked up here
+    fill_plan = await get_template_fill_plan(db_template, db)
+    field_data = fill_plan.field_data_for_row(db_client)
+    logger.debug("Fill plan for template %s: %d fields", db_template.id, len(fill_plan))
+    
+    output_mode = get_output_mode(db_template)
+    template_path = db_template.file_path
+    template_hash = db_template.content_hash
+    # Return the connection to the pool during the fill; the insert below checks out a new one
+    await run_in_threadpool(db.commit)
+    
+    output_path = None
+    if output_mode != "values":
+        # Fill in a worker process so the API process stays responsive
+        output_path = await fill_engine.fill_pdf_form(
+            template_path,
+            pdf_service.new_output_path(output_mode),
+            field_data,
+            output_mode
+        )
+    
+    # Create record in database
+    db_generated_pdf = pdf_template.GeneratedPDF(
+        file_path=output_path,
+        storage=get_storage(output_mode),
+        template_hash=template_hash,
+        # In values mode the PDF is rendered from these when downloaded
+        field_values=field_data if output_mode == "values" else None,
+        client_id=client_id,
+        template_id=template_id
+    )
+    await run_in_threadpool(save_row, db, db_generated_pdf)
+    
+    return db_generated_pdf
+
+async def process_pdf_job(db: Session, job: pdf_template.PDFGenerationJob) -> int:
+    """Job queue handler: generate the PDF requested by a queued job."""
+    db_generated_pdf = await create_generated_pdf(job.client_id, job.template_id, db)
+    return db_generated_pdf.id
+
+# Database-backed queue for asynchronous generation (JOB_QUEUE_WORKERS, JOB_QUEUE_POLL_INTERVAL)
+pdf_job_queue = PDFJobQueue(SessionLocal, pdf_template.PDFGenerationJob, process_pdf_job)
+
 @app.post("/generate-pdf/", response_model=pdf_schema.GeneratedPDF)
-def generate_pdf(
+async def generate_pdf(
     pdf_request: pdf_schema.GeneratedPDFCreate,
+    async_mode: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Generate a filled PDF for a client using a template with intelligent semantic field mapping."""
+    """
+    Generate a filled PDF for a client using a template with intelligent semantic field mapping.
+    
+    With async_mode the request is queued and answered with 202 and a job id to poll at /jobs/{job_id}.
+    """
     try:
-        # Get the client and template
-        db_client = db.query(client.Client).filter(client.Client.id == pdf_request.client_id).first()
-        if db_client is None:
-            raise HTTPException(status_code=404, detail="Client not found")
+        if async_mode:
+            # Fail fast on bad ids instead of queueing a job that can only fail
+            await run_in_threadpool(get_client_and_template, pdf_request.client_id, pdf_request.template_id, db)
+            job = await pdf_job_queue.enqueue(db, pdf_request.client_id, pdf_request.template_id)
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"job_id": job.id, "status": job.status}
+            )
         
-        db_template = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.id == pdf_request.template_id).first()
-        if db_template is None:
-            raise HTTPException(status_code=404, detail="PDF template not found")
-        
-        # Check if client and template belong to the same tenant if both have tenant_id
+        return await create_generated_pdf(pdf_request.client_id, pdf_request.template_id, db)
+    except HTTPException:
+        raise
+    except FillEngineTimeout as e:
+        logger.warning("Timed out generating PDF: %s", e)
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.exception("Error generating PDF: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
+
+@app.get("/jobs/{job_id}", response_model=pdf_schema.PDFGenerationJob)
+async def get_pdf_job(job_id: str, db: Session = Depends(get_db)):
+    """Get the status of a queued PDF generation job."""
+    db_job = await run_in_threadpool(
+        db.query(pdf_template.PDFGenerationJob).filter(pdf_template.PDFGenerationJob.id == job_id).first
+    )
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@app.post("/generate-pdf/batch", response_model=pdf_schema.BatchGeneratePDFResponse)
+async def generate_pdf_batch(
+    batch_request: pdf_schema.BatchGeneratePDFRequest,
+    db: Session = Depends(get_db)
+):
+    """Generate filled PDFs of one template for many clients, parsing the template only once."""
+    if batch_request.client_ids is None and batch_request.tenant_id is None:
+        raise HTTPException(status_code=400, detail="Either client_ids or tenant_id is required")
+    
+    db_template = await run_in_threadpool(get_template, batch_request.template_id, db)
+    profiling.annotate(template_id=db_template.id)
+    
+    fill_plan = await get_template_fill_plan(db_template, db)
+    output_mode = get_output_mode(db_template)
+    
+    # Fetch all clients in a single query
+    query = db.query(client.Client)
+    if batch_request.client_ids is not None:
+        query = query.filter(client.Client.id.in_(batch_request.client_ids))
+    if batch_request.tenant_id is not None:
+        query = query.filter(client.Client.tenant_id == batch_request.tenant_id)
+    clients_by_id = {db_client.id: db_client for db_client in await run_in_threadpool(query.all)}
+    
+    # Duplicate ids in the request map to a single result
+    client_ids = list(dict.fromkeys(batch_request.client_ids)) if batch_request.client_ids is not None else sorted(clients_by_id)
+    results = {}
+    jobs = []
+    job_client_ids = []
+    for client_id in client_ids:
+        db_client = clients_by_id.get(client_id)
+        if db_client is None:
+            results[client_id] = pdf_schema.BatchGeneratedPDFResult(client_id=client_id, status="failed", error="Client not found")
+            continue
         if db_client.tenant_id and db_template.tenant_id and db_client.tenant_id != db_template.tenant_id:
-            raise HTTPException(status_code=400, detail="Client and template belong to different tenants")
-        
-        # Convert client to dictionary in a more robust way
-        client_data = {}
-        for column in client.Client.__table__.columns:
-            attr_name = column.name
-            if hasattr(db_client, attr_name):
-                client_data[attr_name] = getattr(db_client, attr_name)
-        
-        # Log the client data for debugging
-        print(f"Client data keys: {list(client_data.keys())}")
-        
-        # Get the template's explicit field mappings
-        template_mappings = db_template.field_mappings or {}
-        print(f"Template explicit mappings: {template_mappings}")
-        
-        # Get semantic field information to enhance the mapping process
-        form_fields = pdf_service.extract_form_fields(db_template.file_path)
-        semantic_groups = pdf_service.get_similar_fields(db_template.file_path)
-        
-        print(f"Semantic field groups found: {len(semantic_groups)} groups")
-        for semantic_type, fields in semantic_groups.items():
-            print(f"  - {semantic_type}: {len(fields)} fields")
-        
-        # Generate filled PDF with intelligent field mapping
-        output_path = pdf_service.generate_filled_pdf(
-            db_template.file_path,
-            client_data,
-            template_mappings
-        )
-        
-        # Create record in database
-        db_generated_pdf = pdf_template.GeneratedPDF(
+            results[client_id] = pdf_schema.BatchGeneratedPDFResult(client_id=client_id, status="failed", error="Client and template belong to different tenants")
+            continue
+        output_path = pdf_service.new_output_path(output_mode) if output_mode != "values" else None
+        jobs.append((output_path, fill_plan.field_data_for_row(db_client)))
+        job_client_ids.append(client_id)
+    
+    template_id = db_template.id
+    template_path = db_template.file_path
+    template_hash = db_template.content_hash
+    # Return the connection to the pool while the batch fills
+    await run_in_threadpool(db.commit)
+    
+    if output_mode == "values":
+        # Nothing is rendered now; each row keeps its values until it is downloaded
+        output_paths = [None] * len(jobs)
+    else:
+        logger.info("Batch: filling template %s for %d clients", template_id, len(jobs))
+        output_paths = await fill_engine.fill_batch(template_path, jobs, batch_request.workers, output_mode) if jobs else []
+    
+    # Record every generated PDF in one bulk insert
+    generated_pdfs = []
+    for client_id, (_, field_data), output_path in zip(job_client_ids, jobs, output_paths):
+        if output_path is None and output_mode != "values":
+            results[client_id] = pdf_schema.BatchGeneratedPDFResult(client_id=client_id, status="failed", error="Error generating PDF")
+            continue
+        generated_pdfs.append(pdf_template.GeneratedPDF(
             file_path=output_path,
-            client_id=pdf_request.client_id,
-            template_id=pdf_request.template_id
+            storage=get_storage(output_mode),
+            template_hash=template_hash,
+            field_values=field_data if output_mode == "values" else None,
+            client_id=client_id,
+            template_id=template_id
+        ))
+    db.add_all(generated_pdfs)
+    await run_in_threadpool(db.commit)
+    
+    for db_generated_pdf in generated_pdfs:
+        results[db_generated_pdf.client_id] = pdf_schema.BatchGeneratedPDFResult(
+            client_id=db_generated_pdf.client_id,
+            status="completed",
+            generated_pdf_id=db_generated_pdf.id,
+            file_path=db_generated_pdf.file_path
         )
-        
-        db.add(db_generated_pdf)
-        db.commit()
-        db.refresh(db_generated_pdf)
-        
-        return db_generated_pdf
-    except Exception as e:
-        print(f"Error generating PDF: {e}")
-        raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
+    
+    ordered_results = [results[client_id] for client_id in client_ids]
+    succeeded = sum(1 for result in ordered_results if result.status == "completed")
+    return pdf_schema.BatchGeneratePDFResponse(
+        template_id=template_id,
+        total=len(ordered_results),
+        succeeded=succeeded,
+        failed=len(ordered_results) - succeeded,
+        results=ordered_results
+    )
+
+@app.post("/generate-pdf/export")
+async def export_generated_pdfs(export_request: pdf_schema.ExportGeneratedPDFsRequest, db: Session = Depends(get_db)):
+    """Stream a ZIP archive of generated PDFs selected by id or by client, template and date."""
+    criteria = export_request.model_dump(exclude_none=True)
+    if not criteria:
+        raise HTTPException(status_code=400, detail="At least one selection criterion is required")
+    
+    GeneratedPDF = pdf_template.GeneratedPDF
+    # Only the rows are loaded; file contents are read while streaming
+    query = db.query(GeneratedPDF)
+    if export_request.ids is not None:
+        query = query.filter(GeneratedPDF.id.in_(export_request.ids))
+    if export_request.client_id is not None:
+        query = query.filter(GeneratedPDF.client_id == export_request.client_id)
+    if export_request.template_id is not None:
+        query = query.filter(GeneratedPDF.template_id == export_request.template_id)
+    if export_request.created_from is not None:
+        query = query.filter(GeneratedPDF.created_at >= export_request.created_from)
+    if export_request.created_to is not None:
+        query = query.filter(GeneratedPDF.created_at <= export_request.created_to)
+    
+    generated_pdfs = await run_in_threadpool(query.order_by(GeneratedPDF.id).all)
+    if not generated_pdfs:
+        raise HTTPException(status_code=404, detail="No generated PDFs match the selection")
+    
+    loop = asyncio.get_running_loop()
+    
+    def export_entries():
+        # Iterated in Starlette's threadpool, so values-only PDFs are rendered
+        # on the event loop one at a time as the archive reaches them
+        for db_generated_pdf in generated_pdfs:
+            try:
+                sources = asyncio.run_coroutine_threadsafe(get_generated_pdf_sources(db_generated_pdf), loop).result()
+            except Exception as e:
+                logger.warning("Skipping generated PDF %s in ZIP export: %s", db_generated_pdf.id, e)
+                continue
+            yield (f"{db_generated_pdf.id}_{get_generated_pdf_filename(db_generated_pdf)}", sources)
+    
+    filename = f"generated_pdfs_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_zip(export_entries()),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.get("/generate-pdf/{generated_pdf_id}")
-def download_generated_pdf(generated_pdf_id: int, db: Session = Depends(get_db)):
-    """Download a generated PDF file."""
-    db_generated_pdf = db.query(pdf_template.GeneratedPDF).filter(pdf_template.GeneratedPDF.id == generated_pdf_id).first()
+async def download_generated_pdf(generated_pdf_id: int, request: Request, db: Session = Depends(get_db)):
+    """Download a generated PDF file, rendering it first if only its field values are stored."""
+    db_generated_pdf = await run_in_threadpool(
+        db.query(pdf_template.GeneratedPDF).filter(pdf_template.GeneratedPDF.id == generated_pdf_id).first
+    )
     if db_generated_pdf is None:
         raise HTTPException(status_code=404, detail="Generated PDF not found")
+    profiling.annotate(template_id=db_generated_pdf.template_id)
+    
+    if db_generated_pdf.storage in ("delta", "values") and not os.path.exists(pdf_service.template_path_for_hash(db_generated_pdf.template_hash)):
+        raise HTTPException(status_code=404, detail="PDF template file not found")
     
-    if not os.path.exists(db_generated_pdf.file_path):
+    try:
+        sources = await get_generated_pdf_sources(db_generated_pdf)
+    except FillEngineTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    if not all(os.path.exists(path) for path in sources):
         raise HTTPException(status_code=404, detail="PDF file not found")
     
-    return FileResponse(
-        db_generated_pdf.file_path, 
-        filename=os.path.basename(db_generated_pdf.file_path),
-        media_type="application/pdf"
+    if len(sources) > 1 and accel_redirect_uri(sources[-1]) is not None:
+        # nginx can only hand off whole files, so the delta is assembled once into the render cache
+        sources = [await assemble_generated_pdf(db_generated_pdf.template_hash, sources)]
+    
+    return await pdf_file_response(request, sources, get_generated_pdf_filename(db_generated_pdf))
+
+@app.get("/downloads/{filename}")
+async def download_generated_file(filename: str, request: Request):
+    """Download a rendered PDF from the generated PDFs directory by name."""
+    path = os.path.join("./data/generated_pdfs", filename)
+    # Deltas are only usable appended to their template, see GET /generate-pdf/{id}
+    if filename != os.path.basename(filename) or filename.startswith(".") or not filename.endswith(".pdf") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return await pdf_file_response(request, [path], filename)
+
+async def assemble_generated_pdf(template_hash: str, sources: List[str]) -> str:
+    """Concatenate a template and a stored delta into a render cache file and return its path."""
+    key = render_cache.key_for(template_hash, {"delta": os.path.basename(sources[-1])}, kind="delta")
+    cached_path = render_cache.get(key)
+    if cached_path is not None:
+        return cached_path
+    
+    temp_path = render_cache.new_temp_path()
+    
+    def assemble():
+        with open(temp_path, "wb") as target:
+            for chunk in stream_files(sources):
+                target.write(chunk)
+    
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, assemble)
+        return render_cache.put(key, temp_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+async def pdf_file_response(request: Request, sources: List[str], filename: str) -> Response:
+    """
+    Answer a download of the concatenated contents of sources.
+    
+    Sends a strong ETag derived from the content, answers If-None-Match with
+    304 and a single byte range with 206. With DOWNLOAD_ACCEL_REDIRECT set,
+    the bytes of a single file are left to nginx via X-Accel-Redirect.
+    """
+    # Hashing may read the file once per process, so it stays off the event loop
+    etag = await asyncio.get_running_loop().run_in_executor(None, content_etag, sources)
+    cache_headers = {"ETag": etag, "Cache-Control": DOWNLOAD_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    
+    headers = {
+        **cache_headers,
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Accept-Ranges": "bytes"
+    }
+    accel_uri = accel_redirect_uri(sources[0]) if len(sources) == 1 else None
+    if accel_uri is not None:
+        # nginx serves the file itself, including Range requests
+        return Response(media_type="application/pdf", headers={**headers, "X-Accel-Redirect": accel_uri})
+    
+    if len(sources) == 1:
+        # FileResponse handles Range and If-Range itself
+        return FileResponse(sources[0], filename=filename, media_type="application/pdf", headers=cache_headers)
+    
+    # A delta is served as the template's bytes followed by the stored update
+    size = sum(os.path.getsize(path) for path in sources)
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = parse_byte_range(request.headers.get("range"), size) if if_range in (None, etag) else None
+    except RangeNotSatisfiable:
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers={"Content-Range": f"bytes */{size}"})
+    
+    if byte_range is None:
+        return StreamingResponse(
+            stream_files(sources),
+            media_type="application/pdf",
+            headers={**headers, "Content-Length": str(size)}
+        )
+    
+    start, end = byte_range
+    return StreamingResponse(
+        stream_file_range(sources, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type="application/pdf",
+        headers={**headers, "Content-Length": str(end - start + 1), "Content-Range": f"bytes {start}-{end}/{size}"}
     )
 
 if __name__ == "__main__":
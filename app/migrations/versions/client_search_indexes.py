@@ -0,0 +1,49 @@
+"""add prefix search indexes on clients
+
+Revision ID: client_search_indexes
+Revises: generated_pdf_values
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'client_search_indexes'
+down_revision = 'generated_pdf_values'
+branch_labels = None
+depends_on = None
+
+# text_pattern_ops lets LIKE 'prefix%' use the index whatever the collation;
+# names and emails are searched case-insensitively through lower()
+INDEXES = [
+    ('ix_clients_last_name_prefix', [sa.text('lower(last_name) text_pattern_ops')]),
+    ('ix_clients_id_number_prefix', [sa.text('id_number text_pattern_ops')]),
+    ('ix_clients_email_prefix', [sa.text('lower(email) text_pattern_ops')]),
+]
+
+
+def drop_invalid_index(name: str) -> None:
+    """Drop the index a failed concurrent build left INVALID, which IF NOT EXISTS would keep."""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid) AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.drop_index(name, table_name='clients', postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    # Built concurrently so the clients table stays writable while the indexes are created
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            drop_invalid_index(name)
+            op.create_index(name, 'clients', columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='clients', postgresql_concurrently=True, if_exists=True)
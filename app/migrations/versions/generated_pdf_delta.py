@@ -0,0 +1,28 @@
+"""store generated pdfs as template deltas
+
+Revision ID: generated_pdf_delta
+Revises: template_content_hash
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'generated_pdf_delta'
+down_revision = 'template_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing generated PDFs are complete files
+    op.add_column('generated_pdfs', sa.Column('storage', sa.String(), nullable=True, server_default='file'))
+    op.add_column('generated_pdfs', sa.Column('template_hash', sa.String(), nullable=True))
+    op.create_index(op.f('ix_generated_pdfs_template_hash'), 'generated_pdfs', ['template_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_generated_pdfs_template_hash'), table_name='generated_pdfs')
+    op.drop_column('generated_pdfs', 'template_hash')
+    op.drop_column('generated_pdfs', 'storage')
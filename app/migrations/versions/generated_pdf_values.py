@@ -0,0 +1,24 @@
+"""store generated pdfs as field values
+
+Revision ID: generated_pdf_values
+Revises: generated_pdf_delta
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'generated_pdf_values'
+down_revision = 'generated_pdf_delta'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('generated_pdfs', sa.Column('field_values', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('generated_pdfs', 'field_values')
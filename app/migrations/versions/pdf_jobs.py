@@ -0,0 +1,43 @@
+"""add pdf generation job queue
+
+Revision ID: pdf_jobs
+Revises: template_fill_plan
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'pdf_jobs'
+down_revision = 'template_fill_plan'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'pdf_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('client_id', sa.Integer(), nullable=True),
+        sa.Column('template_id', sa.Integer(), nullable=True),
+        sa.Column('generated_pdf_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+        sa.ForeignKeyConstraint(['template_id'], ['pdf_templates.id'], ),
+        sa.ForeignKeyConstraint(['generated_pdf_id'], ['generated_pdfs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_pdf_jobs_status'), 'pdf_jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_pdf_jobs_created_at'), 'pdf_jobs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pdf_jobs_created_at'), table_name='pdf_jobs')
+    op.drop_index(op.f('ix_pdf_jobs_status'), table_name='pdf_jobs')
+    op.drop_table('pdf_jobs')
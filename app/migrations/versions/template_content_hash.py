@@ -0,0 +1,26 @@
+"""store template content hash
+
+Revision ID: template_content_hash
+Revises: pdf_jobs
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'template_content_hash'
+down_revision = 'pdf_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing templates keep their files until utils/dedupe_templates.py moves them
+    op.add_column('pdf_templates', sa.Column('content_hash', sa.String(), nullable=True))
+    op.create_index(op.f('ix_pdf_templates_content_hash'), 'pdf_templates', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pdf_templates_content_hash'), table_name='pdf_templates')
+    op.drop_column('pdf_templates', 'content_hash')
@@ -0,0 +1,29 @@
+"""store template field analysis
+
+Revision ID: template_field_analysis
+Revises: init_schema
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'template_field_analysis'
+down_revision = 'init_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing templates start without an analysis and are analyzed on first use
+    op.add_column('pdf_templates', sa.Column('field_analysis', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.add_column('pdf_templates', sa.Column('analyzer_version', sa.String(), nullable=True))
+    op.create_index(op.f('ix_pdf_templates_analyzer_version'), 'pdf_templates', ['analyzer_version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pdf_templates_analyzer_version'), table_name='pdf_templates')
+    op.drop_column('pdf_templates', 'analyzer_version')
+    op.drop_column('pdf_templates', 'field_analysis')
@@ -0,0 +1,25 @@
+"""store compiled template fill plan
+
+Revision ID: template_fill_plan
+Revises: template_field_analysis
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'template_fill_plan'
+down_revision = 'template_field_analysis'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Plans are compiled lazily for existing templates on their next fill
+    op.add_column('pdf_templates', sa.Column('fill_plan', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('pdf_templates', 'fill_plan')
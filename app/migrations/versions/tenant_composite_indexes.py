@@ -0,0 +1,59 @@
+"""add composite tenant-scoped indexes
+
+Revision ID: tenant_composite_indexes
+Revises: client_search_indexes
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'tenant_composite_indexes'
+down_revision = 'client_search_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_clients_tenant_id_id_number', 'clients', ['tenant_id', 'id_number'], True),
+    ('ix_clients_tenant_id_last_name_first_name', 'clients', ['tenant_id', 'last_name', 'first_name'], False),
+    ('ix_pdf_templates_tenant_id', 'pdf_templates', ['tenant_id'], False),
+    ('ix_generated_pdfs_template_id_created_at', 'generated_pdfs', ['template_id', 'created_at'], False),
+    ('ix_generated_pdfs_client_id_created_at', 'generated_pdfs', ['client_id', 'created_at'], False),
+]
+
+
+def drop_invalid_index(name: str, table: str) -> None:
+    """Drop the index a failed concurrent build left INVALID, which IF NOT EXISTS would keep."""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid) AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text(
+            "SELECT tenant_id, id_number, count(*) FROM clients "
+            "WHERE tenant_id IS NOT NULL GROUP BY tenant_id, id_number HAVING count(*) > 1 LIMIT 10"
+        )).fetchall()
+        if duplicates:
+            listed = ", ".join(f"tenant {tenant_id} ID number {id_number} ({count} rows)" for tenant_id, id_number, count in duplicates)
+            raise RuntimeError(f"Merge or remove duplicate clients before upgrading: {listed}")
+
+    # Built concurrently so large tables stay writable while the indexes are created
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            # A unique index left invalid would not enforce uniqueness
+            drop_invalid_index(name, table)
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
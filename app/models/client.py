@@ -1,10 +1,15 @@
-from sqlalchemy import Boolean, Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from .database import Base
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # ID numbers are unique within a tenant; list queries filter by tenant and sort by name
+        Index("ix_clients_tenant_id_id_number", "tenant_id", "id_number", unique=True),
+        Index("ix_clients_tenant_id_last_name_first_name", "tenant_id", "last_name", "first_name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, index=True)
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import threading
+import time
 
 # PostgreSQL configuration from environment variables with defaults
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -10,12 +14,138 @@ DB_USER = os.getenv("DB_USER", "documantis")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "documantis")
 DB_NAME = os.getenv("DB_NAME", "documantis")
 
-# PostgreSQL connection string
-SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Connection pool settings can be tuned per deployment
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this are replaced, before server or proxy idle timeouts drop them
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# PostgreSQL connection strings; CRUD endpoints use the asyncpg driver, everything else psycopg2.
+# DATABASE_URL replaces them, e.g. with a SQLite file for load tests (async engine via aiosqlite)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Drivers used by the async engine for each sync URL scheme
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+ASYNC_SQLALCHEMY_DATABASE_URL = ASYNC_DRIVERS[SQLALCHEMY_DATABASE_URL.split(":", 1)[0]] + ":" + SQLALCHEMY_DATABASE_URL.split(":", 1)[1]
+
+
+class PoolStats:
+    """Counters describing how requests use the connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _WaitTimingPool:
+    """Pool mixin that records how long each checkout waited for a connection."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = True
+        try:
+            connection = super()._do_get()
+            timed_out = False
+            return connection
+        finally:
+            self.stats.record_wait(time.perf_counter() - started, timed_out)
+
+
+class InstrumentedQueuePool(_WaitTimingPool, QueuePool):
+    stats = pool_stats
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingPool, AsyncAdaptedQueuePool):
+    stats = async_pool_stats
+
+
+def _count_pool_events(engine, stats: PoolStats) -> None:
+    event.listen(engine, "checkout", lambda *args: stats.increment("checkouts"))
+    event.listen(engine, "checkin", lambda *args: stats.increment("checkins"))
+    event.listen(engine, "connect", lambda *args: stats.increment("connects"))
+    event.listen(engine, "invalidate", lambda *args: stats.increment("invalidations"))
+
+
+# Both engines use the same pool settings, so each process holds up to twice DB_POOL_SIZE + DB_MAX_OVERFLOW
+_pool_settings = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+# PostgreSQL needs no connect_args; SQLite connections are shared between threads and wait on locks
+_connect_args = {"check_same_thread": False, "timeout": 30} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, connect_args=_connect_args, **_pool_settings)
+# Loaded rows stay readable after commit too: async handlers commit in the threadpool, then read them on the event loop
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+_count_pool_events(engine, pool_stats)
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, connect_args=_connect_args, **_pool_settings
+)
+# Loaded rows stay readable after commit, since async sessions can't lazy-load them again
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+_count_pool_events(async_engine.sync_engine, async_pool_stats)
+
+
+def _pool_status(pool, stats: PoolStats) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": DB_MAX_OVERFLOW,
+        **stats.snapshot(),
+    }
+
+
+def get_pool_status() -> dict:
+    """Return each pool's configuration, current occupancy and usage counters."""
+    return {
+        "sync": _pool_status(engine.pool, pool_stats),
+        "async": _pool_status(async_engine.pool, async_pool_stats),
+    }
 
-# Create engine (no connect_args needed for PostgreSQL)
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -26,3 +156,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 import datetime
 
@@ -11,16 +11,25 @@ class PDFTemplate(Base):
     name = Column(String, index=True)
     description = Column(String, nullable=True)
     file_path = Column(String)
+    # SHA-256 of the file; templates with identical content share one stored file
+    content_hash = Column(String, nullable=True, index=True)
     
     # Store field mappings as JSON
     field_mappings = Column(JSON, default={})
     
+    # Field analysis computed at upload time (fields, fingerprints, categories, semantic groups)
+    field_analysis = Column(JSON, nullable=True)
+    analyzer_version = Column(String, nullable=True, index=True)
+    
+    # Compiled pdf_field -> client_field fill plan, rebuilt when mappings or analysis change
+    fill_plan = Column(JSON, nullable=True)
+    
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     is_active = Column(Boolean, default=True)
     
     # Tenant relationship
-    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=True)  # Nullable for backward compatibility
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=True, index=True)  # Nullable for backward compatibility
     tenant = relationship("Tenant", back_populates="templates")
     
     # Relationship with generated PDFs
@@ -31,10 +40,22 @@ class PDFTemplate(Base):
 
 class GeneratedPDF(Base):
     __tablename__ = "generated_pdfs"
+    __table_args__ = (
+        # Generated PDFs are listed and exported per template or client, newest first
+        Index("ix_generated_pdfs_template_id_created_at", "template_id", "created_at"),
+        Index("ix_generated_pdfs_client_id_created_at", "client_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     file_path = Column(String)
     
+    # "file" for a complete PDF, "delta" for an incremental update served after the template's bytes,
+    # "values" when only the field values are stored and the PDF is rendered on download
+    storage = Column(String, default="file")
+    # Content hash of the template the PDF was filled from
+    template_hash = Column(String, nullable=True, index=True)
+    field_values = Column(JSON, nullable=True)
+    
     # Foreign keys
     client_id = Column(Integer, ForeignKey("clients.id"))
     template_id = Column(Integer, ForeignKey("pdf_templates.id"))
@@ -47,3 +68,26 @@ class GeneratedPDF(Base):
     
     def __repr__(self):
         return f"<GeneratedPDF(id={self.id}, client_id={self.client_id}, template_id={self.template_id})>"
+
+class PDFGenerationJob(Base):
+    """A queued request to generate a PDF, processed by the job queue workers."""
+    __tablename__ = "pdf_jobs"
+    
+    id = Column(String, primary_key=True)
+    status = Column(String, index=True, default="queued")  # queued, running, completed, failed
+    
+    # Foreign keys
+    client_id = Column(Integer, ForeignKey("clients.id"))
+    template_id = Column(Integer, ForeignKey("pdf_templates.id"))
+    generated_pdf_id = Column(Integer, ForeignKey("generated_pdfs.id"), nullable=True)
+    
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<PDFGenerationJob(id={self.id}, status='{self.status}')>"
+
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 class ClientBase(BaseModel):
@@ -63,3 +63,16 @@ class Client(ClientBase):
     model_config = {
         "from_attributes": True
     }
+
+class ClientImportRowError(BaseModel):
+    row: int
+    id_number: Optional[str] = None
+    errors: List[str]
+
+class ClientImportResult(BaseModel):
+    total_rows: int
+    imported: int
+    duplicates: int
+    invalid: int
+    errors: List[ClientImportRowError]
+    errors_truncated: bool
@@ -35,15 +35,62 @@ class GeneratedPDFCreate(BaseModel):
 
 class GeneratedPDF(BaseModel):
     id: int
-    file_path: str
+    file_path: Optional[str] = None
+    storage: Optional[str] = None
+    client_id: int
+    template_id: int
+    created_at: datetime
+    
+    model_config = {
+        "from_attributes": True
+    }
+
+class PDFGenerationJob(BaseModel):
+    id: str
+    status: str
     client_id: int
     template_id: int
+    generated_pdf_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int
     created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     
     model_config = {
         "from_attributes": True
     }
 
+class BatchGeneratePDFRequest(BaseModel):
+    """Fill one template for many clients, given by id or by tenant"""
+    template_id: int
+    client_ids: Optional[List[int]] = None
+    tenant_id: Optional[int] = None
+    # Optional cap on how many fills of this batch run in parallel
+    workers: Optional[int] = None
+
+class BatchGeneratedPDFResult(BaseModel):
+    client_id: int
+    status: str
+    generated_pdf_id: Optional[int] = None
+    file_path: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchGeneratePDFResponse(BaseModel):
+    template_id: int
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchGeneratedPDFResult]
+
+class ExportGeneratedPDFsRequest(BaseModel):
+    """Select generated PDFs for a ZIP export, by id or by filter"""
+    ids: Optional[List[int]] = None
+    client_id: Optional[int] = None
+    template_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
 class PDFField(BaseModel):
     name: str
     type: str
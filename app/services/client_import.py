@@ -0,0 +1,254 @@
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+# Import settings can be tuned per deployment
+CLIENT_IMPORT_BATCH_SIZE = int(os.getenv("CLIENT_IMPORT_BATCH_SIZE", "1000"))
+# Row errors listed in the report; the counts always cover every row
+CLIENT_IMPORT_MAX_ERRORS = int(os.getenv("CLIENT_IMPORT_MAX_ERRORS", "1000"))
+
+CLIENT_IMPORT_FORMATS = ("csv", "ndjson")
+
+# (row number, parsed record or None, parse error or None)
+ImportRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream as UTF-8 and yield it line by line, line endings included."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        # Only \n ends a line (\r\n stays together); str.splitlines would also split
+        # values at characters such as \x0c, \x85 or U+2028
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """
+    Parse a CSV stream whose first row names the columns.
+
+    Quoted values may span lines: a record ends at the first line break after
+    an even number of quote characters, as RFC 4180 quoting guarantees.
+    """
+    header: Optional[List[str]] = None
+    record_lines: List[str] = []
+    quotes = 0
+    row_number = 0
+    async for line in _iter_lines(chunks):
+        record_lines.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text = "".join(record_lines)
+        record_lines, quotes = [], 0
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, found {len(values)}"
+            continue
+        yield row_number, dict(zip(header, values)), None
+
+    if record_lines and "".join(record_lines).strip():
+        yield row_number + 1, None, "Unterminated quoted value"
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """Parse a stream with one JSON object per line."""
+    row_number = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, record, None
+
+
+class ClientImporter:
+    """
+    Validates imported client rows and inserts them a batch at a time.
+
+    On PostgreSQL each batch is copied into a temporary staging table with
+    COPY and moved into clients with one INSERT ... SELECT that skips ID
+    numbers the tenant already has, so a batch costs a few round trips
+    however many rows it holds. Other databases get an equivalent bulk
+    INSERT after a single lookup of existing ID numbers.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        client_model: Any,
+        client_schema: Type[BaseModel],
+        tenant_id: Optional[int] = None,
+        batch_size: int = CLIENT_IMPORT_BATCH_SIZE,
+        max_errors: int = CLIENT_IMPORT_MAX_ERRORS,
+    ):
+        self.db = db
+        self.client_model = client_model
+        self.client_schema = client_schema
+        self.tenant_id = tenant_id
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.columns = list(client_schema.model_fields)
+        self._batch: List[Tuple[int, Dict[str, Any]]] = []
+        self.total_rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add(self, row_number: int, record: Optional[Dict[str, Any]], parse_error: Optional[str] = None) -> bool:
+        """
+        Validate one row and queue it for the next batch.
+
+        Returns:
+            True when the batch is full and flush should be called
+        """
+        self.total_rows += 1
+        if parse_error is not None:
+            self._row_error(row_number, None, [parse_error])
+            return False
+
+        # Empty CSV cells mean "not given", so optional fields stay null
+        values = {key: (None if value == "" else value) for key, value in record.items()}
+        try:
+            client = self.client_schema(**values)
+        except ValidationError as e:
+            messages = [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+            self._row_error(row_number, values.get("id_number"), messages)
+            return False
+
+        self._batch.append((row_number, client.model_dump()))
+        return len(self._batch) >= self.batch_size
+
+    def flush(self) -> None:
+        """Insert the queued rows and commit them."""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            inserted = self._insert_with_copy(batch)
+        else:
+            inserted = self._insert_with_lookup(batch)
+        self.db.commit()
+
+        # Only the first row of each inserted ID number went in
+        for row_number, values in batch:
+            id_number = values["id_number"]
+            if id_number in inserted:
+                inserted.discard(id_number)
+                self.imported += 1
+            else:
+                self.duplicates += 1
+                self._row_error(row_number, id_number, ["Client with this ID number already exists"], counted=False)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "total_rows": self.total_rows,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            # Duplicates are only found when their batch is flushed
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": len(self.errors) < self.invalid + self.duplicates,
+        }
+
+    def _row_error(self, row_number: int, id_number: Optional[str], messages: List[str], counted: bool = True) -> None:
+        if counted:
+            self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "id_number": id_number, "errors": messages})
+
+    def _insert_with_copy(self, batch: List[Tuple[int, Dict[str, Any]]]) -> Set[str]:
+        table = self.client_model.__tablename__
+        column_list = ", ".join(self.columns)
+        cursor = self.db.connection().connection.cursor()
+        try:
+            # Same column types as clients, without its id sequence or NOT NULL constraints.
+            # The table lives only for this batch's transaction: each flush commits, and the
+            # next batch may run on another pooled connection or after a schema change.
+            cursor.execute("DROP TABLE IF EXISTS pg_temp.client_import_staging")
+            cursor.execute(
+                f"CREATE TEMP TABLE client_import_staging ON COMMIT DROP AS "
+                f"SELECT 0 AS row_number, {column_list} FROM {table} WITH NO DATA"
+            )
+
+            data = io.StringIO()
+            writer = csv.writer(data)
+            for row_number, values in batch:
+                writer.writerow([row_number] + [_copy_value(values[column]) for column in self.columns])
+            data.seek(0)
+            cursor.copy_expert(
+                f"COPY client_import_staging (row_number, {column_list}) FROM STDIN WITH (FORMAT csv)",
+                data
+            )
+
+            # DISTINCT ON keeps the first row of each ID number in the file
+            select = (
+                f"SELECT DISTINCT ON (id_number) {column_list}, %(tenant_id)s, true "
+                f"FROM client_import_staging s "
+            )
+            if self.tenant_id is None:
+                # Untenanted ID numbers can't use the (tenant_id, id_number) index for conflicts
+                select += f"WHERE NOT EXISTS (SELECT 1 FROM {table} c WHERE c.id_number = s.id_number) "
+                conflict = ""
+            else:
+                conflict = " ON CONFLICT (tenant_id, id_number) DO NOTHING"
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}, tenant_id, is_active) "
+                f"{select}ORDER BY id_number, row_number{conflict} RETURNING id_number",
+                {"tenant_id": self.tenant_id}
+            )
+            return {id_number for (id_number,) in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def _insert_with_lookup(self, batch: List[Tuple[int, Dict[str, Any]]]) -> Set[str]:
+        Client = self.client_model
+        id_numbers = {values["id_number"] for _, values in batch}
+        query = self.db.query(Client.id_number).filter(Client.id_number.in_(id_numbers))
+        if self.tenant_id is not None:
+            query = query.filter(Client.tenant_id == self.tenant_id)
+        taken = {id_number for (id_number,) in query}
+
+        rows = []
+        for _, values in batch:
+            if values["id_number"] in taken:
+                continue
+            taken.add(values["id_number"])
+            rows.append({**values, "tenant_id": self.tenant_id, "is_active": True})
+        if rows:
+            self.db.execute(insert(Client), rows)
+        return {row["id_number"] for row in rows}
+
+
+def _copy_value(value: Any) -> Any:
+    # COPY's CSV format reads an unquoted empty field as NULL
+    return "" if value is None else value
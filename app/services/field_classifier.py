@@ -0,0 +1,166 @@
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Category patterns, checked in order; a field goes to the first category that matches
+CATEGORY_PATTERNS = {
+    "personal_info": [
+        r'name', r'first.*name', r'last.*name', r'surname',
+        r'id.*number', r'identification', r'birth.*date', r'gender',
+        r'title', r'mr\.?', r'mrs\.?', r'ms\.?', r'citizenship'
+    ],
+    "contact_info": [
+        r'email', r'phone', r'mobile', r'tel', r'address',
+        r'street', r'city', r'postal', r'zip', r'country',
+        r'state', r'province'
+    ],
+    "banking_info": [
+        r'bank', r'account.*number', r'branch.*code', r'swift',
+        r'iban', r'credit.*card', r'savings', r'cheque', r'checking'
+    ],
+    "employment_info": [
+        r'employer', r'company', r'occupation', r'job.*title',
+        r'income', r'salary', r'employment'
+    ],
+    "tax_info": [
+        r'tax.*number', r'tax.*id', r'vat', r'tin'
+    ],
+    "signature": [
+        r'sign', r'signature'
+    ]
+}
+
+# Output order of the categories, including the catch-all
+CATEGORY_ORDER = ["personal_info", "contact_info", "banking_info", "employment_info", "tax_info", "signature", "other"]
+
+# Semantic field types and the keywords that suggest them
+SEMANTIC_TYPES = {
+    'id_number': ['id', 'identification', 'number', 'identity', 'id number', 'id no'],
+    'name': ['name', 'first name', 'last name', 'surname', 'full name'],
+    'email': ['email', 'e-mail', 'email address'],
+    'phone': ['phone', 'telephone', 'mobile', 'cell', 'contact number', 'tel'],
+    'address': ['address', 'street', 'residential', 'physical address'],
+    'city': ['city', 'town', 'municipality'],
+    'postal_code': ['postal code', 'zip', 'zip code', 'post code'],
+    'country': ['country', 'nation', 'state'],
+    'date_of_birth': ['birth', 'dob', 'date of birth', 'birth date', 'born'],
+    'tax_number': ['tax', 'tax no', 'tax number', 'tin', 'taxpayer'],
+    'bank_name': ['bank', 'bank name', 'financial institution'],
+    'account_number': ['account', 'account no', 'account number', 'acc no'],
+    'branch_code': ['branch', 'branch code', 'sort code', 'routing'],
+    'signature': ['sign', 'signature', 'signed'],
+    'date': ['date', 'day', 'month', 'year', 'dated']
+}
+
+# Everything below is compiled once at import time. Each category's patterns are
+# joined into one alternation, which matches exactly when any single pattern does.
+_CATEGORY_REGEXES = [
+    (category, re.compile('|'.join(patterns), re.IGNORECASE))
+    for category, patterns in CATEGORY_PATTERNS.items()
+]
+_SEMANTIC_REGEXES = [
+    (semantic_type, keywords, re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b'))
+    for semantic_type, keywords in SEMANTIC_TYPES.items()
+]
+
+_AT_PREFIX = re.compile(r'^@')
+_SUBFORM_PREFIX = re.compile(r'^topmostSubform\[\d+\]\.Page\d+\[\d+\]\.')
+_DIGITS = re.compile(r'\d+')
+_POSITIONAL_WORDS = re.compile(r'(^|\s)(top|bottom|left|right|first|second|third|last)(\s|$)')
+_FORM_WORDS = re.compile(r'(^|\s)(field|input|text|box|form|entry)(\s|$)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_field_name(field_name: str) -> str:
+    """Strip common PDF form prefixes and make a field name human-readable."""
+    # Remove prefixes like @ or topmostSubform[0].Page1[0] common in PDF forms
+    normalized = _AT_PREFIX.sub('', field_name)
+    normalized = _SUBFORM_PREFIX.sub('', normalized)
+
+    # Remove underscores and convert to spaces
+    normalized = normalized.replace('_', ' ')
+
+    # Make it more human-readable
+    return ' '.join(word.capitalize() for word in normalized.split())
+
+
+def categorize_field(field_name: str) -> str:
+    """Return the category of a single field, or "other" if none matches."""
+    normalized_name = normalize_field_name(field_name)
+    for category, regex in _CATEGORY_REGEXES:
+        if regex.search(normalized_name):
+            return category
+    return "other"
+
+
+def categorize_fields(field_names: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Categorize fields into logical groups in a single pass.
+
+    Args:
+        field_names: Field names from the PDF
+
+    Returns:
+        Dictionary mapping non-empty categories to lists of field names
+    """
+    categories = {category: [] for category in CATEGORY_ORDER}
+    for field_name in field_names:
+        categories[categorize_field(field_name)].append(field_name)
+
+    # Remove empty categories
+    return {k: v for k, v in categories.items() if v}
+
+
+def semantic_fingerprint(field_name: str, field_properties: Optional[Dict] = None) -> str:
+    """
+    Create a semantic fingerprint for a field based on its likely purpose.
+
+    Args:
+        field_name: The name of the field
+        field_properties: Optional properties of the field (type, format, etc.)
+
+    Returns:
+        "<type>:<confidence>[:type=..][:format=..]", or "unclassified:<hash>"
+        when no type is detected with enough confidence
+    """
+    normalized = normalize_field_name(field_name).lower()
+    lowered_name = field_name.lower()
+
+    # Extract core concepts from the field name, removing positional indicators
+    # and common prefixes/suffixes that don't affect the semantic meaning
+    cleaned = _DIGITS.sub('', normalized)
+    cleaned = _POSITIONAL_WORDS.sub(' ', cleaned)
+    cleaned = _FORM_WORDS.sub(' ', cleaned)
+    cleaned = _WHITESPACE.sub(' ', cleaned).strip()
+
+    # Detect the semantic type of this field
+    detected_type = None
+    highest_confidence = 0
+
+    for semantic_type, keywords, direct_match in _SEMANTIC_REGEXES:
+        # Calculate how many keywords match
+        matches = sum(1 for keyword in keywords if keyword in cleaned)
+        confidence = matches / len(keywords) if keywords else 0
+
+        # Also check for direct matches in the original field name
+        if direct_match.search(lowered_name):
+            confidence += 0.5  # Boost confidence for direct matches
+
+        if confidence > highest_confidence:
+            highest_confidence = confidence
+            detected_type = semantic_type
+
+    # If we couldn't detect a type or confidence is low, use a hash of the cleaned name
+    if detected_type is None or highest_confidence < 0.2:
+        return f"unclassified:{hashlib.md5(cleaned.encode()).hexdigest()[:8]}"
+
+    fingerprint = f"{detected_type}:{highest_confidence:.2f}"
+
+    # Add field properties if available
+    if field_properties:
+        if field_properties.get('type'):
+            fingerprint += f":type={field_properties['type']}"
+        if field_properties.get('format'):
+            fingerprint += f":format={field_properties['format']}"
+
+    return fingerprint
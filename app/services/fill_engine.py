@@ -0,0 +1,245 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from . import metrics, profiling
+from .log_config import configure_logging, get_logger
+from .pdf_service import PDFService
+
+# Engine settings can be tuned per deployment. Each uvicorn worker process
+# (WEB_CONCURRENCY, which uvicorn reads for --workers) starts its own engine,
+# so by default they share the CPUs between them.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+FILL_ENGINE_WORKERS = int(os.getenv("FILL_ENGINE_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+FILL_ENGINE_TASK_TIMEOUT = float(os.getenv("FILL_ENGINE_TASK_TIMEOUT", "120"))
+# spawn avoids forking a process that already runs uvicorn's threads
+FILL_ENGINE_START_METHOD = os.getenv("FILL_ENGINE_START_METHOD", "spawn")
+
+logger = get_logger("fill_engine")
+
+
+class FillEngineTimeout(Exception):
+    """Raised when a task does not finish within the engine's task timeout."""
+
+
+class FillEngine:
+    """
+    Runs CPU-bound PyPDF2 work in a pool of worker processes.
+
+    Each worker keeps its own PDFService, and so its own template cache, for
+    the lifetime of the pool. The API process only awaits results, so a long
+    fill never holds the GIL of the process serving other requests. With zero
+    workers everything runs in the default thread pool instead.
+
+    At most one task per worker is in flight; the rest wait on the event loop,
+    so a task's timeout only starts once a worker picks it up.
+    """
+
+    def __init__(
+        self,
+        upload_dir: str = "./data/pdf_templates",
+        output_dir: str = "./data/generated_pdfs",
+        workers: int = FILL_ENGINE_WORKERS,
+        task_timeout: float = FILL_ENGINE_TASK_TIMEOUT,
+        start_method: str = FILL_ENGINE_START_METHOD,
+        pdf_service: Optional[PDFService] = None,
+    ):
+        self.upload_dir = upload_dir
+        self.output_dir = output_dir
+        self.workers = workers
+        self.task_timeout = task_timeout
+        self.start_method = start_method
+        # Used in-process when running without workers
+        self.pdf_service = pdf_service or PDFService(upload_dir, output_dir)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # One slot per worker (or default pool thread): tasks are only submitted when one is
+        # free, so they never wait in the executor's queue and their timeout covers running only
+        self._slots = asyncio.Semaphore(workers if workers > 0 else min(32, (os.cpu_count() or 1) + 4))
+        self._restart_lock = asyncio.Lock()
+
+    def start(self) -> None:
+        """Start the worker processes and wait until each one is ready."""
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._executor = self._start_pool()
+        logger.info("Fill engine started with %d worker processes", self.workers)
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+            initargs=(self.upload_dir, self.output_dir),
+        )
+        # Warm the pool so the first requests don't pay for process start-up
+        warmups = [executor.submit(_worker_ready) for _ in range(self.workers)]
+        for future in warmups:
+            future.result()
+        return executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a broken pool, once however many tasks saw it break."""
+        async with self._restart_lock:
+            if self._executor is not broken:
+                return
+            logger.warning("Fill engine pool is broken, restarting workers")
+            broken.shutdown(wait=False, cancel_futures=True)
+            # Starting processes blocks until they are ready, so it stays off the event loop
+            self._executor = await asyncio.get_running_loop().run_in_executor(None, self._start_pool)
+
+    async def fill_pdf_form(self, template_path: str, output_path: str, field_data: Dict[str, str],
+                            output_mode: str = "rewrite") -> str:
+        """Fill a PDF form in a worker process. See PDFService.fill_pdf_form."""
+        return await self._run(_fill_pdf_form, template_path, output_path, field_data, output_mode)
+
+    async def extract_form_fields(self, pdf_path: str) -> Dict:
+        """Extract form fields in a worker process. See PDFService.extract_form_fields."""
+        return await self._run(_extract_form_fields, pdf_path)
+
+    async def build_field_analysis(self, pdf_path: str) -> Dict:
+        """Analyze a template in a worker process. See PDFService.build_field_analysis."""
+        return await self._run(_build_field_analysis, pdf_path)
+
+    async def fill_batch(
+        self,
+        template_path: str,
+        jobs: List[Tuple[str, Dict[str, str]]],
+        max_parallel: Optional[int] = None,
+        output_mode: str = "rewrite",
+    ) -> List[Optional[str]]:
+        """
+        Fill the same template for many clients across the worker pool.
+
+        Args:
+            template_path: Path to the PDF template
+            jobs: List of (output_path, field_data) pairs
+            max_parallel: Optional cap on the fills of this batch running at once
+            output_mode: How the filled PDFs are written, see PDFService.fill_pdf_form
+
+        Returns:
+            For each job, the path of the filled PDF or None if filling failed
+        """
+        # The engine already runs at most one task per worker; this caps the batch's share
+        semaphore = asyncio.Semaphore(max_parallel) if max_parallel else None
+
+        async def fill_one(output_path: str, field_data: Dict[str, str]) -> Optional[str]:
+            try:
+                if semaphore is None:
+                    return await self.fill_pdf_form(template_path, output_path, field_data, output_mode)
+                async with semaphore:
+                    return await self.fill_pdf_form(template_path, output_path, field_data, output_mode)
+            except Exception as e:
+                logger.error("Error filling batch PDF %s: %s", output_path, e)
+                return None
+
+        return await asyncio.gather(*(fill_one(output_path, field_data) for output_path, field_data in jobs))
+
+    async def _run(self, func, *args):
+        await self._slots.acquire()
+        release = True
+        try:
+            for attempt in range(2):
+                executor = self._executor
+                future = self._submit(executor, func, args)
+                try:
+                    # Shielded, so a timeout leaves the future to report when the task really ends
+                    result = await asyncio.wait_for(asyncio.shield(future), timeout=self.task_timeout)
+                    break
+                except asyncio.TimeoutError:
+                    # The task keeps running in its worker; its slot is freed only when it ends
+                    release = False
+                    future.add_done_callback(self._release_slot)
+                    raise FillEngineTimeout(f"PDF task did not finish within {self.task_timeout} seconds")
+                except asyncio.CancelledError:
+                    # The request went away, but the worker is busy until the task ends
+                    release = False
+                    future.add_done_callback(self._release_slot)
+                    raise
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for memory); replace the pool and retry once
+                    if executor is None or attempt:
+                        raise
+                    await self._restart(executor)
+        finally:
+            if release:
+                self._slots.release()
+
+        if executor is None:
+            return result
+        # Spans and counters recorded in the worker count towards this process and request
+        result, spans, counters, profile_stats = result
+        metrics.merge(spans, counters)
+        if profile_stats is not None:
+            profiling.current_profile().add_stats(profile_stats)
+        return result
+
+    def _release_slot(self, future: asyncio.Future) -> None:
+        if not future.cancelled():
+            # Nobody awaits the result any more; retrieving it keeps asyncio from reporting it
+            future.exception()
+        self._slots.release()
+
+    def _submit(self, executor: Optional[ProcessPoolExecutor], func, args) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if executor is None:
+            # The copied context carries the request's timings and profile into the thread
+            call = functools.partial(contextvars.copy_context().run, profiling.profile_in_thread, func, self.pdf_service, *args)
+            return loop.run_in_executor(None, call)
+        try:
+            return loop.run_in_executor(
+                executor, _call_in_worker_with_metrics, profiling.current_profile() is not None, func, *args
+            )
+        except BrokenProcessPool as e:
+            # Reported like a pool that breaks while the task runs
+            future = loop.create_future()
+            future.set_exception(e)
+            return future
+
+
+# Per-process service used by engine workers
+_worker_service: Optional[PDFService] = None
+
+
+def _init_worker(upload_dir: str, output_dir: str) -> None:
+    global _worker_service
+    # Workers write their own log records, through their own queue and writer thread
+    configure_logging()
+    _worker_service = PDFService(upload_dir, output_dir)
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _call_in_worker_with_metrics(profile: bool, func, *args):
+    profile_stats = None
+    with metrics.collect() as timings:
+        if profile:
+            # Profiled requests get the worker's cProfile stats back with the result
+            result, profile_stats = profiling.profile_call(func, _worker_service, *args)
+        else:
+            result = func(_worker_service, *args)
+    return result, timings.spans, dict(timings.counters), profile_stats
+
+
+def _fill_pdf_form(service: PDFService, template_path: str, output_path: str, field_data: Dict[str, str],
+                   output_mode: str) -> str:
+    return service.fill_pdf_form(template_path, output_path, field_data, output_mode)
+
+
+def _extract_form_fields(service: PDFService, pdf_path: str) -> Dict:
+    return service.extract_form_fields(pdf_path)
+
+
+def _build_field_analysis(service: PDFService, pdf_path: str) -> Dict:
+    return service.build_field_analysis(pdf_path)
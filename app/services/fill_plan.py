@@ -0,0 +1,98 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+
+def format_field_value(value: Any) -> str:
+    """Convert a client value into the string written to a PDF field."""
+    # Convert date objects to string if necessary
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    # Ensure all values are strings
+    return str(value)
+
+
+class FillPlan:
+    """
+    The final pdf_field -> client_field assignments for one template.
+
+    A plan only depends on the template's fields and its field mappings, never
+    on a particular client, so it is compiled once and reused for every fill.
+    """
+
+    def __init__(self, assignments: Dict[str, str], analyzer_version: Optional[str] = None):
+        self.assignments = assignments
+        self.analyzer_version = analyzer_version
+
+    @classmethod
+    def compile(
+        cls,
+        field_mappings: Dict[str, str],
+        form_fields: Dict[str, Dict],
+        semantic_field_groups: Dict[str, Dict[str, float]],
+        client_fields: Iterable[str],
+        analyzer_version: Optional[str] = None,
+    ) -> "FillPlan":
+        """
+        Resolve explicit mappings and semantic auto-mapping into a flat plan.
+
+        Args:
+            field_mappings: Dictionary mapping PDF field names to client data field names
+            form_fields: Extracted form fields with their semantic fingerprints
+            semantic_field_groups: Semantic types mapped to {field name: confidence}
+            client_fields: Names of the client attributes available when filling
+            analyzer_version: Version of the field analysis the plan was built from
+
+        Returns:
+            The compiled FillPlan
+        """
+        client_fields = set(client_fields)
+        assignments = {}
+
+        # First, process explicitly mapped fields
+        for pdf_field, client_field in field_mappings.items():
+            if client_field in client_fields:
+                assignments[pdf_field] = client_field
+
+        # Then, apply intelligent field mapping using semantic groups
+        for mapped_pdf_field, client_field in field_mappings.items():
+            if client_field not in client_fields:
+                continue
+
+            # Find the semantic type of this mapped field
+            field_info = form_fields.get(mapped_pdf_field, {})
+            fingerprint = field_info.get('semantic_fingerprint', '')
+            if not fingerprint:
+                continue
+
+            semantic_type = fingerprint.split(':')[0]
+
+            # Apply the same client data to all semantically similar fields
+            for similar_field, confidence in semantic_field_groups.get(semantic_type, {}).items():
+                # Skip already mapped fields and low confidence matches
+                if similar_field in field_mappings or confidence < 0.5:
+                    continue
+                assignments[similar_field] = client_field
+
+        return cls(assignments, analyzer_version)
+
+    def field_data(self, client_data: Mapping[str, Any]) -> Dict[str, str]:
+        """Build the field values for a client given as a dictionary."""
+        return {pdf_field: format_field_value(client_data[client_field]) for pdf_field, client_field in self.assignments.items()}
+
+    def field_data_for_row(self, client_row: Any) -> Dict[str, str]:
+        """Build the field values directly from a Client row."""
+        return {pdf_field: format_field_value(getattr(client_row, client_field)) for pdf_field, client_field in self.assignments.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            "analyzer_version": self.analyzer_version,
+            "assignments": [[pdf_field, client_field] for pdf_field, client_field in self.assignments.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FillPlan":
+        # Stored as a list of pairs so the fill order survives JSON round-trips
+        assignments = {pdf_field: client_field for pdf_field, client_field in data.get("assignments", [])}
+        return cls(assignments, data.get("analyzer_version"))
+
+    def __len__(self) -> int:
+        return len(self.assignments)
@@ -0,0 +1,243 @@
+import codecs
+import hashlib
+import os
+import struct
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (
+    ArrayObject,
+    BooleanObject,
+    ByteStringObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    PdfObject,
+    TextStringObject,
+    encode_pdfdocencoding,
+)
+
+from .template_cache import WidgetRef
+
+ObjectId = Tuple[int, int]
+
+
+def appearance_state(field_value: str) -> NameObject:
+    """Return the /AS name a button widget gets for a value, given with or without its leading slash."""
+    return NameObject(field_value if field_value.startswith("/") else f"/{field_value}")
+
+
+def field_value_updates(reader: PdfReader, widget_index: Dict[str, List[WidgetRef]], field_dictionary: Dict[str, str]) -> Dict[ObjectId, DictionaryObject]:
+    """
+    Build new revisions of the objects a fill changes.
+
+    Widgets get /V (and /AS for buttons) like PdfWriter.update_page_form_field_values
+    sets them, and the AcroForm gets /NeedAppearances so viewers render the
+    new values. The reader's own objects are never modified.
+
+    Returns:
+        (object number, generation) -> new version of the object
+    """
+    updates: Dict[ObjectId, DictionaryObject] = {}
+    for field_name, field_value in field_dictionary.items():
+        for page_number, annot_index in widget_index.get(field_name, ()):
+            annot_ref = list.__getitem__(reader.pages[page_number]["/Annots"], annot_index)
+            if not isinstance(annot_ref, IndirectObject):
+                raise ValueError(f"Widget {annot_index} on page {page_number} is not an indirect object")
+
+            object_id = (annot_ref.idnum, annot_ref.generation)
+            annot = updates.get(object_id)
+            if annot is None:
+                annot = DictionaryObject(annot_ref.get_object())
+                updates[object_id] = annot
+            if annot.get("/FT") == "/Btn":
+                annot[NameObject("/AS")] = appearance_state(field_value)
+            annot[NameObject("/V")] = TextStringObject(field_value)
+
+    if updates:
+        root_ref = reader.trailer.raw_get("/Root")
+        root = root_ref.get_object()
+        acro_form_ref = root.raw_get("/AcroForm") if "/AcroForm" in root else None
+        if isinstance(acro_form_ref, IndirectObject):
+            acro_form = DictionaryObject(acro_form_ref.get_object())
+            acro_form[NameObject("/NeedAppearances")] = BooleanObject(True)
+            updates[(acro_form_ref.idnum, acro_form_ref.generation)] = acro_form
+        elif acro_form_ref is not None:
+            # A direct AcroForm lives in the catalog, so the catalog is revised instead
+            acro_form = DictionaryObject(acro_form_ref)
+            acro_form[NameObject("/NeedAppearances")] = BooleanObject(True)
+            root = DictionaryObject(root)
+            root[NameObject("/AcroForm")] = acro_form
+            updates[(root_ref.idnum, root_ref.generation)] = root
+
+    return updates
+
+
+def build_incremental_update(reader: PdfReader, base_path: str, updates: Dict[ObjectId, DictionaryObject]) -> bytes:
+    """
+    Serialize object revisions as an incremental update of the base PDF.
+
+    The result is meant to be appended to the unchanged base file: offsets in
+    its cross-reference section assume the base bytes come first, and its
+    trailer links back to the base's last cross-reference section. New
+    objects are encrypted with the base document's key when it is encrypted.
+
+    Args:
+        reader: Reader over the base file
+        base_path: Path of the base file
+        updates: (object number, generation) -> new version of the object
+
+    Returns:
+        The bytes to append to the base file
+    """
+    base_size = os.path.getsize(base_path)
+    prev_offset, prev_is_stream, ends_with_eol = _read_base_tail(base_path)
+
+    out = BytesIO()
+    if not ends_with_eol:
+        out.write(b"\n")
+
+    offsets: Dict[int, Tuple[int, int]] = {}
+    for (idnum, generation), obj in sorted(updates.items()):
+        offsets[idnum] = (base_size + out.tell(), generation)
+        out.write(f"{idnum} {generation} obj\n".encode())
+        _encrypted_copy(obj, _string_crypt(reader, idnum, generation)).write_to_stream(out, None)
+        out.write(b"\nendobj\n")
+
+    size = _base_object_count(reader)
+    trailer = DictionaryObject()
+    for key in ("/Root", "/Encrypt", "/Info"):
+        if key in reader.trailer:
+            trailer[NameObject(key)] = reader.trailer.raw_get(key)
+    if "/ID" in reader.trailer:
+        # The file identifiers are never encrypted and must be kept byte for byte
+        trailer[NameObject("/ID")] = ArrayObject(
+            ByteStringObject(_string_bytes(value))
+            for value in reader.trailer["/ID"]
+        )
+    trailer[NameObject("/Prev")] = NumberObject(prev_offset)
+
+    xref_offset = base_size + out.tell()
+    if prev_is_stream:
+        # Keep to cross-reference streams when the base uses them
+        xref_idnum = max(size, max(offsets) + 1)
+        offsets[xref_idnum] = (xref_offset, 0)
+        trailer[NameObject("/Size")] = NumberObject(xref_idnum + 1)
+        _write_xref_stream(out, xref_idnum, offsets, trailer)
+    else:
+        trailer[NameObject("/Size")] = NumberObject(max(size, max(offsets) + 1))
+        _write_xref_table(out, offsets, trailer)
+
+    out.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def _read_base_tail(base_path: str) -> Tuple[int, bool, bool]:
+    """Return the base's last startxref offset, whether it points at an xref stream, and whether the file ends with EOL."""
+    with open(base_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 1024))
+        tail = f.read()
+        position = tail.rfind(b"startxref")
+        if position < 0:
+            raise ValueError("Base PDF has no startxref")
+        prev_offset = int(tail[position + len(b"startxref"):].split()[0])
+        f.seek(prev_offset)
+        prev_is_stream = not f.read(4).startswith(b"xref")
+    return prev_offset, prev_is_stream, tail.endswith((b"\n", b"\r"))
+
+
+def _base_object_count(reader: PdfReader) -> int:
+    highest = max(
+        [idnum for objects in reader.xref.values() for idnum in objects] + list(reader.xref_objStm) + [0]
+    )
+    return max(int(reader.trailer.get("/Size", 0)), highest + 1)
+
+
+def _string_crypt(reader: PdfReader, idnum: int, generation: int):
+    """Return the cipher for strings of the given object, or None if the base is not encrypted."""
+    encryption = getattr(reader, "_encryption", None)
+    if encryption is None:
+        return None
+
+    # PyPDF2 has no public API for this. These private names are those of the pinned
+    # PyPDF2==3.0.1 and tests/test_incremental_writer.py fails if an upgrade moves them.
+    # Same key derivation as PyPDF2's Encryption.decrypt_object (Algorithm 1)
+    key = encryption._key
+    n = 5 if encryption.algV == 1 else encryption.key_size // 8
+    key_hash = hashlib.md5(key[:n] + struct.pack("<i", idnum)[:3] + struct.pack("<i", generation)[:2])
+    rc4_key = key_hash.digest()[: min(n + 5, 16)]
+    key_hash.update(b"sAlT")
+    aes128_key = key_hash.digest()[: min(n + 5, 16)]
+    return encryption._get_crypt(encryption.StrF, rc4_key, aes128_key, key)
+
+
+def _string_bytes(obj: PdfObject) -> bytes:
+    """Encode a string object the way PyPDF2 writes it."""
+    if isinstance(obj, ByteStringObject):
+        return bytes(obj)
+    if obj.autodetect_utf16 or obj.autodetect_pdfdocencoding:
+        return obj.original_bytes
+    try:
+        return encode_pdfdocencoding(obj)
+    except UnicodeEncodeError:
+        return codecs.BOM_UTF16_BE + obj.encode("utf-16be")
+
+
+def _encrypted_copy(obj: PdfObject, crypt) -> PdfObject:
+    """Copy direct containers and encrypt every string in them."""
+    if isinstance(obj, (TextStringObject, ByteStringObject)):
+        return ByteStringObject(crypt.encrypt(_string_bytes(obj))) if crypt is not None else obj
+    if isinstance(obj, DictionaryObject):
+        return DictionaryObject({key: _encrypted_copy(value, crypt) for key, value in obj.items()})
+    if isinstance(obj, ArrayObject):
+        return ArrayObject(_encrypted_copy(value, crypt) for value in obj)
+    return obj
+
+
+def _subsections(idnums: List[int]) -> List[List[int]]:
+    """Split sorted object numbers into runs of consecutive numbers."""
+    runs: List[List[int]] = []
+    for idnum in idnums:
+        if runs and idnum == runs[-1][-1] + 1:
+            runs[-1].append(idnum)
+        else:
+            runs.append([idnum])
+    return runs
+
+
+def _write_xref_table(out: BytesIO, offsets: Dict[int, Tuple[int, int]], trailer: DictionaryObject) -> None:
+    out.write(b"xref\n")
+    for run in _subsections(sorted(offsets)):
+        out.write(f"{run[0]} {len(run)}\n".encode())
+        for idnum in run:
+            offset, generation = offsets[idnum]
+            out.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+    out.write(b"trailer\n")
+    trailer.write_to_stream(out, None)
+    out.write(b"\n")
+
+
+def _write_xref_stream(out: BytesIO, xref_idnum: int, offsets: Dict[int, Tuple[int, int]], trailer: DictionaryObject) -> None:
+    runs = _subsections(sorted(offsets))
+    data = b"".join(
+        struct.pack(">BIH", 1, offsets[idnum][0], offsets[idnum][1])
+        for run in runs
+        for idnum in run
+    )
+    trailer[NameObject("/Type")] = NameObject("/XRef")
+    trailer[NameObject("/W")] = ArrayObject([NumberObject(1), NumberObject(4), NumberObject(2)])
+    trailer[NameObject("/Index")] = ArrayObject(
+        NumberObject(value) for run in runs for value in (run[0], len(run))
+    )
+    trailer[NameObject("/Length")] = NumberObject(len(data))
+
+    # Cross-reference streams are never encrypted
+    out.write(f"{xref_idnum} 0 obj\n".encode())
+    trailer.write_to_stream(out, None)
+    out.write(b"\nstream\n")
+    out.write(data)
+    out.write(b"\nendstream\nendobj\n")
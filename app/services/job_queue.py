@@ -0,0 +1,199 @@
+import asyncio
+import datetime
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .log_config import get_logger
+
+# Queue settings can be tuned per deployment
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "2"))
+JOB_QUEUE_POLL_INTERVAL = float(os.getenv("JOB_QUEUE_POLL_INTERVAL", "1.0"))
+# Running jobs older than this are assumed orphaned by a crashed process and requeued
+JOB_QUEUE_STALE_SECONDS = int(os.getenv("JOB_QUEUE_STALE_SECONDS", "600"))
+# How often a worker looks for such jobs while the queue runs
+JOB_QUEUE_REQUEUE_INTERVAL = float(os.getenv("JOB_QUEUE_REQUEUE_INTERVAL", "60"))
+JOB_QUEUE_MAX_ATTEMPTS = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+
+logger = get_logger("job_queue")
+
+
+class PDFJobQueue:
+    """
+    A PDF generation queue that uses the application database as its broker.
+
+    Jobs are rows in the pdf_jobs table. Each API process runs a few worker
+    coroutines that claim queued rows with a conditional UPDATE (and
+    SELECT ... FOR UPDATE SKIP LOCKED where the database supports it), so
+    several processes can drain the same table without running a job twice.
+    Database work runs in the default thread pool, off the event loop, and
+    jobs left running by a crashed process are requeued every requeue_interval.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        job_model: Any,
+        handler: Callable[[Session, Any], Awaitable[int]],
+        workers: int = JOB_QUEUE_WORKERS,
+        poll_interval: float = JOB_QUEUE_POLL_INTERVAL,
+        stale_seconds: int = JOB_QUEUE_STALE_SECONDS,
+        max_attempts: int = JOB_QUEUE_MAX_ATTEMPTS,
+        requeue_interval: float = JOB_QUEUE_REQUEUE_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.job_model = job_model
+        # Processes one job and returns the id of the GeneratedPDF it created
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.requeue_interval = requeue_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._next_requeue = 0.0
+
+    def start(self) -> None:
+        """Start the worker coroutines on the running loop; the first one requeues orphaned jobs."""
+        if self.workers <= 0 or self._tasks:
+            return
+        self._next_requeue = 0.0
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("PDF job queue started with %d workers", self.workers)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, db: Session, client_id: int, template_id: int) -> Any:
+        """Add a job to the queue and wake an idle worker."""
+        job = self.job_model(
+            id=uuid.uuid4().hex,
+            status="queued",
+            client_id=client_id,
+            template_id=template_id,
+            attempts=0
+        )
+        await asyncio.get_running_loop().run_in_executor(None, self._insert_job, db, job)
+        # Set on the loop, since asyncio events are not thread-safe
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    @staticmethod
+    def _insert_job(db: Session, job: Any) -> None:
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if time.monotonic() >= self._next_requeue:
+                # Claimed here, on the loop, so only one worker of the process requeues at a time
+                self._next_requeue = time.monotonic() + self.requeue_interval
+                await loop.run_in_executor(None, self._requeue_stale_jobs)
+
+            try:
+                job_id = await loop.run_in_executor(None, self._claim_next_job)
+            except Exception as e:
+                logger.error("Error claiming PDF job: %s", e)
+                job_id = None
+
+            if job_id is None:
+                # Sleep until the poll interval passes or a job is enqueued locally
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._run_job(job_id)
+
+    def _claim_next_job(self) -> Optional[str]:
+        """Atomically move the oldest queued job to running and return its id."""
+        Job = self.job_model
+        with self.session_factory() as db:
+            candidate = (
+                db.query(Job.id)
+                .filter(Job.status == "queued")
+                .order_by(Job.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if candidate is None:
+                return None
+
+            # The status check makes the claim safe even without row locks (SQLite)
+            claimed = (
+                db.query(Job)
+                .filter(Job.id == candidate.id, Job.status == "queued")
+                .update(
+                    {
+                        Job.status: "running",
+                        Job.started_at: datetime.datetime.utcnow(),
+                        Job.attempts: Job.attempts + 1
+                    },
+                    synchronize_session=False
+                )
+            )
+            db.commit()
+            return candidate.id if claimed else None
+
+    async def _run_job(self, job_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        db = self.session_factory()
+        try:
+            job = await loop.run_in_executor(None, self._load_job, db, job_id)
+            try:
+                generated_pdf_id = await self.handler(db, job)
+                error = None
+            except Exception as e:
+                generated_pdf_id = None
+                error = str(getattr(e, "detail", None) or e)
+                logger.warning("PDF job %s failed: %s", job_id, error)
+            await loop.run_in_executor(None, self._finish_job, db, job_id, generated_pdf_id, error)
+        finally:
+            await loop.run_in_executor(None, db.close)
+
+    def _load_job(self, db: Session, job_id: str) -> Any:
+        return db.query(self.job_model).filter(self.job_model.id == job_id).first()
+
+    def _finish_job(self, db: Session, job_id: str, generated_pdf_id: Optional[int], error: Optional[str]) -> None:
+        if error is not None:
+            # Drop whatever the handler left unfinished before recording the failure
+            db.rollback()
+        job = self._load_job(db, job_id)
+        job.status = "failed" if error is not None else "completed"
+        job.generated_pdf_id = generated_pdf_id
+        job.error = error
+        job.finished_at = datetime.datetime.utcnow()
+        db.commit()
+
+    def _requeue_stale_jobs(self) -> None:
+        Job = self.job_model
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.stale_seconds)
+        try:
+            with self.session_factory() as db:
+                stale = db.query(Job).filter(Job.status == "running", Job.started_at < cutoff)
+                requeued = stale.filter(Job.attempts < self.max_attempts).update(
+                    {Job.status: "queued"}, synchronize_session=False
+                )
+                failed = stale.update(
+                    {Job.status: "failed", Job.error: "Job was interrupted too many times", Job.finished_at: datetime.datetime.utcnow()},
+                    synchronize_session=False
+                )
+                db.commit()
+                if requeued or failed:
+                    logger.info("Requeued %d and failed %d interrupted PDF jobs", requeued, failed)
+        except Exception as e:
+            logger.error("Error requeueing interrupted PDF jobs: %s", e)
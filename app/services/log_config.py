@@ -0,0 +1,118 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from typing import Optional
+
+# Level of every DocuMantis logger not listed in LOG_LEVELS
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module levels, e.g. "pdf_service=DEBUG,job_queue=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# "text" writes a readable line per record, "json" one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Records waiting for the writer thread; records beyond this are dropped instead of blocking requests
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+LOGGER_PREFIX = "documantis"
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def get_logger(module: str) -> logging.Logger:
+    """
+    Return the logger of a DocuMantis module.
+
+    Loggers are named documantis.<module> rather than after __name__, so
+    LOG_LEVELS uses the same names whether the app is imported as a package
+    (Docker) or from the app directory.
+    """
+    return logging.getLogger(f"{LOGGER_PREFIX}.{module}")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object, including the fields passed with extra=."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without formatting or waiting.
+
+    The message is only built by the writer thread, so logged arguments must
+    not be changed after the logging call.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# (process id, listener, handler) of the logging set up in this process
+_configured: Optional[tuple] = None
+
+
+def configure_logging() -> None:
+    """
+    Send DocuMantis log records through a queue to a background writer thread.
+
+    Request threads only check the level and enqueue the record; formatting and
+    writing to stderr happen on the writer thread. Safe to call more than once
+    and again in forked or spawned worker processes.
+    """
+    global _configured
+    if _configured is not None and _configured[0] == os.getpid():
+        return
+
+    logger = logging.getLogger(LOGGER_PREFIX)
+    if _configured is not None:
+        # A forked child inherits the handler but not the parent's writer thread
+        logger.removeHandler(_configured[2])
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = _BackgroundQueueHandler(log_queue)
+
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(queue_handler)
+    # Records stop here, whatever uvicorn or alembic configure on the root logger
+    logger.propagate = False
+    for entry in filter(None, (part.strip() for part in LOG_LEVELS.split(","))):
+        module, _, level = entry.partition("=")
+        get_logger(module.strip()).setLevel(level.strip().upper())
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(listener.stop)
+    _configured = (os.getpid(), listener, queue_handler)
+
+
+def dropped_records() -> int:
+    """Return how many records this process dropped because the queue was full."""
+    return _configured[2].dropped if _configured is not None else 0
@@ -0,0 +1,250 @@
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Set to 0 to turn off span timing, the Server-Timing header and /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Upper bounds in seconds of the duration histograms' buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = "documantis"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # Counts are per bucket here and made cumulative when exported
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of the histograms and counters of one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, labels: Labels = ()) -> None:
+        with self._lock:
+            self._counters[(name, labels)] += amount
+
+    def render(self) -> List[str]:
+        """Return the histograms and counters as Prometheus text exposition lines."""
+        with self._lock:
+            histograms = [(key, list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines: List[str] = []
+        typed = set()
+        for (name, labels), counts, total, count, buckets in sorted(histograms):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        for (name, labels), value in sorted(counters):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{format_labels(labels)} {int(value) if value.is_integer() else value}")
+        return lines
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class RequestTimings:
+    """Spans and counter increments recorded while handling one request or worker task."""
+
+    def __init__(self):
+        self.spans: List[Tuple[str, float]] = []
+        self.counters: Dict[str, float] = defaultdict(float)
+
+    def server_timing(self, total: float) -> str:
+        """Return a Server-Timing header value with each span name's total duration."""
+        durations: Dict[str, float] = defaultdict(float)
+        counts: Dict[str, int] = defaultdict(int)
+        for name, seconds in self.spans:
+            durations[name] += seconds
+            counts[name] += 1
+        entries = [
+            f'{name};dur={durations[name] * 1000:.1f}' + (f';desc="{counts[name]}x"' if counts[name] > 1 else "")
+            for name in durations
+        ]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+registry = MetricsRegistry()
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("documantis_request_timings", default=None)
+
+SPAN_METRIC = f"{METRIC_PREFIX}_span_seconds"
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add a timed span to its histogram and to the current request's Server-Timing."""
+    registry.observe(SPAN_METRIC, seconds, (("span", name),))
+    timings = _current.get()
+    if timings is not None:
+        timings.spans.append((name, seconds))
+
+
+def increment(name: str, amount: float = 1) -> None:
+    """Add to a counter, named without the documantis_ prefix."""
+    if not METRICS_ENABLED:
+        return
+    registry.increment(f"{METRIC_PREFIX}_{name}", amount)
+    timings = _current.get()
+    if timings is not None:
+        timings.counters[name] += amount
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as a span."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of span."""
+    def decorator(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_span(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def collect() -> Iterator[RequestTimings]:
+    """Record the spans and counters of the enclosed block into a new RequestTimings."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def merge(spans: List[Tuple[str, float]], counters: Dict[str, float]) -> None:
+    """Record spans and counters collected in another process, such as a fill engine worker."""
+    for name, seconds in spans:
+        record_span(name, seconds)
+    for name, amount in counters.items():
+        increment(name, amount)
+
+
+def instrument_engine(engine) -> None:
+    """Time every query an SQLAlchemy engine runs as a "db" span."""
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        record_span("db", time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _failed_query(exception_context):
+        # A failed query never reaches after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            record_span("db", time.perf_counter() - connection.info["query_started"].pop())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times each request, adds its Server-Timing header and
+    feeds the per-route request duration histogram.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                header = timings.server_timing(time.perf_counter() - started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        with collect() as timings:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                # The route's path template, so /clients/1 and /clients/2 share a series
+                route = getattr(scope.get("route"), "path", "unmatched")
+                registry.observe(
+                    f"{METRIC_PREFIX}_http_request_duration_seconds",
+                    time.perf_counter() - started,
+                    (("method", scope["method"]), ("route", route), ("status", str(status[0]))),
+                )
@@ -0,0 +1,98 @@
+import json
+import os
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from .log_config import get_logger
+
+# Largest page a list endpoint returns
+PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", "1000"))
+# Totals the planner estimates above this are reported as estimates instead of counted
+PAGINATION_EXACT_COUNT_LIMIT = int(os.getenv("PAGINATION_EXACT_COUNT_LIMIT", "10000"))
+
+logger = get_logger("pagination")
+
+
+async def keyset_page(db: AsyncSession, statement: Select, id_column: Any, after_id: Optional[int], limit: int) -> Tuple[List[Any], Optional[int]]:
+    """
+    Return one page of a query ordered by id.
+
+    Rows are fetched with `id > after_id ORDER BY id LIMIT n`, which the
+    primary key index answers in the same time for every page, unlike an
+    OFFSET that reads and discards every earlier row.
+
+    Args:
+        db: Session to run the query in
+        statement: Filtered select of one model to page through
+        id_column: The model's primary key column
+        after_id: Id of the last row of the previous page, or None for the first page
+        limit: Maximum number of rows in the page
+
+    Returns:
+        (rows, cursor of the next page or None if this is the last page)
+    """
+    if after_id is not None:
+        statement = statement.where(id_column > after_id)
+    # One extra row tells whether another page follows
+    rows = list((await db.scalars(statement.order_by(id_column).limit(limit + 1))).all())
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+async def count_rows(db: AsyncSession, statement: Select) -> Tuple[int, bool]:
+    """
+    Count the rows of a query, or estimate them when there are many.
+
+    On PostgreSQL the planner's row estimate is read first; an exact COUNT(*)
+    only runs when the estimate is at most PAGINATION_EXACT_COUNT_LIMIT, so
+    counting a large tenant never scans it. Other databases always count, as
+    does PostgreSQL when the estimate can't be read.
+
+    Returns:
+        (number of rows, whether the number is exact)
+    """
+    statement = statement.order_by(None)
+    if db.bind.dialect.name == "postgresql":
+        try:
+            # In a savepoint, so a failed EXPLAIN leaves the transaction usable for the count
+            async with db.begin_nested():
+                estimate = await _planner_estimate(await db.connection(), statement)
+        except (SQLAlchemyError, LookupError, TypeError, ValueError) as e:
+            logger.warning("Row estimate failed, counting rows instead: %s", e)
+        else:
+            if estimate > PAGINATION_EXACT_COUNT_LIMIT:
+                return estimate, False
+    total = await db.scalar(select(func.count()).select_from(statement.subquery()))
+    return total, True
+
+
+async def _planner_estimate(connection: AsyncConnection, statement: Select) -> int:
+    """Return PostgreSQL's estimate of the number of rows a query returns."""
+    compiled = statement.compile(dialect=connection.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+    if isinstance(plan, str):
+        # asyncpg returns json columns as text
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def prefix_filter(column: Any, text: str, case_sensitive: bool = False) -> Any:
+    """
+    Return a `column LIKE 'text%'` condition with LIKE wildcards in text escaped.
+
+    Case-insensitive matches compare lower(column), the expression the search
+    indexes are built on, so PostgreSQL can answer them with an index range scan.
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if case_sensitive:
+        return column.like(f"{escaped}%", escape="\\")
+    return func.lower(column).like(f"{escaped.lower()}%", escape="\\")
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from .zip_stream import ZIP_STREAM_CHUNK_SIZE
+
+# Internal nginx location that serves DOWNLOAD_DATA_DIR; empty streams files from Python
+DOWNLOAD_ACCEL_REDIRECT = os.getenv("DOWNLOAD_ACCEL_REDIRECT", "")
+DOWNLOAD_DATA_DIR = os.getenv("DOWNLOAD_DATA_DIR", "./data")
+# Generated PDFs hold client data: browsers may keep them but must revalidate
+DOWNLOAD_CACHE_CONTROL = "private, no-cache"
+# Number of ETags remembered per process
+DOWNLOAD_ETAG_CACHE_ENTRIES = 4096
+
+_RANGE_PATTERN = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a byte range starts past the end of the document."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for {size} bytes")
+        self.size = size
+
+
+# ((path, mtime, size), ...) -> ETag of the files' contents; generated files never change in place
+_etags: "OrderedDict[Tuple[Tuple[str, int, int], ...], str]" = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+def content_etag(paths: Sequence[str]) -> str:
+    """
+    Return a strong ETag for the concatenated contents of files.
+
+    The tag is the SHA-256 of the bytes themselves, so a document gets the
+    same tag from every process and whichever way it is served. Each set of
+    files is hashed once per process and remembered until one of them changes.
+    """
+    key = tuple(
+        (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        for path, stat in ((path, os.stat(path)) for path in paths)
+    )
+    with _etags_lock:
+        etag = _etags.get(key)
+        if etag is not None:
+            _etags.move_to_end(key)
+            return etag
+
+    content_hash = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(ZIP_STREAM_CHUNK_SIZE), b""):
+                content_hash.update(chunk)
+    etag = f'"{content_hash.hexdigest()}"'
+
+    with _etags_lock:
+        _etags[key] = etag
+        while len(_etags) > DOWNLOAD_ETAG_CACHE_ENTRIES:
+            _etags.popitem(last=False)
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header.
+
+    Args:
+        range_header: Value of the Range header
+        size: Size of the whole document
+
+    Returns:
+        (first byte, last byte) inclusive, or None when the whole document
+        should be sent (no range, a malformed one or several ranges)
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the document
+    """
+    match = _RANGE_PATTERN.match(range_header or "")
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(size)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    if start > end:
+        return None
+    return start, end
+
+
+def stream_file_range(paths: Sequence[str], start: int, end: int,
+                      chunk_size: int = ZIP_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield bytes start..end (inclusive) of the concatenated contents of files."""
+    offset = 0
+    for path in paths:
+        size = os.path.getsize(path)
+        if offset + size <= start:
+            offset += size
+            continue
+        if offset > end:
+            break
+        with open(path, "rb") as source:
+            source.seek(max(0, start - offset))
+            remaining = min(size, end - offset + 1) - max(0, start - offset)
+            while remaining > 0:
+                chunk = source.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        offset += size
+
+
+def accel_redirect_uri(path: str, prefix: str = DOWNLOAD_ACCEL_REDIRECT,
+                       data_dir: str = DOWNLOAD_DATA_DIR) -> Optional[str]:
+    """
+    Return the internal nginx URI of a file, or None if it can't be handed off.
+
+    Only files under data_dir can be served by nginx, which sees the same
+    directory at the location configured as prefix.
+    """
+    if not prefix:
+        return None
+    relative_path = os.path.relpath(os.path.abspath(path), os.path.abspath(data_dir))
+    if relative_path.startswith(os.pardir):
+        return None
+    parts: List[str] = relative_path.split(os.sep)
+    return prefix.rstrip("/") + "/" + "/".join(quote(part) for part in parts)
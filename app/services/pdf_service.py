@@ -1,3 +1,4 @@
+import logging
 import os
 import PyPDF2
 from PyPDF2 import PdfReader, PdfWriter
@@ -6,16 +7,37 @@ from typing import Dict, List, Optional, Tuple, Set
 import shutil
 import uuid
 from datetime import datetime
-import re
-import hashlib
+
+from . import field_classifier
+from .fill_plan import FillPlan
+from .incremental_writer import appearance_state, build_incremental_update, field_value_updates
+from .template_cache import TemplateAnalysis, TemplateCache, WidgetRef, template_cache_key
+from .template_store import open_template_reader
+from .log_config import get_logger
+from .metrics import increment, span, timed
+from .template_upload import TEMPLATE_UPLOAD_MAX_MB, TemplateUpload, template_path_for_hash
+
+# Bump whenever field extraction, fingerprinting or grouping changes so that
+# analyses stored with older templates are recomputed on next use
+FIELD_ANALYZER_VERSION = "1"
+
+# How filled PDFs are written, see PDFService.fill_pdf_form. PDF_OUTPUT_MODE may
+# also be "values": the API then stores only the field values and renders on download
+PDF_OUTPUT_MODES = ("rewrite", "incremental", "delta")
+PDF_OUTPUT_MODE = os.getenv("PDF_OUTPUT_MODE", "rewrite")
+
+logger = get_logger("pdf_service")
 
 class PDFService:
-    def __init__(self, upload_dir: str = "./data/pdf_templates", output_dir: str = "./data/generated_pdfs"):
+    def __init__(self, upload_dir: str = "./data/pdf_templates", output_dir: str = "./data/generated_pdfs",
+                 template_cache: Optional[TemplateCache] = None):
         """Initialize the PDF service with directories for templates and generated PDFs."""
         os.makedirs(upload_dir, exist_ok=True)
         os.makedirs(output_dir, exist_ok=True)
         self.upload_dir = upload_dir
         self.output_dir = output_dir
+        # Parsed templates are shared between requests so each file is parsed once
+        self.template_cache = template_cache or TemplateCache()
     
     def save_pdf_template(self, file_content: bytes, filename: str) -> str:
         """
@@ -28,14 +50,39 @@ class PDFService:
         Returns:
             The path where the file was saved
         """
-        # Generate a unique filename to avoid collisions
-        unique_filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}_{filename}"
-        file_path = os.path.join(self.upload_dir, unique_filename)
+        file_path, _ = self.store_template_content(file_content)
+        return file_path
+    
+    def store_template_content(self, file_content: bytes) -> Tuple[str, str]:
+        """
+        Store template content under its SHA-256 hash.
         
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        Identical uploads resolve to the same file, so each distinct template is
+        stored once no matter how many PDFTemplate rows refer to it.
         
-        return file_path
+        Args:
+            file_content: The binary content of the PDF file
+            
+        Returns:
+            Tuple of (path of the stored file, hex SHA-256 of the content)
+        """
+        with self.open_template_upload(max_size=None) as upload:
+            upload.write(file_content)
+            return upload.commit()
+    
+    def open_template_upload(self, max_size: Optional[int] = TEMPLATE_UPLOAD_MAX_MB * 1024 * 1024) -> TemplateUpload:
+        """Start a chunked template upload; see TemplateUpload."""
+        return TemplateUpload(self.upload_dir, max_size)
+    
+    def template_path_for_hash(self, content_hash: str) -> str:
+        """Return the storage path of the template with the given content hash."""
+        return template_path_for_hash(self.upload_dir, content_hash)
+    
+    def delete_template_file(self, file_path: str) -> None:
+        """Remove a stored template and drop any cached analysis of it."""
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        self.template_cache.invalidate(file_path)
     
     def categorize_fields(self, fields: Dict) -> Dict[str, List[str]]:
         """
@@ -47,62 +94,7 @@ class PDFService:
         Returns:
             Dictionary mapping category names to lists of field names
         """
-        categories = {
-            "personal_info": [],  # Name, ID number, date of birth, etc.
-            "contact_info": [],   # Email, phone, address, etc.
-            "banking_info": [],   # Bank details
-            "employment_info": [], # Employer, occupation, income
-            "tax_info": [],       # Tax related fields
-            "signature": [],      # Signature fields
-            "other": []           # Uncategorized fields
-        }
-        
-        # Define common patterns for each category
-        patterns = {
-            "personal_info": [
-                r'(?i)name', r'(?i)first.*name', r'(?i)last.*name', r'(?i)surname', 
-                r'(?i)id.*number', r'(?i)identification', r'(?i)birth.*date', r'(?i)gender',
-                r'(?i)title', r'(?i)mr\.?', r'(?i)mrs\.?', r'(?i)ms\.?', r'(?i)citizenship'
-            ],
-            "contact_info": [
-                r'(?i)email', r'(?i)phone', r'(?i)mobile', r'(?i)tel', r'(?i)address', 
-                r'(?i)street', r'(?i)city', r'(?i)postal', r'(?i)zip', r'(?i)country', 
-                r'(?i)state', r'(?i)province'
-            ],
-            "banking_info": [
-                r'(?i)bank', r'(?i)account.*number', r'(?i)branch.*code', r'(?i)swift', 
-                r'(?i)iban', r'(?i)credit.*card', r'(?i)savings', r'(?i)cheque', r'(?i)checking'
-            ],
-            "employment_info": [
-                r'(?i)employer', r'(?i)company', r'(?i)occupation', r'(?i)job.*title', 
-                r'(?i)income', r'(?i)salary', r'(?i)employment'
-            ],
-            "tax_info": [
-                r'(?i)tax.*number', r'(?i)tax.*id', r'(?i)vat', r'(?i)tin'
-            ],
-            "signature": [
-                r'(?i)sign', r'(?i)signature'
-            ]
-        }
-        
-        # Categorize each field
-        for field_name in fields:
-            normalized_name = self.normalize_field_name(field_name)
-            matched = False
-            
-            for category, pattern_list in patterns.items():
-                if any(re.search(pattern, normalized_name) for pattern in pattern_list):
-                    categories[category].append(field_name)
-                    matched = True
-                    break
-            
-            if not matched:
-                categories["other"].append(field_name)
-        
-        # Remove empty categories
-        categories = {k: v for k, v in categories.items() if v}
-        
-        return categories
+        return field_classifier.categorize_fields(fields)
 
     def normalize_field_name(self, field_name: str) -> str:
         """
@@ -114,20 +106,7 @@ class PDFService:
         Returns:
             Normalized field name
         """
-        # Remove common prefixes used in PDF form fields
-        normalized = field_name
-        
-        # Remove prefixes like @ or topmostSubform[0].Page1[0] common in PDF forms
-        normalized = re.sub(r'^@', '', normalized)
-        normalized = re.sub(r'^topmostSubform\[\d+\]\.Page\d+\[\d+\]\.', '', normalized)
-        
-        # Remove underscores and convert to spaces
-        normalized = normalized.replace('_', ' ')
-        
-        # Make it more human-readable
-        normalized = ' '.join(word.capitalize() for word in normalized.split())
-        
-        return normalized
+        return field_classifier.normalize_field_name(field_name)
 
     def get_field_display_name(self, field_name: str) -> str:
         """
@@ -153,80 +132,22 @@ class PDFService:
         Returns:
             A semantic fingerprint string
         """
-        # Normalize the field name first
-        normalized = self.normalize_field_name(field_name).lower()
-        
-        # Extract core concepts from the field name, removing positional indicators
-        # and common prefixes/suffixes that don't affect the semantic meaning
-        cleaned = re.sub(r'\d+', '', normalized)  # Remove numbers
-        cleaned = re.sub(r'(^|\s)(top|bottom|left|right|first|second|third|last)(\s|$)', ' ', cleaned)  # Remove positional words
-        cleaned = re.sub(r'(^|\s)(field|input|text|box|form|entry)(\s|$)', ' ', cleaned)  # Remove form-related words
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()  # Clean up whitespace
-        
-        # Define semantic field types
-        semantic_types = {
-            'id_number': ['id', 'identification', 'number', 'identity', 'id number', 'id no'],
-            'name': ['name', 'first name', 'last name', 'surname', 'full name'],
-            'email': ['email', 'e-mail', 'email address'],
-            'phone': ['phone', 'telephone', 'mobile', 'cell', 'contact number', 'tel'],
-            'address': ['address', 'street', 'residential', 'physical address'],
-            'city': ['city', 'town', 'municipality'],
-            'postal_code': ['postal code', 'zip', 'zip code', 'post code'],
-            'country': ['country', 'nation', 'state'],
-            'date_of_birth': ['birth', 'dob', 'date of birth', 'birth date', 'born'],
-            'tax_number': ['tax', 'tax no', 'tax number', 'tin', 'taxpayer'],
-            'bank_name': ['bank', 'bank name', 'financial institution'],
-            'account_number': ['account', 'account no', 'account number', 'acc no'],
-            'branch_code': ['branch', 'branch code', 'sort code', 'routing'],
-            'signature': ['sign', 'signature', 'signed'],
-            'date': ['date', 'day', 'month', 'year', 'dated']
-        }
-        
-        # Detect the semantic type of this field
-        detected_type = None
-        highest_confidence = 0
-        
-        for semantic_type, keywords in semantic_types.items():
-            # Calculate how many keywords match
-            matches = sum(1 for keyword in keywords if keyword in cleaned)
-            confidence = matches / len(keywords) if keywords else 0
-            
-            # Also check for direct matches in the original field name
-            if any(re.search(rf'\b{re.escape(keyword)}\b', field_name.lower()) for keyword in keywords):
-                confidence += 0.5  # Boost confidence for direct matches
-            
-            if confidence > highest_confidence:
-                highest_confidence = confidence
-                detected_type = semantic_type
-        
-        # If we couldn't detect a type or confidence is low, use a hash of the cleaned name
-        if detected_type is None or highest_confidence < 0.2:
-            return f"unclassified:{hashlib.md5(cleaned.encode()).hexdigest()[:8]}"
-        
-        # Create fingerprint with the detected type and confidence
-        semantic_fingerprint = f"{detected_type}:{highest_confidence:.2f}"
-        
-        # Add field properties if available
-        if field_properties:
-            if field_properties.get('type'):
-                semantic_fingerprint += f":type={field_properties['type']}"
-            if field_properties.get('format'):
-                semantic_fingerprint += f":format={field_properties['format']}"
-        
-        return semantic_fingerprint
+        return field_classifier.semantic_fingerprint(field_name, field_properties)
 
-    def analyze_pdf_structure(self, pdf_path: str) -> Dict:
+    @timed("analyze_pdf_structure")
+    def analyze_pdf_structure(self, pdf_path: str, reader: Optional[PdfReader] = None) -> Dict:
         """
         Deeply analyze a PDF's structure to find form fields, including in PDFs where standard methods might fail.
         
         Args:
             pdf_path: Path to the PDF file
+            reader: Optional already-open reader for the same file, to avoid parsing it again
             
         Returns:
             Dictionary with analysis results
         """
         try:
-            print(f"Analyzing PDF structure: {pdf_path}")
+            logger.debug("Analyzing PDF structure: %s", pdf_path)
             result = {
                 "form_fields_found": False,
                 "field_count": 0,
@@ -234,12 +155,14 @@ class PDFService:
                 "pages": 0,
                 "has_acroform": False,
                 "pdf_version": None,
+                "method": None,
                 "errors": []
             }
             
             # Try standard PyPDF2 method first
             try:
-                reader = PdfReader(pdf_path)
+                if reader is None:
+                    reader = open_template_reader(pdf_path)
                 result["pages"] = len(reader.pages)
                 result["pdf_version"] = reader.pdf_version
                 
@@ -252,11 +175,12 @@ class PDFService:
                     result["form_fields_found"] = True
                     result["field_count"] = len(fields)
                     result["fields"] = fields
-                    print(f"Found {len(fields)} form fields using standard method")
+                    result["method"] = "standard"
+                    logger.debug("Found %d form fields using standard method", len(fields))
                     return result
             except Exception as e:
                 result["errors"].append(f"Standard method error: {str(e)}")
-                print(f"Standard PDF field detection failed: {e}")
+                logger.warning("Standard PDF field detection failed: %s", e)
             
             # If standard method fails, try alternative approaches
             
@@ -283,43 +207,99 @@ class PDFService:
                                 result["form_fields_found"] = True
                                 result["field_count"] = len(fields)
                                 result["fields"] = fields
-                                print(f"Found {len(fields)} form fields using pdfrw method")
+                                result["method"] = "pdfrw"
+                                logger.debug("Found %d form fields using pdfrw method", len(fields))
                                 return result
             except Exception as e:
                 result["errors"].append(f"pdfrw method error: {str(e)}")
-                print(f"pdfrw PDF field detection failed: {e}")
+                logger.warning("pdfrw PDF field detection failed: %s", e)
             
             # If we've reached here, we couldn't find any fields
-            print("No form fields found in the PDF using any method")
+            logger.info("No form fields found in %s using any method", pdf_path)
             
             return result
         except Exception as e:
-            print(f"Error analyzing PDF structure: {e}")
+            logger.error("Error analyzing PDF structure: %s", e)
             return {
                 "form_fields_found": False,
                 "field_count": 0,
                 "errors": [str(e)]
             }
 
-    def extract_form_fields(self, pdf_path: str) -> Dict:
+    def get_template_analysis(self, pdf_path: str) -> TemplateAnalysis:
         """
-        Extract all form fields from a PDF file.
+        Parse and analyze a PDF template, reusing the cached result when the file is unchanged.
+        
+        The analysis holds the open reader, the extracted fields, their semantic
+        fingerprints, categories and semantic groups, so a request only ever
+        parses a template once.
         
         Args:
             pdf_path: Path to the PDF file
             
         Returns:
-            Dictionary with field names as keys and field info as values
+            The shared TemplateAnalysis for the file; callers must not modify it
         """
+        key = template_cache_key(pdf_path)
+        return self.template_cache.get_or_create(key, lambda: self._build_template_analysis(pdf_path, key))
+
+    def _build_template_analysis(self, pdf_path: str, key) -> TemplateAnalysis:
+        """Run the full field analysis on a template with a single PdfReader."""
+        # Mapped rather than read, so worker processes share the template's bytes
+        reader = open_template_reader(pdf_path)
+        structure = self.analyze_pdf_structure(pdf_path, reader=reader)
+        
+        # Raw PyPDF2 fields, reused by the writer when filling this template
+        acro_fields = structure.get("fields") if structure.get("method") == "standard" else reader.get_fields()
+        
+        form_fields = self._build_form_fields(pdf_path, structure, acro_fields)
+        
+        # Get field categories
+        categories = self.categorize_fields(form_fields)
+        logger.debug("Categorized fields: %s", categories)
+        
+        # Group semantically identical fields
+        semantic_groups = self.group_fields_by_semantics(form_fields)
+        logger.debug("Semantic field groups: %s", semantic_groups)
+        
+        return TemplateAnalysis(
+            key=key,
+            reader=reader,
+            acro_fields=acro_fields,
+            form_fields=form_fields,
+            categories=categories,
+            semantic_groups=semantic_groups,
+            similar_fields=self._find_similar_fields(form_fields),
+            widget_index=self._build_widget_index(reader)
+        )
+
+    def _build_widget_index(self, reader: PdfReader) -> Dict[str, List[WidgetRef]]:
+        """
+        Map field names (/T) to the widget annotations that carry them.
+        
+        PdfWriter.add_page drops the /Parent links of copied annotations, so
+        the writer can only ever match a widget by its own /T; the index
+        mirrors that, letting a fill visit just the widgets of the fields it sets.
+        """
+        widget_index = {}
+        for page_number, page in enumerate(reader.pages):
+            annots = page.get("/Annots")
+            if annots is None:
+                continue
+            for annot_index, annot_ref in enumerate(annots.get_object()):
+                field_name = annot_ref.get_object().get("/T")
+                if field_name is not None:
+                    widget_index.setdefault(str(field_name), []).append((page_number, annot_index))
+        return widget_index
+
+    def _build_form_fields(self, pdf_path: str, analysis: Dict, acro_fields: Optional[Dict]) -> Dict:
+        """Build the field dictionary with display names and semantic fingerprints."""
         try:
-            # First, do a deep analysis of the PDF structure
-            analysis = self.analyze_pdf_structure(pdf_path)
-            reader = PdfReader(pdf_path)
             form_fields = {}
             field_properties = {}
             
             # Process fields found in the analysis or directly
-            fields = analysis.get("fields") or reader.get_fields() or {}
+            fields = analysis.get("fields") or acro_fields or {}
             
             if fields:
                 # First collect all field properties
@@ -350,18 +330,10 @@ class PDFService:
                         "value": "",
                         "semantic_fingerprint": fingerprint
                     }
-                
-                # Get field categories
-                categories = self.categorize_fields(fields)
-                print(f"Categorized fields: {categories}")
-                
-                # Group semantically identical fields
-                semantic_groups = self.group_fields_by_semantics(form_fields)
-                print(f"Semantic field groups: {semantic_groups}")
             
             # If no fields were found but this is likely a form, add some default fields
             if not form_fields:
-                print(f"No form fields found in {pdf_path}. Adding some default fields.")
+                logger.info("No form fields found in %s. Adding some default fields.", pdf_path)
                 # Add some common field names as placeholders
                 common_fields = [
                     "name", "first_name", "last_name", "email", "phone", "address",
@@ -397,9 +369,86 @@ class PDFService:
             
             return form_fields
         except Exception as e:
-            print(f"Error extracting form fields from PDF: {e}")
+            logger.error("Error extracting form fields from PDF: %s", e)
+            # Return empty dict if there's an error
+            return {}
+
+    @timed("extract_form_fields")
+    def extract_form_fields(self, pdf_path: str) -> Dict:
+        """
+        Extract all form fields from a PDF file.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Dictionary with field names as keys and field info as values
+        """
+        try:
+            analysis = self.get_template_analysis(pdf_path)
+        except Exception as e:
+            logger.error("Error extracting form fields from PDF: %s", e)
             # Return empty dict if there's an error
             return {}
+        
+        # Hand out copies so callers cannot modify the cached analysis
+        return {field_name: dict(field_info) for field_name, field_info in analysis.form_fields.items()}
+
+    def build_field_analysis(self, pdf_path: str) -> Dict:
+        """
+        Build the JSON-serializable field analysis that is stored with a template.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Dictionary with fields, categories, semantic groups and the source file it describes
+        """
+        try:
+            stat = os.stat(pdf_path)
+            source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        except OSError:
+            source = None
+        
+        try:
+            analysis = self.get_template_analysis(pdf_path)
+            fields = analysis.form_fields
+            categories = analysis.categories
+            semantic_groups = analysis.similar_fields
+            field_groups = analysis.semantic_groups
+        except Exception as e:
+            logger.error("Error building field analysis for %s: %s", pdf_path, e)
+            fields, categories, semantic_groups, field_groups = {}, {}, {}, {}
+        
+        return {
+            "analyzer_version": FIELD_ANALYZER_VERSION,
+            "source": source,
+            "fields": fields,
+            "categories": categories,
+            "semantic_groups": semantic_groups,
+            "field_groups": field_groups
+        }
+
+    def is_field_analysis_current(self, field_analysis: Optional[Dict], pdf_path: str) -> bool:
+        """
+        Check whether a stored field analysis still describes the template file.
+        
+        Args:
+            field_analysis: Analysis previously returned by build_field_analysis
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            True if the analysis was made by the current analyzer from the file as it is now
+        """
+        if not field_analysis or field_analysis.get("analyzer_version") != FIELD_ANALYZER_VERSION:
+            return False
+        
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return False
+        
+        return field_analysis.get("source") == {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
 
     def group_fields_by_semantics(self, form_fields: Dict) -> Dict[str, List[str]]:
         """
@@ -430,6 +479,7 @@ class PDFService:
         # Only return groups with multiple fields
         return {k: v for k, v in semantic_groups.items() if len(v) > 1}
 
+    @timed("get_similar_fields")
     def get_similar_fields(self, pdf_path: str) -> Dict[str, Dict]:
         """
         Identify groups of semantically similar fields in a PDF and their relationships.
@@ -441,9 +491,16 @@ class PDFService:
             Dictionary with semantic types as keys and field groups with confidence scores
         """
         try:
-            # Extract fields with their semantic fingerprints
-            form_fields = self.extract_form_fields(pdf_path)
-            
+            analysis = self.get_template_analysis(pdf_path)
+        except Exception as e:
+            logger.error("Error identifying similar fields: %s", e)
+            return {}
+        
+        return {semantic_type: dict(field_dict) for semantic_type, field_dict in analysis.similar_fields.items()}
+
+    def _find_similar_fields(self, form_fields: Dict) -> Dict[str, Dict[str, float]]:
+        """Group extracted fields by semantic type, keeping confidence scores."""
+        try:
             # Group fields by semantic type
             semantic_groups = {}
             
@@ -472,10 +529,12 @@ class PDFService:
             }
             
         except Exception as e:
-            print(f"Error identifying similar fields: {e}")
+            logger.error("Error identifying similar fields: %s", e)
             return {}
 
-    def fill_pdf_form(self, template_path: str, output_path: str, field_data: Dict[str, str]) -> str:
+    @timed("fill_pdf_form")
+    def fill_pdf_form(self, template_path: str, output_path: str, field_data: Dict[str, str],
+                      output_mode: str = "rewrite") -> str:
         """
         Fill a PDF form with provided data.
         
@@ -483,76 +542,136 @@ class PDFService:
             template_path: Path to the PDF template
             output_path: Path where to save the filled PDF
             field_data: Dictionary with field names as keys and values to fill
+            output_mode: "rewrite" writes a new PDF, "incremental" appends an
+                incremental update to a copy of the template and "delta" writes
+                only the update, to be served after the template's bytes
             
         Returns:
             Path to the filled PDF
         """
+        if output_mode not in PDF_OUTPUT_MODES:
+            raise ValueError(f"Unknown PDF output mode: {output_mode}")
+        
         try:
-            reader = PdfReader(template_path)
-            writer = PdfWriter()
-            
-            # Copy all pages from the template
-            for page in reader.pages:
-                writer.add_page(page)
+            analysis = self.get_template_analysis(template_path)
             
-            # Create a mapping of field names to their parent page
-            field_page_mapping = {}
-            fields = reader.get_fields()
-            if fields:
-                # Try to determine which fields belong to which pages
-                # This is a simple approach and might not work for all PDFs
-                # For most simple forms, we can just apply all fields to all pages
+            # The cached reader is shared between requests and is not thread-safe,
+            # so the whole fill runs under its lock
+            with analysis.lock:
                 field_dictionary = {}
+                fields = analysis.acro_fields
+                # Checked once, not for every field; the values are client data, so only at DEBUG
+                log_fields = logger.isEnabledFor(logging.DEBUG)
+                if fields:
+                    # Prepare the field dictionary with proper string values
+                    for field_name, field_value in field_data.items():
+                        if field_name in fields:
+                            try:
+                                # Ensure the field value is a string
+                                field_dictionary[field_name] = str(field_value)
+                                if log_fields:
+                                    logger.debug("Adding field %s with value %s", field_name, field_value)
+                            except Exception as e:
+                                logger.warning("Error preparing field %s: %s", field_name, e)
                 
-                # Prepare the field dictionary with proper string values
-                for field_name, field_value in field_data.items():
-                    if field_name in fields:
-                        try:
-                            # Ensure the field value is a string
-                            field_dictionary[field_name] = str(field_value)
-                            print(f"Adding field {field_name} with value {field_value}")
-                        except Exception as e:
-                            print(f"Error preparing field {field_name}: {e}")
-                
-                # Update fields on all pages
-                # This is a simplification but works for many PDFs
-                if field_dictionary:
-                    try:
-                        # Try the simplest approach first - update all fields at once
-                        writer.update_page_form_field_values(writer.pages[0], field_dictionary)
-                        
-                        # If we have multiple pages, also try updating each page
-                        if len(writer.pages) > 1:
-                            for page_num in range(1, len(writer.pages)):
-                                try:
-                                    writer.update_page_form_field_values(writer.pages[page_num], field_dictionary)
-                                except Exception as e:
-                                    print(f"Could not update fields on page {page_num}: {e}")
-                    except Exception as e:
-                        print(f"Error updating form fields: {e}")
-                        # Fallback - try updating each field individually
-                        try:
-                            for field_name, field_value in field_dictionary.items():
-                                try:
-                                    # Try to apply to first page
-                                    writer.update_page_form_field_values(writer.pages[0], {field_name: field_value})
-                                except Exception as field_e:
-                                    print(f"Could not update field {field_name}: {field_e}")
-                        except Exception as fallback_e:
-                            print(f"Fallback field update failed: {fallback_e}")
-            
-            # Save the filled PDF
-            with open(output_path, "wb") as output_file:
-                writer.write(output_file)
+                if output_mode == "rewrite":
+                    self._write_rewritten_pdf(analysis, output_path, field_dictionary)
+                else:
+                    self._write_incremental_pdf(analysis, template_path, output_path, field_dictionary, output_mode)
             
             return output_path
         except Exception as e:
-            print(f"Error filling PDF form: {e}")
-            # If there's an error, just copy the template to the output path
-            shutil.copy(template_path, output_path)
+            logger.error("Error filling PDF form: %s", e)
+            if output_mode == "delta":
+                # An empty delta serves the template unchanged
+                open(output_path, "wb").close()
+            else:
+                # If there's an error, just copy the template to the output path
+                shutil.copy(template_path, output_path)
             return output_path
     
-    def generate_filled_pdf(self, template_path: str, client_data: Dict, field_mappings: Dict[str, str]) -> str:
+    def _write_rewritten_pdf(self, analysis: TemplateAnalysis, output_path: str, field_dictionary: Dict[str, str]) -> None:
+        """Copy the template's pages into a new PDF with the field values set."""
+        writer = PdfWriter()
+        
+        # Copy all pages from the template
+        for page in analysis.reader.pages:
+            writer.add_page(page)
+        
+        # Only the widgets of the fields being set are visited
+        if field_dictionary:
+            try:
+                self._update_indexed_fields(writer, analysis.widget_index, field_dictionary)
+            except Exception as e:
+                logger.warning("Error updating indexed form fields, updating every page: %s", e)
+                for page_num in range(len(writer.pages)):
+                    try:
+                        writer.update_page_form_field_values(writer.pages[page_num], field_dictionary)
+                    except Exception as page_e:
+                        logger.warning("Could not update fields on page %d: %s", page_num, page_e)
+        
+        # Save the filled PDF
+        with span("pdf_write"), open(output_path, "wb") as output_file:
+            writer.write(output_file)
+            increment("pdf_bytes_written_total", output_file.tell())
+    
+    def _write_incremental_pdf(self, analysis: TemplateAnalysis, template_path: str, output_path: str,
+                               field_dictionary: Dict[str, str], output_mode: str) -> None:
+        """Write the field values as an incremental update of the unchanged template."""
+        updates = field_value_updates(analysis.reader, analysis.widget_index, field_dictionary)
+        update = build_incremental_update(analysis.reader, template_path, updates) if updates else b""
+        
+        with span("pdf_write"):
+            if output_mode == "delta":
+                with open(output_path, "wb") as output_file:
+                    output_file.write(update)
+                increment("pdf_bytes_written_total", len(update))
+                return
+            
+            shutil.copyfile(template_path, output_path)
+            with open(output_path, "ab") as output_file:
+                output_file.write(update)
+                increment("pdf_bytes_written_total", output_file.tell())
+    
+    def _update_indexed_fields(self, writer: PdfWriter, widget_index: Dict[str, List[WidgetRef]], field_dictionary: Dict[str, str]) -> None:
+        """Set field values on the indexed widgets, as PdfWriter.update_page_form_field_values would."""
+        writer.set_need_appearances_writer()
+        pages = writer.pages
+        for field_name, field_value in field_dictionary.items():
+            for page_number, annot_index in widget_index.get(field_name, ()):
+                annot = pages[page_number]["/Annots"][annot_index].get_object()
+                if annot.get("/FT") == "/Btn":
+                    annot[NameObject("/AS")] = appearance_state(field_value)
+                annot[NameObject("/V")] = TextStringObject(field_value)
+    
+    def build_fill_plan(self, field_mappings: Dict[str, str], field_analysis: Dict, client_fields) -> FillPlan:
+        """
+        Compile the fill plan for a template from its mappings and stored field analysis.
+        
+        Args:
+            field_mappings: Dictionary mapping PDF field names to client data field names
+            field_analysis: Analysis returned by build_field_analysis
+            client_fields: Names of the client attributes available when filling
+            
+        Returns:
+            The compiled FillPlan
+        """
+        return FillPlan.compile(
+            field_mappings,
+            field_analysis.get("fields", {}),
+            field_analysis.get("semantic_groups", {}),
+            client_fields,
+            analyzer_version=field_analysis.get("analyzer_version")
+        )
+
+    def new_output_path(self, output_mode: str = "rewrite") -> str:
+        """Create a unique path for a generated PDF, or for a delta in delta mode."""
+        extension = "pdfdelta" if output_mode == "delta" else "pdf"
+        filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}.{extension}"
+        return os.path.join(self.output_dir, filename)
+
+    def generate_filled_pdf(self, template_path: str, client_data: Dict, field_mappings: Dict[str, str],
+                            fill_plan: Optional[FillPlan] = None) -> str:
         """
         Generate a filled PDF for a client using the template and field mappings.
         
@@ -560,70 +679,20 @@ class PDFService:
             template_path: Path to the PDF template
             client_data: Dictionary with client data
             field_mappings: Dictionary mapping PDF field names to client data field names
+            fill_plan: Precompiled plan for this template; compiled on the fly when omitted
             
         Returns:
             Path to the generated PDF
         """
-        # Create a unique filename for the output
-        filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}.pdf"
-        output_path = os.path.join(self.output_dir, filename)
-        
-        # Create field data dictionary by mapping client data fields to PDF fields
-        field_data = {}
-        
-        # Get semantically similar fields for intelligent field filling
-        semantic_field_groups = self.get_similar_fields(template_path)
-        print(f"Semantic field groups for intelligent filling: {semantic_field_groups}")
-        
-        # First, process explicitly mapped fields
-        for pdf_field, client_field in field_mappings.items():
-            if client_field in client_data:
-                value = client_data[client_field]
-                # Convert date objects to string if necessary
-                if hasattr(value, 'strftime'):
-                    field_data[pdf_field] = value.strftime('%Y-%m-%d')
-                else:
-                    # Ensure all values are strings
-                    field_data[pdf_field] = str(value)
-                print(f"Mapped field {pdf_field} to {client_field} with value: {field_data[pdf_field]}")
+        output_path = self.new_output_path()
         
-        # Extract form fields to get semantic fingerprints
-        form_fields = self.extract_form_fields(template_path)
+        if fill_plan is None:
+            fill_plan = self.build_fill_plan(field_mappings, self.build_field_analysis(template_path), client_data.keys())
         
-        # Then, apply intelligent field mapping using semantic groups
-        for mapped_pdf_field, client_field in field_mappings.items():
-            if client_field not in client_data:
-                continue
-            
-            # Find the semantic type of this mapped field
-            field_info = form_fields.get(mapped_pdf_field, {})
-            fingerprint = field_info.get('semantic_fingerprint', '')
-            if not fingerprint:
-                continue
-            
-            semantic_type = fingerprint.split(':')[0]
-            
-            # Find all semantically similar fields
-            if semantic_type in semantic_field_groups:
-                similar_fields = semantic_field_groups[semantic_type]
-                
-                # Apply the same client data to all semantically similar fields
-                for similar_field, confidence in similar_fields.items():
-                    # Skip already mapped fields and low confidence matches
-                    if similar_field in field_mappings or confidence < 0.5:
-                        continue
-                    
-                    # Apply the mapping
-                    if client_field in client_data:
-                        value = client_data[client_field]
-                        if hasattr(value, 'strftime'):
-                            field_data[similar_field] = value.strftime('%Y-%m-%d')
-                        else:
-                            field_data[similar_field] = str(value)
-                        print(f"Auto-mapped semantic field {similar_field} ({semantic_type}, confidence {confidence:.2f}) with value: {field_data[similar_field]}")
-        
-        # Print out all mapped fields for debugging
-        print(f"Total fields mapped: {len(field_data)}")
+        # Create field data dictionary by mapping client data fields to PDF fields
+        field_data = fill_plan.field_data(client_data)
+        logger.debug("Total fields mapped: %d", len(field_data))
         
         # Fill the PDF form
-        return self.fill_pdf_form(template_path, output_path, field_data) 
\ No newline at end of file
+        return self.fill_pdf_form(template_path, output_path, field_data)
+
@@ -0,0 +1,260 @@
+import asyncio
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .log_config import get_logger
+
+# Requests sending this token in the X-Profile header are profiled; it also guards the /profiles endpoints
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+# Percentage of all other requests profiled at random, e.g. 0.5
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "0"))
+# Profiles kept on disk; the oldest are deleted beyond PROFILE_MAX_FILES
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./data/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+PROFILING_ENABLED = bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_PERCENT > 0
+PROFILE_HEADER = "X-Profile"
+
+# Profile ids are generated here and are the only names served from PROFILE_DIR
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{13}-[0-9a-f]{8}$")
+
+logger = get_logger("profiling")
+
+# Raw cProfile stats: (file, line, function) -> (calls, primitive calls, own time, total time, callers)
+RawStats = Dict[Tuple[str, int, str], tuple]
+
+
+class RequestProfile:
+    """cProfile data of one request: the event loop's and that of the PDF work it sent elsewhere."""
+
+    def __init__(self, profile_id: str, trigger: str):
+        self.profile_id = profile_id
+        self.trigger = trigger
+        self.template_id: Optional[int] = None
+        self.profiler = cProfile.Profile()
+        self._lock = threading.Lock()
+        self._other_stats: List[RawStats] = []
+
+    def add_stats(self, stats: RawStats) -> None:
+        """Add the stats of work done for this request in a worker thread or process."""
+        with self._lock:
+            self._other_stats.append(stats)
+
+    def combined_stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self.profiler)
+        with self._lock:
+            for other in self._other_stats:
+                stats.add(_CollectedStats(other))
+        return stats
+
+
+class _CollectedStats:
+    """Raw stats in the shape pstats.Stats loads from a profiler."""
+
+    def __init__(self, stats: RawStats):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("documantis_request_profile", default=None)
+# cProfile replaces the event loop thread's profiler, so only one request is profiled there at a time
+_loop_profiler_busy = False
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def annotate(template_id: Optional[int] = None) -> None:
+    """Index the current request's profile by a template id not given in its path."""
+    profile = _current.get()
+    if profile is not None and template_id is not None:
+        profile.template_id = template_id
+
+
+def profile_call(func: Callable, *args) -> Tuple[object, RawStats]:
+    """Run func under its own profiler, e.g. in a worker process, and return (result, raw stats)."""
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func, *args)
+    finally:
+        profiler.create_stats()
+    return result, profiler.stats
+
+
+def profile_in_thread(func: Callable, *args):
+    """
+    Run func in a worker thread under its own profiler when the request that
+    sent it there is being profiled. Call it in the request's copied context.
+    """
+    profile = _current.get()
+    if profile is None:
+        return func(*args)
+    result, stats = profile_call(func, *args)
+    profile.add_stats(stats)
+    return result
+
+
+class ProfileStore:
+    """
+    Bounded directory of request profiles.
+
+    Each profile is a pstats file (<id>.prof) with a JSON sidecar (<id>.json)
+    holding its route, template id and timing, which is what listings read.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_files = max_files
+
+    def path_for(self, profile_id: str) -> Optional[str]:
+        """Return the pstats file of a profile, or None if the id is invalid or the file is gone."""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def save(self, profile: RequestProfile, metadata: Dict) -> None:
+        profile.combined_stats().dump_stats(os.path.join(self.directory, f"{profile.profile_id}.prof"))
+        # The sidecar is written last, so listings never show a profile without its file
+        sidecar = os.path.join(self.directory, f"{profile.profile_id}.json")
+        with open(f"{sidecar}.tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(f"{sidecar}.tmp", sidecar)
+        self.prune()
+
+    def list(self, route: Optional[str] = None, template_id: Optional[int] = None, limit: int = 100) -> List[Dict]:
+        """Return the metadata of stored profiles, newest first."""
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    metadata = json.load(f)
+            except (FileNotFoundError, ValueError):
+                # Pruned or still being written
+                continue
+            if route is not None and metadata["route"] != route:
+                continue
+            if template_id is not None and metadata["template_id"] != template_id:
+                continue
+            profiles.append(metadata)
+            if len(profiles) >= limit:
+                break
+        return profiles
+
+    def prune(self) -> None:
+        # Ids start with the creation time in milliseconds, so names sort oldest first
+        ids = sorted(name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json"))
+        for profile_id in ids[:max(0, len(ids) - self.max_files)]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def new_profile_id() -> str:
+    return f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+
+
+def requested_trigger(headers: Dict[bytes, bytes]) -> Optional[str]:
+    """Return why a request should be profiled ("header" or "sampled"), or None."""
+    token = headers.get(PROFILE_HEADER.lower().encode("latin-1"))
+    if PROFILE_ADMIN_TOKEN and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN.encode("utf-8")):
+        return "header"
+    if PROFILE_SAMPLE_PERCENT > 0 and random.random() * 100 < PROFILE_SAMPLE_PERCENT:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs cProfile around the requests chosen by
+    requested_trigger and stores their profiles in a ProfileStore.
+
+    The event loop's profiler sees every coroutine it runs while enabled, so
+    requests served at the same time can show up in a profile. PDF work sent
+    to the fill engine and blocking calls sent through profile_in_thread are
+    profiled where they run and merged in. Sync (def) endpoints and
+    dependencies run in threads FastAPI starts without this, so their own
+    code is missing from profiles.
+    """
+
+    def __init__(self, app, store: ProfileStore, excluded_prefix: str = "/profiles"):
+        self.app = app
+        self.store = store
+        self.excluded_prefix = excluded_prefix
+
+    async def __call__(self, scope, receive, send):
+        global _loop_profiler_busy
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_prefix):
+            await self.app(scope, receive, send)
+            return
+        trigger = requested_trigger(dict(scope["headers"]))
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        if _loop_profiler_busy:
+            logger.debug("Not profiling %s: another request is being profiled", scope["path"])
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(new_profile_id(), trigger)
+        status = [500]
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        _loop_profiler_busy = True
+        token = _current.set(profile)
+        started = time.perf_counter()
+        profile.profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.profiler.disable()
+            duration = time.perf_counter() - started
+            _current.reset(token)
+            _loop_profiler_busy = False
+
+            path_params = scope.get("path_params") or {}
+            template_id = profile.template_id
+            if template_id is None and "template_id" in path_params:
+                template_id = int(path_params["template_id"])
+            metadata = {
+                "id": profile.profile_id,
+                "created_at": int(profile.profile_id.split("-")[0]) / 1000,
+                "trigger": profile.trigger,
+                "method": scope["method"],
+                # The route's path template, so profiles of one endpoint share a key
+                "route": getattr(scope.get("route"), "path", "unmatched"),
+                "path": scope["path"],
+                "template_id": template_id,
+                "status": status[0],
+                "duration_ms": round(duration * 1000, 1),
+            }
+            try:
+                # Writing the stats file takes a moment; keep it off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, self.store.save, profile, metadata)
+            except OSError as e:
+                logger.warning("Could not store profile %s: %s", profile.profile_id, e)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Dict, Optional
+
+from .metrics import increment
+
+# Rendered PDFs are disposable; the cache can be tuned or cleared at any time
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "./data/render_cache")
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "512"))
+
+
+class RenderCache:
+    """
+    Bounded on-disk LRU cache of PDFs rendered from stored field values.
+
+    Entries are keyed by the template's content hash and the field values,
+    so identical documents share one file. Recency is the file's mtime,
+    which is refreshed on every hit, so processes sharing the directory also
+    share the cache and its eviction order.
+    """
+
+    def __init__(self, directory: str = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MAX_MB * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(template_hash: str, field_values: Dict[str, str], kind: Optional[str] = None) -> str:
+        # kind separates other documents built from a template, such as assembled deltas
+        parts = [template_hash, field_values] if kind is None else [kind, template_hash, field_values]
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file for key, marking it recently used, or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            increment("render_cache_misses_total")
+            return None
+        with self._lock:
+            self.hits += 1
+        increment("render_cache_hits_total")
+        return path
+
+    def new_temp_path(self) -> str:
+        """Return a path to render into before the result is added with put."""
+        return os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+
+    def put(self, key: str, temp_path: str) -> str:
+        """Move a rendered file into the cache and evict the least recently used files over budget."""
+        path = self.path_for(key)
+        os.replace(temp_path, path)
+        self.prune()
+        return path
+
+    def prune(self) -> None:
+        entries = []
+        total_bytes = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        # Oldest first; the file just added is the newest and goes last
+        for _, size, path in sorted(entries)[:-1]:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total_bytes -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
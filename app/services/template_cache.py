@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import increment
+
+# Cache limits can be tuned per deployment
+TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("TEMPLATE_CACHE_MAX_ENTRIES", "32"))
+TEMPLATE_CACHE_MAX_MB = int(os.getenv("TEMPLATE_CACHE_MAX_MB", "256"))
+
+CacheKey = Tuple[str, int, int]
+# (page number, index of the widget annotation in the page's /Annots)
+WidgetRef = Tuple[int, int]
+
+
+def template_cache_key(pdf_path: str) -> CacheKey:
+    """
+    Build the cache key for a template file.
+
+    The key changes whenever the file is replaced or modified on disk, so a
+    stale analysis is never served for a new upload at the same path.
+    """
+    stat = os.stat(pdf_path)
+    return (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+
+
+class TemplateAnalysis:
+    """Everything PDFService derives from a single parse of a template PDF."""
+
+    def __init__(
+        self,
+        key: CacheKey,
+        reader: Any,
+        acro_fields: Optional[Dict],
+        form_fields: Dict[str, Dict],
+        categories: Dict[str, List[str]],
+        semantic_groups: Dict[str, List[str]],
+        similar_fields: Dict[str, Dict[str, float]],
+        widget_index: Optional[Dict[str, List[WidgetRef]]] = None,
+    ):
+        self.key = key
+        self.reader = reader
+        # Raw PyPDF2 field objects, as returned by PdfReader.get_fields()
+        self.acro_fields = acro_fields
+        self.form_fields = form_fields
+        self.categories = categories
+        self.semantic_groups = semantic_groups
+        self.similar_fields = similar_fields
+        # Field name (/T) -> widget annotations that carry its value
+        self.widget_index = widget_index or {}
+        # Approximate memory cost; parsed objects grow with the size of the file
+        self.size = key[2]
+        # PdfReader shares one stream between calls and is not thread-safe
+        self.lock = threading.Lock()
+
+
+class TemplateCache:
+    """Thread-safe LRU cache of parsed templates, bounded by entry count and size."""
+
+    def __init__(self, max_entries: int = TEMPLATE_CACHE_MAX_ENTRIES, max_bytes: int = TEMPLATE_CACHE_MAX_MB * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, TemplateAnalysis]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._build_locks: Dict[CacheKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[TemplateAnalysis]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                increment("template_cache_misses_total")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            increment("template_cache_hits_total")
+            return entry
+
+    def put(self, key: CacheKey, entry: TemplateAnalysis) -> None:
+        with self._lock:
+            # Drop older versions of the same file before inserting the new one
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._remove(old_key)
+            if key in self._entries:
+                self._remove(key)
+            # An entry larger than the whole budget is served but never stored
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def get_or_create(self, key: CacheKey, factory: Callable[[], TemplateAnalysis]) -> TemplateAnalysis:
+        """
+        Return the cached analysis for key, building it with factory on a miss.
+
+        Concurrent requests for the same template wait for a single build
+        instead of all parsing the file at once.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = factory()
+                self.put(key, entry)
+
+        with self._lock:
+            self._build_locks.pop(key, None)
+        return entry
+
+    def invalidate(self, pdf_path: str) -> None:
+        """Remove every cached version of a template file."""
+        path = os.path.abspath(pdf_path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
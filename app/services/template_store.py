@@ -0,0 +1,32 @@
+import mmap
+import os
+
+from PyPDF2 import PdfReader
+
+# Map templates read-only instead of reading them into each process's heap
+TEMPLATE_STORE_MMAP = os.getenv("TEMPLATE_STORE_MMAP", "1").lower() not in ("0", "false", "no")
+
+
+def map_template(pdf_path: str) -> mmap.mmap:
+    """
+    Memory-map a template file read-only.
+
+    The mapping is backed by the page cache, so every process that maps the
+    same file shares one copy of its bytes. It stays valid after the file is
+    removed and is unmapped when the last reference to it goes away.
+    """
+    with open(pdf_path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def open_template_reader(pdf_path: str, use_mmap: bool = TEMPLATE_STORE_MMAP) -> PdfReader:
+    """
+    Open a PdfReader over a template.
+
+    PdfReader only reads the trailer and xref tables up front and parses
+    objects from the stream when they are first used, so with a mapping the
+    raw file bytes are never copied into private memory.
+    """
+    if use_mmap and os.path.getsize(pdf_path) > 0:
+        return PdfReader(map_template(pdf_path))
+    return PdfReader(pdf_path)
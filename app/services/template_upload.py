@@ -0,0 +1,93 @@
+import hashlib
+import os
+import uuid
+from typing import Optional, Tuple
+
+# Size of the reads from an upload; only one chunk is in memory at a time
+TEMPLATE_UPLOAD_CHUNK_SIZE = 1024 * 1024
+TEMPLATE_UPLOAD_MAX_MB = int(os.getenv("TEMPLATE_UPLOAD_MAX_MB", "50"))
+# Readers accept the header and the end-of-file marker anywhere in these windows
+PDF_HEADER_WINDOW = 1024
+PDF_TRAILER_WINDOW = 1024
+
+
+class InvalidPDFError(ValueError):
+    """Raised when uploaded content does not look like a PDF."""
+
+
+class TemplateTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+def template_path_for_hash(upload_dir: str, content_hash: str) -> str:
+    """Return the storage path of the template with the given content hash."""
+    return os.path.join(upload_dir, f"{content_hash}.pdf")
+
+
+class TemplateUpload:
+    """
+    Writes an upload to a temporary file chunk by chunk while hashing it.
+
+    Only the first and last kilobyte are kept in memory, to check the PDF
+    header and trailer, so memory use does not depend on the file size. On
+    commit the file is renamed to its content-addressed path, or dropped if
+    identical content is already stored.
+    """
+
+    def __init__(self, upload_dir: str, max_size: Optional[int] = TEMPLATE_UPLOAD_MAX_MB * 1024 * 1024):
+        self.upload_dir = upload_dir
+        self.max_size = max_size
+        self.size = 0
+        self.temp_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.upload.tmp")
+        self._file = open(self.temp_path, "wb")
+        self._hash = hashlib.sha256()
+        self._head = b""
+        self._tail = b""
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_size and self.size > self.max_size:
+            raise TemplateTooLargeError(f"PDF exceeds the maximum upload size of {self.max_size // (1024 * 1024)} MB")
+
+        if len(self._head) < PDF_HEADER_WINDOW:
+            self._head += chunk[:PDF_HEADER_WINDOW - len(self._head)]
+        self._tail = (self._tail + chunk[-PDF_TRAILER_WINDOW:])[-PDF_TRAILER_WINDOW:]
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def validate(self) -> None:
+        if b"%PDF-" not in self._head:
+            raise InvalidPDFError("File does not start with a PDF header")
+        if b"%%EOF" not in self._tail:
+            raise InvalidPDFError("File does not end with a PDF trailer; it may be truncated")
+
+    def commit(self) -> Tuple[str, str]:
+        """
+        Validate the upload and move it into place.
+
+        Returns:
+            Tuple of (path of the stored file, hex SHA-256 of the content)
+        """
+        self._file.close()
+        self.validate()
+
+        content_hash = self._hash.hexdigest()
+        file_path = template_path_for_hash(self.upload_dir, content_hash)
+        if os.path.exists(file_path):
+            # Identical content is already stored
+            os.remove(self.temp_path)
+        else:
+            os.replace(self.temp_path, file_path)
+        return file_path, content_hash
+
+    def discard(self) -> None:
+        """Remove the temporary file if the upload was not committed."""
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self) -> "TemplateUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.discard()
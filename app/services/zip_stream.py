@@ -0,0 +1,89 @@
+import os
+import zipfile
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+from .log_config import get_logger
+
+# Size of the reads from disk and, roughly, of the chunks sent to the client
+ZIP_STREAM_CHUNK_SIZE = 64 * 1024
+
+logger = get_logger("zip_stream")
+
+
+class _ChunkBuffer:
+    """Write-only file object that collects what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, *args):
+        # Forces ZipFile into streaming mode (sizes go in data descriptors)
+        raise OSError("stream is not seekable")
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        """Yield everything written since the last drain, if anything."""
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks = []
+            yield data
+
+
+def stream_files(paths: Sequence[str], chunk_size: int = ZIP_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the contents of several files one after another, a chunk at a time."""
+    for path in paths:
+        with open(path, "rb") as source:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def stream_zip(entries: Iterable[Tuple[str, Union[str, Sequence[str]]]], chunk_size: int = ZIP_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Build a ZIP archive incrementally from files on disk.
+
+    Only one chunk of one file is held in memory at a time, so the archive
+    can be arbitrarily large. PDFs are already compressed, so entries are
+    stored rather than deflated.
+
+    Args:
+        entries: (name in archive, path on disk) pairs; the path may also be a
+            list of files whose contents are concatenated. Entries with a
+            missing file are skipped
+        chunk_size: Number of bytes read from disk at a time
+
+    Yields:
+        Consecutive pieces of the ZIP archive
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, paths in entries:
+            paths = [paths] if isinstance(paths, str) else list(paths)
+            missing = [path for path in paths if not os.path.exists(path)]
+            if missing:
+                logger.warning("Skipping missing file in ZIP export: %s", missing[0])
+                continue
+
+            zip_info = zipfile.ZipInfo.from_file(paths[-1], arcname)
+            zip_info.compress_type = zipfile.ZIP_STORED
+            with archive.open(zip_info, mode="w", force_zip64=True) as target:
+                for chunk in stream_files(paths, chunk_size):
+                    target.write(chunk)
+                    yield from buffer.drain()
+            # Data descriptor of the finished entry
+            yield from buffer.drain()
+    # Central directory
+    yield from buffer.drain()
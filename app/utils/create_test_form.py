@@ -1,3 +1,5 @@
+import argparse
+import math
 import os
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
@@ -116,5 +118,67 @@ def create_test_form():
     print("IMPORTANT: This is just a visual template. Real PDF forms must be created with Adobe Acrobat or another PDF editor that supports form fields.")
     print("For testing, please use this as a visual guide and create PDF forms with actual form fields.")
     
+# Labels cycled through by create_scaled_test_form, so the classifier sees realistic names
+SCALED_FORM_LABELS = [
+    "First Name", "Last Name", "ID Number", "Date of Birth", "Email Address", "Phone Number",
+    "Street Address", "City", "Postal Code", "Country", "Tax Number", "Bank Name",
+    "Account Number", "Branch Code", "Account Type", "Policy Number", "Beneficiary", "Signature Date",
+]
+
+def create_scaled_test_form(output_path, field_count, page_count):
+    """
+    Create a PDF with real AcroForm text fields, for benchmarking at scale.
+    
+    The fields are spread evenly over the pages in a grid and named after
+    common client details ("First Name 1", "ID Number 2", ...).
+    
+    Args:
+        output_path: Where to write the PDF
+        field_count: Number of text fields
+        page_count: Number of pages
+        
+    Returns:
+        output_path
+    """
+    page_width, page_height = letter
+    margin = 36
+    per_page = -(-field_count // page_count)
+    columns = max(1, math.ceil(math.sqrt(per_page * (page_width - 2 * margin) / (page_height - 2 * margin))))
+    rows = max(1, -(-per_page // columns))
+    cell_width = (page_width - 2 * margin) / columns
+    cell_height = (page_height - 2 * margin) / rows
+    
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    c = canvas.Canvas(output_path, pagesize=letter)
+    field_number = 0
+    for page in range(page_count):
+        c.setFont("Helvetica", 8)
+        c.drawString(margin, page_height - margin / 2, f"Scaled test form: page {page + 1} of {page_count}")
+        for slot in range(min(per_page, field_count - field_number)):
+            row, column = divmod(slot, columns)
+            label = SCALED_FORM_LABELS[field_number % len(SCALED_FORM_LABELS)]
+            c.acroForm.textfield(
+                name=f"{label} {field_number // len(SCALED_FORM_LABELS) + 1}",
+                x=margin + column * cell_width,
+                y=page_height - margin - (row + 1) * cell_height,
+                width=max(cell_width - 2, 1),
+                height=max(cell_height - 2, 1),
+                borderWidth=0,
+                fontSize=0,
+            )
+            field_number += 1
+        c.showPage()
+    c.save()
+    return output_path
+
 if __name__ == "__main__":
-    create_test_form() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create the intelligent mapping test form, or a scaled form with --fields")
+    parser.add_argument("--fields", type=int, help="Create a form with this many real text fields instead")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--output", default="../data/pdf_templates/scaled_form_test.pdf")
+    args = parser.parse_args()
+    if args.fields:
+        create_scaled_test_form(args.output, args.fields, args.pages)
+        print(f"Scaled test form with {args.fields} fields on {args.pages} pages created at {args.output}")
+    else:
+        create_test_form() 
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import sys
+
+# Add the app directory to the path so we can import models and services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Docker path
+    from app.models.database import SessionLocal
+    from app.models import client, pdf_template, tenant
+    from app.services.pdf_service import PDFService
+    from app.services.template_upload import TEMPLATE_UPLOAD_CHUNK_SIZE
+except ImportError:
+    # Local path
+    from models.database import SessionLocal
+    from models import client, pdf_template, tenant
+    from services.pdf_service import PDFService
+    from services.template_upload import TEMPLATE_UPLOAD_CHUNK_SIZE
+
+def dedupe_templates(upload_dir="./data/pdf_templates"):
+    """
+    Move templates stored under upload filenames to content-addressed storage.
+    
+    Each template row is pointed at <sha256>.pdf and its old file is removed
+    once no template refers to it, so byte-identical uploads end up sharing
+    one file.
+    """
+    pdf_service = PDFService(upload_dir=upload_dir)
+    db = SessionLocal()
+    moved = 0
+    removed = 0
+    try:
+        templates = db.query(pdf_template.PDFTemplate).all()
+        old_paths = set()
+        for db_template in templates:
+            if not db_template.file_path or not os.path.exists(db_template.file_path):
+                print(f"Skipping template {db_template.id}: file {db_template.file_path} is missing")
+                continue
+            
+            with open(db_template.file_path, "rb") as f, pdf_service.open_template_upload(max_size=None) as upload:
+                for chunk in iter(lambda: f.read(TEMPLATE_UPLOAD_CHUNK_SIZE), b""):
+                    upload.write(chunk)
+                file_path, content_hash = upload.commit()
+            
+            if db_template.file_path != file_path:
+                old_paths.add(db_template.file_path)
+                db_template.file_path = file_path
+                # The stored analysis describes the old file's size and mtime
+                db_template.field_analysis = None
+                db_template.fill_plan = None
+                moved += 1
+            db_template.content_hash = content_hash
+        db.commit()
+        
+        for old_path in old_paths:
+            still_used = db.query(pdf_template.PDFTemplate).filter(pdf_template.PDFTemplate.file_path == old_path).count()
+            if not still_used:
+                pdf_service.delete_template_file(old_path)
+                removed += 1
+    finally:
+        db.close()
+    
+    print(f"Moved {moved} templates to content-addressed storage and removed {removed} old files")
+
+if __name__ == "__main__":
+    dedupe_templates(sys.argv[1] if len(sys.argv) > 1 else "./data/pdf_templates")
@@ -1,29 +1,47 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { toast } from 'react-toastify'
-import { FiPlus, FiEdit2, FiTrash2, FiEye } from 'react-icons/fi'
+import { FiPlus, FiEdit2, FiTrash2, FiEye, FiSearch } from 'react-icons/fi'
 import { fetchClients, deleteClient } from '../../services/api'
 
+const PAGE_SIZE = 100
+
 const ClientList = () => {
   const [clients, setClients] = useState([])
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [search, setSearch] = useState('')
+  const [total, setTotal] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
 
-  const loadClients = async () => {
+  // Searching and paging happen on the server; afterId continues from the previous page
+  const loadClients = async (afterId = null) => {
     try {
-      setLoading(true)
-      const response = await fetchClients()
-      setClients(response.data)
+      afterId ? setLoadingMore(true) : setLoading(true)
+      const params = { limit: PAGE_SIZE }
+      if (search.trim()) params.search = search.trim()
+      if (afterId) params.after_id = afterId
+      const response = await fetchClients(params)
+      setClients((previous) => (afterId ? [...previous, ...response.data] : response.data))
+      setTotal(response.headers['x-total-count'] ? {
+        count: Number(response.headers['x-total-count']),
+        estimated: response.headers['x-total-count-estimated'] === 'true'
+      } : null)
+      setNextCursor(response.headers['x-next-cursor'] || null)
     } catch (error) {
       console.error('Error loading clients:', error)
       toast.error('Failed to load clients')
     } finally {
       setLoading(false)
+      setLoadingMore(false)
     }
   }
 
   useEffect(() => {
-    loadClients()
-  }, [])
+    // Wait for a pause in typing before searching
+    const timer = setTimeout(() => loadClients(), 300)
+    return () => clearTimeout(timer)
+  }, [search])
 
   const handleDelete = async (id) => {
     if (window.confirm('Are you sure you want to delete this client?')) {
@@ -47,6 +65,24 @@ const ClientList = () => {
         </Link>
       </div>
 
+      <div className="flex items-center justify-between mb-4">
+        <div className="relative w-full max-w-md">
+          <FiSearch className="absolute left-3 top-1/2 -translate-y-1/2 text-gray-400" />
+          <input
+            type="text"
+            className="input pl-10"
+            placeholder="Search by last name, ID number or email"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+          />
+        </div>
+        {total && (
+          <p className="text-sm text-gray-500 ml-4">
+            {total.estimated ? 'About ' : ''}{total.count.toLocaleString()} clients
+          </p>
+        )}
+      </div>
+
       {loading ? (
         <div className="text-center py-10">
           <p className="text-gray-500">Loading clients...</p>
@@ -55,7 +91,9 @@ const ClientList = () => {
         <div className="bg-white shadow overflow-hidden sm:rounded-lg">
           {clients.length === 0 ? (
             <div className="text-center py-10">
-              <p className="text-gray-500">No clients found. Create your first client.</p>
+              <p className="text-gray-500">
+                {search.trim() ? 'No clients match your search.' : 'No clients found. Create your first client.'}
+              </p>
               <Link to="/clients/create" className="btn-primary mt-4">
                 <FiPlus className="mr-2" /> Add Client
               </Link>
@@ -119,6 +157,17 @@ const ClientList = () => {
                   ))}
                 </tbody>
               </table>
+              {nextCursor && (
+                <div className="text-center py-4">
+                  <button
+                    onClick={() => loadClients(nextCursor)}
+                    className="btn-secondary"
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -9,14 +9,15 @@ const api = axios.create({
 });
 
 // Client API calls
-export const fetchClients = () => api.get('/clients/');
+// params: { search, after_id, limit, tenant_id }; the next page's after_id is in the X-Next-Cursor header
+export const fetchClients = (params = {}) => api.get('/clients/', { params });
 export const fetchClient = (id) => api.get(`/clients/${id}`);
 export const createClient = (data) => api.post('/clients/', data);
 export const updateClient = (id, data) => api.put(`/clients/${id}`, data);
 export const deleteClient = (id) => api.delete(`/clients/${id}`);
 
 // PDF Template API calls
-export const fetchTemplates = () => api.get('/pdf-templates/');
+export const fetchTemplates = (params = {}) => api.get('/pdf-templates/', { params });
 export const fetchTemplate = (id) => api.get(`/pdf-templates/${id}`);
 export const fetchTemplateFields = (id) => api.get(`/pdf-templates/${id}/fields`);
 export const updateFieldMappings = (id, mappings) => api.put(`/pdf-templates/${id}/mappings`, { mappings });
@@ -0,0 +1,137 @@
+import os
+import sys
+from typing import Dict, Optional
+
+import pytest
+from PyPDF2 import PdfReader
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+SAMPLE_FORMS_DIR = os.path.join(os.path.dirname(APP_DIR), "data", "sample_forms")
+
+# Tests import the app's modules by their local paths, as when running from app/
+sys.path.insert(0, APP_DIR)
+# Models bind to a SQLite database instead of the PostgreSQL server in DB_HOST
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from models import client, pdf_template, tenant  # noqa: E402,F401 (registers the tables)
+from models.database import ASYNC_DRIVERS, Base  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Engine on a fresh SQLite file with the app's tables."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def postgres_engine():
+    """Engine on the empty PostgreSQL database in TEST_DATABASE_URL with the app's tables; skipped without it."""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def async_url(engine) -> str:
+    """URL of the same database for the app's async driver."""
+    url = engine.url.render_as_string(hide_password=False)
+    scheme, rest = url.split(":", 1)
+    return ASYNC_DRIVERS[scheme] + ":" + rest
+
+
+@pytest.fixture
+def api(sqlite_engine, tmp_path, monkeypatch):
+    """
+    Test client of main.app on the SQLite engine, with its files under tmp_path.
+
+    PDF work runs in-process (a fill engine without workers), and the lifespan,
+    which starts the worker pool and the job queue, is not run.
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # Downloads resolve ./data relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    # main may have imported its modules by their app. paths, so its own classes are used
+    service = main.PDFService(str(tmp_path / "data" / "pdf_templates"), str(tmp_path / "data" / "generated_pdfs"))
+    monkeypatch.setattr(main, "pdf_service", service)
+    monkeypatch.setattr(main, "fill_engine", main.FillEngine(service.upload_dir, service.output_dir, workers=0, pdf_service=service))
+    monkeypatch.setattr(main, "render_cache", main.RenderCache(str(tmp_path / "render_cache")))
+
+    session_factory = sessionmaker(bind=sqlite_engine, autoflush=False, expire_on_commit=False)
+    # Each test client request runs on its own event loop, so async connections aren't pooled
+    async_engine = create_async_engine(async_url(sqlite_engine), poolclass=NullPool)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+
+    main.app.dependency_overrides[main.get_db] = override_get_db
+    main.app.dependency_overrides[main.get_async_db] = override_get_async_db
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def client_payload(number: int, **values) -> Dict:
+    """A valid ClientCreate body; values override the defaults."""
+    payload = {
+        "first_name": f"Client{number}", "last_name": f"Name{number}", "id_number": f"{number:06d}",
+        "date_of_birth": "1980-01-31", "email": f"client{number}@example.com", "phone_number": "0215550100",
+        "address": "1 Main Road", "city": "Cape Town", "postal_code": "8001", "country": "South Africa",
+        "tax_number": "9876543210", "bank_name": "Bank", "account_number": f"{number:08d}",
+        "branch_code": "250655", "account_type": "Cheque",
+    }
+    payload.update(values)
+    return payload
+
+
+def create_client(api, number: int, tenant_id: Optional[int] = None, **values) -> Dict:
+    params = {"tenant_id": tenant_id} if tenant_id is not None else {}
+    response = api.post("/clients/", json=client_payload(number, **values), params=params)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def upload_template(api, path: str, name: str = "Form", tenant_id: Optional[int] = None,
+                    mappings: Optional[Dict[str, str]] = None) -> Dict:
+    """Upload a template through the API and optionally set its field mappings."""
+    data = {"name": name} if tenant_id is None else {"name": name, "tenant_id": str(tenant_id)}
+    with open(path, "rb") as f:
+        response = api.post("/pdf-templates/", data=data, files={"file": (os.path.basename(path), f, "application/pdf")})
+    assert response.status_code == 200, response.text
+    template = response.json()
+    if mappings is not None:
+        response = api.put(f"/pdf-templates/{template['id']}/mappings", json={"mappings": mappings})
+        assert response.status_code == 200, response.text
+        template = response.json()
+    return template
+
+
+def widget_values(path_or_stream) -> Dict[str, str]:
+    """The non-empty /V of every widget, by field name; rewrite output keeps these without an AcroForm."""
+    values = {}
+    for page in PdfReader(path_or_stream).pages:
+        for annot in page.get("/Annots") or []:
+            annot = annot.get_object()
+            if annot.get("/V"):
+                values[annot["/T"]] = annot["/V"]
+    return values
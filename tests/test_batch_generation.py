@@ -0,0 +1,88 @@
+import pytest
+
+import main
+from tests.conftest import create_client, upload_template, widget_values
+from utils.create_test_form import create_scaled_test_form
+
+MAPPINGS = {"First Name 1": "first_name", "Last Name 1": "last_name", "ID Number 1": "id_number"}
+
+
+@pytest.fixture
+def tenants(api):
+    return [api.post("/tenants/", json={"name": name, "slug": name.lower()}).json()["id"] for name in ("North", "South")]
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    return create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=24, page_count=2)
+
+
+def _batch(api, **request):
+    response = api.post("/generate-pdf/batch", json=request)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("output_mode", ["rewrite", "incremental"])
+def test_batch_by_client_ids(api, monkeypatch, tenants, template_path, output_mode):
+    monkeypatch.setattr(main, "PDF_OUTPUT_MODE", output_mode)
+    north, south = tenants
+    template = upload_template(api, template_path, tenant_id=north, mappings=MAPPINGS)
+    clients = [create_client(api, number, tenant_id=north) for number in range(3)]
+    other_tenant = create_client(api, 10, tenant_id=south)
+    client_ids = [clients[2]["id"], clients[0]["id"], 999, clients[2]["id"], other_tenant["id"], clients[1]["id"]]
+
+    batch = _batch(api, template_id=template["id"], client_ids=client_ids)
+
+    # One result per distinct id, in request order
+    assert [result["client_id"] for result in batch["results"]] == [clients[2]["id"], clients[0]["id"], 999, other_tenant["id"], clients[1]["id"]]
+    assert [result["status"] for result in batch["results"]] == ["completed", "completed", "failed", "failed", "completed"]
+    assert (batch["total"], batch["succeeded"], batch["failed"]) == (5, 3, 2)
+    assert batch["results"][2]["error"] == "Client not found"
+    assert batch["results"][3]["error"] == "Client and template belong to different tenants"
+
+    for result in batch["results"]:
+        if result["status"] != "completed":
+            continue
+        db_client = next(db_client for db_client in clients if db_client["id"] == result["client_id"])
+        values = widget_values(result["file_path"])
+        assert {field: values[field] for field in MAPPINGS} == {field: db_client[attr] for field, attr in MAPPINGS.items()}
+        # Same document as the single-client endpoint produces
+        single = api.post("/generate-pdf/", json={"client_id": db_client["id"], "template_id": template["id"]}).json()
+        assert values == widget_values(single["file_path"])
+        assert api.get(f"/generate-pdf/{result['generated_pdf_id']}").status_code == 200
+
+
+def test_batch_by_tenant(api, tenants, template_path):
+    north, south = tenants
+    template = upload_template(api, template_path, mappings=MAPPINGS)
+    north_clients = [create_client(api, number, tenant_id=north) for number in range(4)]
+    create_client(api, 10, tenant_id=south)
+    misses = main.pdf_service.template_cache.stats()["misses"]
+
+    batch = _batch(api, template_id=template["id"], tenant_id=north)
+
+    # The template is parsed at most once for the whole batch
+    assert main.pdf_service.template_cache.stats()["misses"] <= misses + 1
+    assert [result["client_id"] for result in batch["results"]] == sorted(db_client["id"] for db_client in north_clients)
+    assert batch["succeeded"] == 4
+    for result, db_client in zip(batch["results"], north_clients):
+        assert widget_values(result["file_path"])["First Name 1"] == db_client["first_name"]
+
+
+def test_batch_by_tenant_and_client_ids_uses_both(api, tenants, template_path):
+    north, south = tenants
+    template = upload_template(api, template_path, mappings=MAPPINGS)
+    north_client = create_client(api, 1, tenant_id=north)
+    south_client = create_client(api, 2, tenant_id=south)
+
+    batch = _batch(api, template_id=template["id"], tenant_id=north, client_ids=[north_client["id"], south_client["id"]])
+
+    assert [result["status"] for result in batch["results"]] == ["completed", "failed"]
+
+
+def test_batch_needs_clients_or_tenant(api, template_path):
+    template = upload_template(api, template_path)
+
+    assert api.post("/generate-pdf/batch", json={"template_id": template["id"]}).status_code == 400
+    assert api.post("/generate-pdf/batch", json={"template_id": 999, "client_ids": [1]}).status_code == 404
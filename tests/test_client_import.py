@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.orm import Session
+
+from models.client import Client
+from models.tenant import Tenant
+from schemas.client import ClientCreate
+from services.client_import import ClientImporter, iter_csv_records, iter_ndjson_records
+
+COLUMNS = [
+    "first_name", "last_name", "id_number", "date_of_birth", "email", "phone_number", "address", "city",
+    "postal_code", "country", "tax_number", "bank_name", "account_number", "branch_code", "account_type",
+]
+
+
+def _client(number, **values):
+    client = {
+        "first_name": f"Client{number}", "last_name": "Smith", "id_number": f"{number:06d}",
+        "date_of_birth": "1980-01-31", "email": f"client{number}@example.com", "phone_number": "0215550100",
+        "address": "1 Main Road", "city": "Cape Town", "postal_code": "8001", "country": "South Africa",
+        "tax_number": "9876543210", "bank_name": "Bank", "account_number": "12345678",
+        "branch_code": "250655", "account_type": "Cheque",
+    }
+    client.update(values)
+    return client
+
+
+def _csv(clients, line_ending="\n"):
+    lines = [",".join(COLUMNS)]
+    for client in clients:
+        lines.append(",".join('"' + client[column].replace('"', '""') + '"' for column in COLUMNS))
+    return (line_ending.join(lines) + line_ending).encode()
+
+
+def _chunks(data, size):
+    async def chunks():
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+    return chunks()
+
+
+def _records(parse, data, size=7):
+    async def run():
+        return [record async for record in parse(_chunks(data, size))]
+    return asyncio.run(run())
+
+
+def _import(db, data, tenant_id=None, batch_size=3):
+    importer = ClientImporter(db, Client, ClientCreate, tenant_id, batch_size=batch_size)
+    for row_number, record, parse_error in _records(iter_csv_records, data):
+        if importer.add(row_number, record, parse_error):
+            importer.flush()
+    importer.flush()
+    return importer.result()
+
+
+def _seed_tenants(engine):
+    with Session(engine) as db:
+        db.add_all(Tenant(id=tenant_id, name=f"Tenant {tenant_id}", slug=f"tenant-{tenant_id}") for tenant_id in (1, 2))
+        db.commit()
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 1000])
+def test_csv_records_across_chunk_boundaries(size):
+    clients = [_client(1, first_name="Zoë"), _client(2, address="Unit 4\r\n1 Main Road"), _client(3, last_name='O"Neil')]
+
+    records = _records(iter_csv_records, b"\xef\xbb\xbf" + _csv(clients, "\r\n"), size)
+
+    assert records == [(number, client, None) for number, client in enumerate(clients, start=1)]
+
+
+@pytest.mark.parametrize("separator", ["\u2028", "\u2029", "\x85", "\x0b", "\x0c", "\x1c", "\x1e", "\r"])
+def test_only_newlines_end_records(separator):
+    clients = [_client(1, address=f"1 Main Road{separator}Cape Town"), _client(2)]
+
+    assert _records(iter_csv_records, _csv(clients)) == [(1, clients[0], None), (2, clients[1], None)]
+    ndjson = "".join(json.dumps(client, ensure_ascii=False) + "\n" for client in clients).encode()
+    assert _records(iter_ndjson_records, ndjson) == [(1, clients[0], None), (2, clients[1], None)]
+
+
+def test_ndjson_crlf_and_last_line_without_newline():
+    data = b'{"id_number": "1"}\r\n\r\n[1]\r\n{"id_number": "2"}'
+
+    assert _records(iter_ndjson_records, data, 3) == [
+        (1, {"id_number": "1"}, None), (2, None, "Expected a JSON object"), (3, {"id_number": "2"}, None),
+    ]
+
+
+def test_import_over_several_batches(sqlite_engine):
+    _seed_tenants(sqlite_engine)
+    # 000003 repeats within a batch, 000001 in a later one, and 000009 is already imported
+    clients = [_client(number) for number in range(10)] + [_client(3), _client(1), _client(11, email="not an email")]
+    with Session(sqlite_engine) as db:
+        db.add(Client(**ClientCreate(**_client(9, first_name="Existing")).model_dump(), tenant_id=1))
+        db.commit()
+
+        result = _import(db, _csv(clients), tenant_id=1)
+
+    assert (result["total_rows"], result["imported"], result["duplicates"], result["invalid"]) == (13, 9, 3, 1)
+    assert [error["row"] for error in result["errors"]] == [10, 11, 12, 13]
+    with Session(sqlite_engine) as db:
+        imported = {client.id_number: client.first_name for client in db.query(Client).filter(Client.tenant_id == 1)}
+    assert imported == {f"{number:06d}": "Existing" if number == 9 else f"Client{number}" for number in range(10)}
+
+
+def test_copy_import_over_several_pooled_connections(postgres_engine):
+    _seed_tenants(postgres_engine)
+    # Open several connections, so consecutive batches run on different ones
+    connections = [postgres_engine.connect() for _ in range(3)]
+    for connection in connections:
+        connection.close()
+    clients = [_client(number) for number in range(10)] + [_client(3)]
+
+    with Session(postgres_engine) as db:
+        first = _import(db, _csv(clients), tenant_id=1)
+        # Another tenant may reuse the ID numbers
+        second = _import(db, _csv(clients), tenant_id=2)
+        # Untenanted rows skip ID numbers any tenant has
+        untenanted = _import(db, _csv(clients[:5] + [_client(number) for number in range(100, 105)]))
+        again = _import(db, _csv(clients), tenant_id=1)
+
+    assert (first["imported"], first["duplicates"]) == (10, 1)
+    assert (second["imported"], second["duplicates"]) == (10, 1)
+    assert (untenanted["imported"], untenanted["duplicates"]) == (5, 5)
+    assert (again["imported"], again["duplicates"]) == (0, 11)
+    with Session(postgres_engine) as db:
+        assert db.query(Client).count() == 25
+        assert db.query(Client).filter(Client.tenant_id.is_(None)).count() == 5
+
+
+def test_copy_import_replaces_a_stale_staging_table(postgres_engine):
+    _seed_tenants(postgres_engine)
+    clients = [_client(number) for number in range(5)]
+
+    with postgres_engine.connect() as connection:
+        # Left on the connection by an older schema, and kept across commits
+        connection.exec_driver_sql("CREATE TEMP TABLE client_import_staging (row_number integer, id_number text)")
+        connection.commit()
+        with Session(bind=connection) as db:
+            result = _import(db, _csv(clients), tenant_id=1)
+        staging_tables = connection.exec_driver_sql(
+            "SELECT count(*) FROM pg_class WHERE relname = 'client_import_staging' AND relpersistence = 't'"
+        ).scalar()
+
+    assert (result["imported"], result["duplicates"]) == (5, 0)
+    assert staging_tables == 0
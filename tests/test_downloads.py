@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def generated_dir(tmp_path, monkeypatch):
+    # The download routes resolve ./data relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    directory = tmp_path / "data" / "generated_pdfs"
+    directory.mkdir(parents=True)
+    return directory
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_downloads_serve_rendered_pdfs(client, generated_dir):
+    (generated_dir / "filled.pdf").write_bytes(b"%PDF-1.7 filled")
+
+    response = client.get("/downloads/filled.pdf")
+
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.7 filled"
+
+
+@pytest.mark.parametrize("filename", ["filled.pdfdelta", ".hidden.pdf", "notes.txt"])
+def test_downloads_refuse_other_files(client, generated_dir, filename):
+    (generated_dir / filename).write_bytes(b"not a rendered PDF")
+
+    assert client.get(f"/downloads/{filename}").status_code == 404
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import re
+
+import pytest
+from PyPDF2 import PdfReader
+
+from services import field_classifier
+from services.pdf_service import PDFService
+from tests.conftest import SAMPLE_FORMS_DIR
+
+# Names as they appear in real forms: XFA paths, @ prefixes, numbered copies,
+# words that only match part-way ("Title" in "Job Title"), and names matching nothing
+FIELD_NAMES = [
+    "First Name", "first_name", "FirstName", "Last Name", "Surname", "Full Name 2", "Name of Spouse",
+    "ID Number", "id_no", "Identity Number", "Identification Document", "Passport Number",
+    "Date of Birth", "DOB", "birth_date", "Born", "Gender", "Title", "Mr", "Mrs.", "Ms", "Citizenship",
+    "Email", "E-mail Address", "email_address", "Phone", "Telephone (Home)", "Mobile Number", "Cell",
+    "Tel Work", "Contact Number", "Address Line 1", "Street", "Residential Address", "Physical Address",
+    "City", "Town", "Municipality", "Postal Code", "Zip", "ZIP Code", "Post Code", "Country", "Nation",
+    "State", "Province", "Bank Name", "bank", "Financial Institution", "Account Number", "Acc No",
+    "Account Holder", "Branch Code", "Sort Code", "Routing Number", "SWIFT", "IBAN", "Credit Card Number",
+    "Savings", "Cheque", "Checking Account", "Employer", "Company Name", "Occupation", "Job Title",
+    "Monthly Income", "Salary", "Employment Status", "Tax Number", "tax_id", "VAT Number", "TIN",
+    "Taxpayer Reference", "Signature", "Sign Here", "Signed at", "Date", "Day", "Month", "Year", "Dated",
+    "@Initials", "topmostSubform[0].Page1[0].FirstName[0]", "topmostSubform[0].Page2[0].Signature_Date[0]",
+    "Text1", "Text Field 12", "Check Box 3", "Left Box", "Input Top", "Form Entry", "Notes",
+    "Beneficiary 1 Name", "Beneficiary 2 ID Number", "Percentage", "Policy Number", "Premium Amount",
+    "Initials and Surname", "Statement", "Settlement Date", "Contin", "", "   ", "123", "__",
+]
+
+FIELD_PROPERTIES = [None, {"type": "/Tx"}, {"type": "/Btn", "format": "date"}]
+
+
+# The keyword logic PDFService used before the classifier module (user-010), kept as the reference
+
+def _legacy_normalize_field_name(field_name):
+    normalized = field_name
+    normalized = re.sub(r'^@', '', normalized)
+    normalized = re.sub(r'^topmostSubform\[\d+\]\.Page\d+\[\d+\]\.', '', normalized)
+    normalized = normalized.replace('_', ' ')
+    normalized = ' '.join(word.capitalize() for word in normalized.split())
+    return normalized
+
+
+def _legacy_categorize_fields(fields):
+    categories = {
+        "personal_info": [], "contact_info": [], "banking_info": [], "employment_info": [],
+        "tax_info": [], "signature": [], "other": []
+    }
+    patterns = {
+        "personal_info": [
+            r'(?i)name', r'(?i)first.*name', r'(?i)last.*name', r'(?i)surname',
+            r'(?i)id.*number', r'(?i)identification', r'(?i)birth.*date', r'(?i)gender',
+            r'(?i)title', r'(?i)mr\.?', r'(?i)mrs\.?', r'(?i)ms\.?', r'(?i)citizenship'
+        ],
+        "contact_info": [
+            r'(?i)email', r'(?i)phone', r'(?i)mobile', r'(?i)tel', r'(?i)address',
+            r'(?i)street', r'(?i)city', r'(?i)postal', r'(?i)zip', r'(?i)country',
+            r'(?i)state', r'(?i)province'
+        ],
+        "banking_info": [
+            r'(?i)bank', r'(?i)account.*number', r'(?i)branch.*code', r'(?i)swift',
+            r'(?i)iban', r'(?i)credit.*card', r'(?i)savings', r'(?i)cheque', r'(?i)checking'
+        ],
+        "employment_info": [
+            r'(?i)employer', r'(?i)company', r'(?i)occupation', r'(?i)job.*title',
+            r'(?i)income', r'(?i)salary', r'(?i)employment'
+        ],
+        "tax_info": [
+            r'(?i)tax.*number', r'(?i)tax.*id', r'(?i)vat', r'(?i)tin'
+        ],
+        "signature": [
+            r'(?i)sign', r'(?i)signature'
+        ]
+    }
+    for field_name in fields:
+        normalized_name = _legacy_normalize_field_name(field_name)
+        matched = False
+        for category, pattern_list in patterns.items():
+            if any(re.search(pattern, normalized_name) for pattern in pattern_list):
+                categories[category].append(field_name)
+                matched = True
+                break
+        if not matched:
+            categories["other"].append(field_name)
+    return {k: v for k, v in categories.items() if v}
+
+
+def _legacy_semantic_fingerprint(field_name, field_properties=None):
+    normalized = _legacy_normalize_field_name(field_name).lower()
+    cleaned = re.sub(r'\d+', '', normalized)
+    cleaned = re.sub(r'(^|\s)(top|bottom|left|right|first|second|third|last)(\s|$)', ' ', cleaned)
+    cleaned = re.sub(r'(^|\s)(field|input|text|box|form|entry)(\s|$)', ' ', cleaned)
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    semantic_types = {
+        'id_number': ['id', 'identification', 'number', 'identity', 'id number', 'id no'],
+        'name': ['name', 'first name', 'last name', 'surname', 'full name'],
+        'email': ['email', 'e-mail', 'email address'],
+        'phone': ['phone', 'telephone', 'mobile', 'cell', 'contact number', 'tel'],
+        'address': ['address', 'street', 'residential', 'physical address'],
+        'city': ['city', 'town', 'municipality'],
+        'postal_code': ['postal code', 'zip', 'zip code', 'post code'],
+        'country': ['country', 'nation', 'state'],
+        'date_of_birth': ['birth', 'dob', 'date of birth', 'birth date', 'born'],
+        'tax_number': ['tax', 'tax no', 'tax number', 'tin', 'taxpayer'],
+        'bank_name': ['bank', 'bank name', 'financial institution'],
+        'account_number': ['account', 'account no', 'account number', 'acc no'],
+        'branch_code': ['branch', 'branch code', 'sort code', 'routing'],
+        'signature': ['sign', 'signature', 'signed'],
+        'date': ['date', 'day', 'month', 'year', 'dated']
+    }
+    detected_type = None
+    highest_confidence = 0
+    for semantic_type, keywords in semantic_types.items():
+        matches = sum(1 for keyword in keywords if keyword in cleaned)
+        confidence = matches / len(keywords) if keywords else 0
+        if any(re.search(rf'\b{re.escape(keyword)}\b', field_name.lower()) for keyword in keywords):
+            confidence += 0.5
+        if confidence > highest_confidence:
+            highest_confidence = confidence
+            detected_type = semantic_type
+    if detected_type is None or highest_confidence < 0.2:
+        return f"unclassified:{hashlib.md5(cleaned.encode()).hexdigest()[:8]}"
+    semantic_fingerprint = f"{detected_type}:{highest_confidence:.2f}"
+    if field_properties:
+        if field_properties.get('type'):
+            semantic_fingerprint += f":type={field_properties['type']}"
+        if field_properties.get('format'):
+            semantic_fingerprint += f":format={field_properties['format']}"
+    return semantic_fingerprint
+
+
+def _sample_form_field_names():
+    names = []
+    for filename in sorted(os.listdir(SAMPLE_FORMS_DIR)):
+        if filename.endswith(".pdf"):
+            names.extend(PdfReader(os.path.join(SAMPLE_FORMS_DIR, filename), strict=False).get_fields() or {})
+    return names
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return FIELD_NAMES + _sample_form_field_names()
+
+
+def test_categories_match_the_keyword_logic(corpus):
+    assert field_classifier.categorize_fields(corpus) == _legacy_categorize_fields(corpus)
+
+
+def test_normalized_names_match_the_keyword_logic(corpus):
+    for field_name in corpus:
+        assert field_classifier.normalize_field_name(field_name) == _legacy_normalize_field_name(field_name)
+
+
+@pytest.mark.parametrize("field_properties", FIELD_PROPERTIES)
+def test_fingerprints_match_the_keyword_logic(corpus, field_properties):
+    for field_name in corpus:
+        assert field_classifier.semantic_fingerprint(field_name, field_properties) == \
+            _legacy_semantic_fingerprint(field_name, field_properties), field_name
+
+
+def test_semantic_groups_match_the_keyword_logic(corpus):
+    service = PDFService.__new__(PDFService)
+    fields = {field_name: {"semantic_fingerprint": field_classifier.semantic_fingerprint(field_name)} for field_name in corpus}
+    legacy_fields = {field_name: {"semantic_fingerprint": _legacy_semantic_fingerprint(field_name)} for field_name in corpus}
+
+    groups = service.group_fields_by_semantics(fields)
+    assert groups == service.group_fields_by_semantics(legacy_fields)
+    # The corpus exercises most semantic types, not just the catch-all
+    assert len(groups) >= 10
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+
+import pytest
+from PyPDF2 import PdfReader
+
+from services.fill_engine import FillEngine, FillEngineTimeout
+from utils.create_test_form import create_scaled_test_form
+
+
+def _sleep(service, seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _crash_once(service, marker_path):
+    # The first call kills its worker, as the OOM killer would
+    if not os.path.exists(marker_path):
+        open(marker_path, "w").close()
+        os._exit(1)
+    return "recovered"
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    engines = []
+
+    def make(workers=1, task_timeout=30.0):
+        engine = FillEngine(
+            str(tmp_path / "templates"), str(tmp_path / "output"),
+            workers=workers, task_timeout=task_timeout, start_method="fork"
+        )
+        engine.start()
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.shutdown()
+
+
+def test_timeout_starts_when_the_task_runs(make_engine):
+    engine = make_engine(workers=2, task_timeout=1.0)
+
+    async def run():
+        # Three rounds of 0.6s on two workers: the last round is queued for longer than the timeout
+        return await asyncio.gather(*(engine._run(_sleep, 0.6) for _ in range(6)))
+
+    started = time.monotonic()
+    pids = asyncio.run(run())
+    assert len(pids) == 6
+    assert time.monotonic() - started >= 1.8
+
+
+def test_timed_out_task_keeps_its_worker_slot(make_engine):
+    engine = make_engine(workers=1, task_timeout=0.3)
+
+    async def run():
+        long_task = asyncio.ensure_future(engine._run(_sleep, 1.5))
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        with pytest.raises(FillEngineTimeout):
+            await long_task
+        # The worker is still busy with the timed-out task, so this waits for it instead of timing out
+        engine.task_timeout = 5.0
+        await engine._run(_sleep, 0)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 1.0
+
+
+def test_broken_pool_is_replaced_and_the_task_retried(make_engine, tmp_path):
+    engine = make_engine(workers=1)
+    broken = engine._executor
+
+    assert asyncio.run(engine._run(_crash_once, str(tmp_path / "crashed"))) == "recovered"
+    assert engine._executor is not broken
+    assert broken._shutdown_thread
+    assert asyncio.run(engine._run(_sleep, 0)) != os.getpid()
+
+
+def test_fill_batch_fills_every_job(make_engine, tmp_path):
+    engine = make_engine(workers=2)
+    template_path = str(tmp_path / "form.pdf")
+    create_scaled_test_form(template_path, field_count=20, page_count=2)
+    field_name = next(iter(PdfReader(template_path).get_fields()))
+    jobs = [(str(tmp_path / f"filled_{number}.pdf"), {field_name: f"Client {number}"}) for number in range(12)]
+
+    # Incremental output keeps the form's fields, so the filled values can be read back
+    output_paths = asyncio.run(engine.fill_batch(template_path, jobs, output_mode="incremental"))
+
+    assert output_paths == [output_path for output_path, _ in jobs]
+    for number, output_path in enumerate(output_paths):
+        assert PdfReader(output_path).get_fields()[field_name]["/V"] == f"Client {number}"
+
+
+def test_fill_batch_reports_failed_jobs(make_engine, tmp_path):
+    engine = make_engine(workers=1)
+    jobs = [(str(tmp_path / "filled.pdf"), {"field": "value"})]
+
+    assert asyncio.run(engine.fill_batch(str(tmp_path / "missing.pdf"), jobs)) == [None]
@@ -0,0 +1,115 @@
+import datetime
+import os
+
+import pytest
+
+from models.client import Client
+from services.fill_plan import FillPlan
+from services.pdf_service import PDFService
+from tests.conftest import SAMPLE_FORMS_DIR, create_client, upload_template, widget_values
+from utils.create_test_form import create_scaled_test_form
+
+CLIENT_FIELDS = [column.name for column in Client.__table__.columns]
+
+CLIENT_DATA = {
+    **{field: None for field in CLIENT_FIELDS},
+    "id": 7, "first_name": "Zoë", "last_name": "Müller", "id_number": "8001015009087",
+    "date_of_birth": datetime.date(1980, 1, 1), "email": "zoe@example.com", "phone_number": "0215550100",
+    "address": "1 Main Road", "city": "Cape Town", "postal_code": "8001", "country": "South Africa",
+    "tax_number": "9876543210", "bank_name": "Bank", "account_number": "12345678", "branch_code": "250655",
+    "account_type": "Cheque", "is_active": True, "tenant_id": None,
+}
+
+# Client attributes for the semantic types the classifier detects
+SEMANTIC_CLIENT_FIELDS = {
+    "name": "first_name", "id_number": "id_number", "email": "email", "phone": "phone_number", "address": "address",
+    "city": "city", "postal_code": "postal_code", "country": "country", "date_of_birth": "date_of_birth",
+    "tax_number": "tax_number", "bank_name": "bank_name", "account_number": "account_number", "branch_code": "branch_code",
+}
+
+
+# How generate_filled_pdf built the field values before the fill plan (user-003), kept as the reference
+def _legacy_field_data(service, template_path, client_data, field_mappings):
+    analysis = service.get_template_analysis(template_path)
+    form_fields = analysis.form_fields
+    semantic_field_groups = analysis.similar_fields
+
+    def value_of(client_field):
+        value = client_data[client_field]
+        return value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value)
+
+    field_data = {}
+    for pdf_field, client_field in field_mappings.items():
+        if client_field in client_data:
+            field_data[pdf_field] = value_of(client_field)
+    for mapped_pdf_field, client_field in field_mappings.items():
+        if client_field not in client_data:
+            continue
+        fingerprint = form_fields.get(mapped_pdf_field, {}).get('semantic_fingerprint', '')
+        if not fingerprint:
+            continue
+        semantic_type = fingerprint.split(':')[0]
+        for similar_field, confidence in semantic_field_groups.get(semantic_type, {}).items():
+            if similar_field in field_mappings or confidence < 0.5:
+                continue
+            field_data[similar_field] = value_of(client_field)
+    return field_data
+
+
+def _mappings(service, template_path):
+    """Map the first field of each semantic group, plus fields to a missing attribute and a missing field."""
+    analysis = service.get_template_analysis(template_path)
+    mappings = {
+        next(iter(fields)): SEMANTIC_CLIENT_FIELDS[semantic_type]
+        for semantic_type, fields in analysis.similar_fields.items()
+        if semantic_type in SEMANTIC_CLIENT_FIELDS
+    }
+    unmapped = [name for name in analysis.form_fields if name not in mappings]
+    mappings.update(zip(unmapped[-2:], ["no_such_attribute", "occupation"]))
+    mappings["Not In The Form"] = "city"
+    return mappings
+
+
+def _templates(tmp_path):
+    paths = [create_scaled_test_form(str(tmp_path / "scaled.pdf"), field_count=48, page_count=2)]
+    paths += sorted(os.path.join(SAMPLE_FORMS_DIR, name) for name in os.listdir(SAMPLE_FORMS_DIR) if name.endswith(".pdf"))
+    return paths
+
+
+@pytest.fixture
+def service(tmp_path):
+    return PDFService(str(tmp_path / "templates"), str(tmp_path / "output"))
+
+
+def test_plan_gives_the_values_of_the_old_generate_path(service, tmp_path):
+    checked = 0
+    for template_path in _templates(tmp_path):
+        mappings = _mappings(service, template_path)
+        # Stored plans go through JSON, so compare the round-tripped plan
+        plan = FillPlan.from_dict(
+            service.build_fill_plan(mappings, service.build_field_analysis(template_path), CLIENT_FIELDS).to_dict()
+        )
+
+        expected = _legacy_field_data(service, template_path, CLIENT_DATA, mappings)
+        assert plan.field_data(CLIENT_DATA) == expected, template_path
+        assert list(plan.field_data(CLIENT_DATA)) == list(expected), template_path
+        checked += len(expected)
+    # The semantic groups added fields beyond the explicit mappings
+    assert checked > 40
+
+
+def test_generated_pdf_has_the_widget_values_of_the_old_generate_path(api, tmp_path):
+    template_path = create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=48, page_count=2)
+    reference = PDFService(str(tmp_path / "reference_templates"), str(tmp_path / "reference_output"))
+    mappings = _mappings(reference, template_path)
+    template = upload_template(api, template_path, mappings=mappings)
+    db_client = create_client(api, 1, first_name="Zoë", occupation="Advisor")
+
+    response = api.post("/generate-pdf/", json={"client_id": db_client["id"], "template_id": template["id"]})
+
+    assert response.status_code == 200, response.text
+    client_data = {**{field: None for field in CLIENT_FIELDS}, **db_client}
+    expected = _legacy_field_data(reference, template_path, client_data, mappings)
+    legacy_path = reference.fill_pdf_form(template_path, str(tmp_path / "legacy.pdf"), expected)
+    assert widget_values(response.json()["file_path"]) == widget_values(legacy_path)
+    assert widget_values(legacy_path)["First Name 2"] == "Zoë"
@@ -0,0 +1,157 @@
+import os
+import shutil
+
+import pdfrw
+import pytest
+from PyPDF2 import PdfReader
+from reportlab.lib.pdfencrypt import StandardEncryption
+from reportlab.pdfgen import canvas
+
+from services.pdf_service import PDFService
+from tests.conftest import SAMPLE_FORMS_DIR
+from utils.create_test_form import create_scaled_test_form
+
+# Latin-1 fits PDFDocEncoding; the Greek value has to be written as UTF-16
+VALUES = {"First Name 1": "Zoë", "Last Name 1": "Müller-Smith", "Email Address 1": "zoe@example.com", "City 1": "Ωmega"}
+
+
+@pytest.fixture
+def service(tmp_path):
+    return PDFService(str(tmp_path / "templates"), str(tmp_path / "output"))
+
+
+def _fill(service, template_path, output_path, values, output_mode):
+    """Fill a form and return the path of the complete document (template + delta in delta mode)."""
+    service.fill_pdf_form(template_path, output_path, values, output_mode)
+    if output_mode != "delta":
+        return output_path
+    document_path = output_path + ".pdf"
+    with open(document_path, "wb") as document:
+        for path in (template_path, output_path):
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, document)
+    return document_path
+
+
+def _pypdf2_values(path):
+    reader = PdfReader(path)
+    values = {}
+    for page in reader.pages:
+        for annot in page.get("/Annots") or []:
+            annot = annot.get_object()
+            # Reportlab writes empty values for the fields left blank
+            if annot.get("/V"):
+                values[annot["/T"]] = annot["/V"]
+    return values
+
+
+def _pdfrw_values(path):
+    values = {}
+    for page in pdfrw.PdfReader(path).pages:
+        for annot in page.Annots or []:
+            if annot.V is not None and annot.V.decode():
+                values[annot.T.decode()] = annot.V.decode()
+    return values
+
+
+def _encrypted_form(path):
+    """A small form encrypted with RC4 and an empty user password, written with a classic xref table."""
+    c = canvas.Canvas(path, encrypt=StandardEncryption("", ownerPassword="owner", strength=128))
+    for number, name in enumerate(VALUES):
+        c.acroForm.textfield(name=name, x=72, y=700 - number * 40, width=300, height=20)
+    c.showPage()
+    c.save()
+    return path
+
+
+@pytest.mark.parametrize("output_mode", ["rewrite", "incremental", "delta"])
+def test_filled_values_read_back_in_pypdf2_and_pdfrw(service, tmp_path, output_mode):
+    template_path = create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=24, page_count=2)
+
+    document_path = _fill(service, template_path, str(tmp_path / "filled"), VALUES, output_mode)
+
+    assert _pypdf2_values(document_path) == VALUES
+    assert _pdfrw_values(document_path) == VALUES
+
+
+@pytest.mark.parametrize("output_mode", ["incremental", "delta"])
+def test_update_is_appended_to_the_unchanged_template(service, tmp_path, output_mode):
+    template_path = create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=24, page_count=2)
+    with open(template_path, "rb") as f:
+        template_bytes = f.read()
+
+    output_path = str(tmp_path / "filled")
+    document_path = _fill(service, template_path, output_path, VALUES, output_mode)
+
+    with open(document_path, "rb") as f:
+        document_bytes = f.read()
+    assert document_bytes.startswith(template_bytes)
+    assert document_bytes.rstrip().endswith(b"%%EOF")
+    # Only the changed widgets and the AcroForm are written again
+    assert len(document_bytes) - len(template_bytes) < 4096
+    # The filled form is still a form, with every field of the template
+    assert set(PdfReader(document_path).get_fields()) == set(PdfReader(template_path).get_fields())
+
+
+def test_refilling_a_filled_document_stacks_updates(service, tmp_path):
+    template_path = create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=24, page_count=2)
+    first_path = _fill(service, template_path, str(tmp_path / "first.pdf"), VALUES, "incremental")
+
+    second_path = _fill(service, first_path, str(tmp_path / "second.pdf"), {"City 1": "Cape Town"}, "incremental")
+
+    expected = {**VALUES, "City 1": "Cape Town"}
+    assert _pypdf2_values(second_path) == expected
+    assert _pdfrw_values(second_path) == expected
+
+
+@pytest.mark.parametrize("output_mode", ["incremental", "delta"])
+def test_rc4_encrypted_template(service, tmp_path, output_mode):
+    template_path = _encrypted_form(str(tmp_path / "encrypted.pdf"))
+
+    document_path = _fill(service, template_path, str(tmp_path / "filled"), VALUES, output_mode)
+
+    reader = PdfReader(document_path)
+    assert reader.is_encrypted
+    assert _pypdf2_values(document_path) == VALUES
+    # pdfrw can't decrypt, but it follows the appended xref to the new widget revisions
+    widgets = pdfrw.PdfReader(document_path).pages[0].Annots
+    template_widgets = pdfrw.PdfReader(template_path).pages[0].Annots
+    assert sum(widget.V != template_widget.V for widget, template_widget in zip(widgets, template_widgets)) == len(VALUES)
+
+
+def test_aes_encrypted_sample_form(service, tmp_path):
+    # The sample forms use AES-256 and cross-reference streams; pdfrw can't parse them at all
+    template_path = os.path.join(SAMPLE_FORMS_DIR, "Risk Profile Questionnaire.pdf")
+    fields = PdfReader(template_path).get_fields()
+    text_fields = [name for name, field in fields.items() if field.get("/FT") == "/Tx"][:5]
+    values = {name: f"Värde {number}" for number, name in enumerate(text_fields)}
+
+    document_path = _fill(service, template_path, str(tmp_path / "filled"), values, "delta")
+
+    reader = PdfReader(document_path)
+    assert reader.is_encrypted
+    filled = reader.get_fields()
+    assert {name: filled[name].get("/V") for name in values} == values
+    assert set(filled) == set(fields)
+
+
+def _checkbox_form(path):
+    c = canvas.Canvas(path)
+    c.acroForm.textfield(name="Name", x=72, y=700, width=300, height=20)
+    c.acroForm.checkbox(name="Agree", x=72, y=650, buttonStyle="check")
+    c.showPage()
+    c.save()
+    return path
+
+
+@pytest.mark.parametrize("value", ["Yes", "/Yes"])
+def test_checkbox_state_is_the_same_in_every_mode(service, tmp_path, value):
+    template_path = _checkbox_form(str(tmp_path / "checkbox.pdf"))
+
+    states = {}
+    for output_mode in ("rewrite", "incremental", "delta"):
+        document_path = _fill(service, template_path, str(tmp_path / f"filled_{output_mode}"), {"Agree": value}, output_mode)
+        widgets = [annot.get_object() for annot in PdfReader(document_path).pages[0]["/Annots"]]
+        states[output_mode] = [widget["/AS"] for widget in widgets if widget["/T"] == "Agree"]
+
+    assert states == {output_mode: ["/Yes"] for output_mode in ("rewrite", "incremental", "delta")}
@@ -0,0 +1,94 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Registers the tables that jobs refer to
+from models import client, tenant
+from models.database import Base
+from models.pdf_template import PDFGenerationJob
+from services.job_queue import PDFJobQueue
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+
+async def _wait_for_status(session_factory, job_id, status, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        with session_factory() as db:
+            job = db.get(PDFGenerationJob, job_id)
+            if job.status == status:
+                return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not reach {status}")
+
+
+def test_enqueued_jobs_are_completed(session_factory):
+    async def handler(db, job):
+        return job.client_id * 10
+
+    async def run():
+        queue = PDFJobQueue(session_factory, PDFGenerationJob, handler, workers=2, poll_interval=10)
+        queue.start()
+        try:
+            with session_factory() as db:
+                jobs = [await queue.enqueue(db, client_id, 1) for client_id in range(1, 4)]
+            # The enqueue wakes a worker, so this finishes well inside the poll interval
+            return [await _wait_for_status(session_factory, job.id, "completed", timeout=2.0) for job in jobs]
+        finally:
+            await queue.stop()
+
+    assert [job.generated_pdf_id for job in asyncio.run(run())] == [10, 20, 30]
+
+
+def test_failed_job_records_the_error(session_factory):
+    async def handler(db, job):
+        raise ValueError("Client not found")
+
+    async def run():
+        queue = PDFJobQueue(session_factory, PDFGenerationJob, handler, workers=1, poll_interval=0.05)
+        queue.start()
+        try:
+            with session_factory() as db:
+                job = await queue.enqueue(db, 1, 1)
+            return await _wait_for_status(session_factory, job.id, "failed")
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(run())
+    assert job.error == "Client not found"
+    assert job.finished_at is not None
+
+
+def test_jobs_orphaned_while_running_are_requeued(session_factory):
+    async def handler(db, job):
+        return 1
+
+    async def run():
+        queue = PDFJobQueue(
+            session_factory, PDFGenerationJob, handler,
+            workers=1, poll_interval=0.05, stale_seconds=60, requeue_interval=0.2
+        )
+        queue.start()
+        try:
+            await asyncio.sleep(0.1)
+            # A job another process claimed long ago and died with, after this queue started
+            with session_factory() as db:
+                db.add(PDFGenerationJob(
+                    id="orphaned", status="running", client_id=1, template_id=1, attempts=1,
+                    started_at=datetime.datetime.utcnow() - datetime.timedelta(minutes=5)
+                ))
+                db.commit()
+            return await _wait_for_status(session_factory, "orphaned", "completed")
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(run()).attempts == 2
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from models.client import Client
+from models.tenant import Tenant
+from services import pagination
+from services.pagination import count_rows, keyset_page, prefix_filter
+from tests.conftest import async_url
+
+
+def _seed(engine, tenants=2, per_tenant=25):
+    """Add clients whose tenants alternate, so each tenant's ids are spread out as with real inserts."""
+    with Session(engine) as db:
+        db.add_all(Tenant(id=tenant_id, name=f"Tenant {tenant_id}", slug=f"tenant-{tenant_id}") for tenant_id in range(1, tenants + 1))
+        db.add_all(
+            Client(first_name=f"Client{number}", last_name=f"Name{number:03d}", id_number=f"{number:06d}",
+                   email=f"client{number}@example.com", tenant_id=1 + number % tenants)
+            for number in range(tenants * per_tenant)
+        )
+        db.commit()
+
+
+def _run(engine, func):
+    """Run func(async session) against the engine's database through the app's async driver."""
+    async def run():
+        async_engine = create_async_engine(async_url(engine))
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as db:
+                return await func(db)
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(run())
+
+
+async def _all_pages(db, statement, limit):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = await keyset_page(db, statement, Client.id, cursor, limit)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_every_row_once(sqlite_engine):
+    _seed(sqlite_engine)
+
+    pages = _run(sqlite_engine, lambda db: _all_pages(db, select(Client), 7))
+
+    ids = [client_id for page in pages for client_id in page]
+    assert ids == list(range(1, 51))
+    assert [len(page) for page in pages] == [7] * 7 + [1]
+
+
+def test_keyset_pages_of_a_filtered_query(sqlite_engine):
+    _seed(sqlite_engine)
+    statement = select(Client).where(Client.tenant_id == 2)
+
+    pages = _run(sqlite_engine, lambda db: _all_pages(db, statement, 10))
+
+    assert [client_id for page in pages for client_id in page] == list(range(2, 51, 2))
+    # A page that ends exactly on the last row has no next cursor
+    assert [len(page) for page in pages] == [10, 10, 5]
+
+
+def test_keyset_page_after_the_last_row(sqlite_engine):
+    _seed(sqlite_engine)
+
+    rows, cursor = _run(sqlite_engine, lambda db: keyset_page(db, select(Client), Client.id, 50, 10))
+
+    assert rows == [] and cursor is None
+
+
+def test_prefix_filter_escapes_wildcards(sqlite_engine):
+    with Session(sqlite_engine) as db:
+        db.add_all([Client(last_name="100%_Smith"), Client(last_name="100 Smith"), Client(last_name="smithson")])
+        db.commit()
+
+    async def search(db, text):
+        return [row.last_name for row in await db.scalars(select(Client).where(prefix_filter(Client.last_name, text)))]
+
+    assert _run(sqlite_engine, lambda db: search(db, "100%_")) == ["100%_Smith"]
+    assert _run(sqlite_engine, lambda db: search(db, "SMITH")) == ["smithson"]
+
+
+def test_count_rows_is_exact_on_sqlite(sqlite_engine, monkeypatch):
+    _seed(sqlite_engine)
+    monkeypatch.setattr(pagination, "PAGINATION_EXACT_COUNT_LIMIT", 10)
+
+    assert _run(sqlite_engine, lambda db: count_rows(db, select(Client).order_by(Client.id))) == (50, True)
+
+
+def test_count_rows_estimates_large_postgresql_results(postgres_engine, monkeypatch):
+    _seed(postgres_engine, tenants=4, per_tenant=500)
+    with postgres_engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE clients")
+    monkeypatch.setattr(pagination, "PAGINATION_EXACT_COUNT_LIMIT", 100)
+
+    total, exact = _run(postgres_engine, lambda db: count_rows(db, select(Client).where(Client.tenant_id == 2)))
+    assert not exact
+    assert 250 <= total <= 1000
+
+    # Small results are counted
+    statement = select(Client).where(Client.tenant_id == 2, prefix_filter(Client.last_name, "Name0"))
+    assert _run(postgres_engine, lambda db: count_rows(db, statement)) == (25, True)
+
+
+def test_count_rows_counts_when_the_estimate_fails(postgres_engine, monkeypatch):
+    _seed(postgres_engine)
+    monkeypatch.setattr(pagination, "PAGINATION_EXACT_COUNT_LIMIT", 0)
+
+    async def failing_estimate(connection, statement):
+        await connection.exec_driver_sql("EXPLAIN (FORMAT JSON) SELECT * FROM no_such_table")
+
+    monkeypatch.setattr(pagination, "_planner_estimate", failing_estimate)
+
+    async def count_then_page(db):
+        # The failed EXPLAIN must not abort the transaction the request goes on using
+        total = await count_rows(db, select(Client).where(Client.tenant_id == 1))
+        rows, _ = await keyset_page(db, select(Client), Client.id, None, 5)
+        return total, len(rows)
+
+    assert _run(postgres_engine, count_then_page) == ((25, True), 5)
@@ -0,0 +1,193 @@
+import functools
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import main
+from services import pdf_download
+from services.pdf_download import (
+    RangeNotSatisfiable, accel_redirect_uri, content_etag, etag_matches, parse_byte_range, stream_file_range
+)
+
+TEMPLATE_BYTES = bytes(range(256)) * 4
+DELTA_BYTES = b"\n1 0 obj\n<< /V (Client) >>\nendobj\n%%EOF\n"
+DOCUMENT_BYTES = TEMPLATE_BYTES + DELTA_BYTES
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """A template and its delta, served as one document."""
+    template_path = tmp_path / "template.pdf"
+    delta_path = tmp_path / "client.pdfdelta"
+    template_path.write_bytes(TEMPLATE_BYTES)
+    delta_path.write_bytes(DELTA_BYTES)
+    return [str(template_path), str(delta_path)]
+
+
+@pytest.fixture
+def client(sources):
+    app = FastAPI()
+
+    @app.get("/document")
+    async def document(request: Request):
+        return await main.pdf_file_response(request, sources, "document.pdf")
+
+    @app.get("/file")
+    async def single_file(request: Request):
+        return await main.pdf_file_response(request, sources[:1], "template.pdf")
+
+    return TestClient(app)
+
+
+def test_etag_depends_on_content_only(tmp_path, sources):
+    whole = tmp_path / "whole.pdf"
+    whole.write_bytes(DOCUMENT_BYTES)
+
+    assert content_etag(sources) == content_etag([str(whole)])
+    assert content_etag(sources) != content_etag(sources[:1])
+
+
+def test_etag_changes_when_a_file_changes(tmp_path):
+    path = tmp_path / "document.pdf"
+    path.write_bytes(b"first version")
+    first = content_etag([str(path)])
+
+    path.write_bytes(b"second version, longer")
+
+    assert content_etag([str(path)]) != first
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ('"other"', False),
+    ("*", True),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("BYTES = 10 - 20", (10, 20)),
+    ("bytes=50-10", None),
+    ("bytes=0-10,20-30", None),
+    ("items=0-10", None),
+    ("bytes=-", None),
+])
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_unsatisfiable_byte_range(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range(header, 1000)
+
+
+def test_stream_file_range_spans_files(sources):
+    size = len(DOCUMENT_BYTES)
+    for start, end in [(0, size - 1), (0, 0), (1020, 1030), (1024, 1024), (1023, size - 1), (size - 1, size - 1)]:
+        assert b"".join(stream_file_range(sources, start, end, chunk_size=7)) == DOCUMENT_BYTES[start:end + 1]
+
+
+def test_accel_redirect_uri(tmp_path):
+    data_dir = tmp_path / "data"
+    path = data_dir / "generated_pdfs" / "a file.pdf"
+
+    assert accel_redirect_uri(str(path), "/protected-data/", str(data_dir)) == "/protected-data/generated_pdfs/a%20file.pdf"
+    assert accel_redirect_uri(str(tmp_path / "elsewhere.pdf"), "/protected-data/", str(data_dir)) is None
+    assert accel_redirect_uri(str(path), "", str(data_dir)) is None
+
+
+def test_full_download(client, sources):
+    response = client.get("/document")
+
+    assert response.status_code == 200
+    assert response.content == DOCUMENT_BYTES
+    assert response.headers["content-length"] == str(len(DOCUMENT_BYTES))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == content_etag(sources)
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert 'filename="document.pdf"' in response.headers["content-disposition"]
+
+
+@pytest.mark.parametrize("path", ["/document", "/file"])
+def test_matching_if_none_match_is_not_modified(client, path):
+    etag = client.get(path).headers["etag"]
+
+    response = client.get(path, headers={"If-None-Match": f'"stale", W/{etag}'})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_range_across_template_and_delta(client, sources):
+    start, end = len(TEMPLATE_BYTES) - 10, len(TEMPLATE_BYTES) + 9
+
+    response = client.get("/document", headers={"Range": f"bytes={start}-{end}"})
+
+    assert response.status_code == 206
+    assert response.content == DOCUMENT_BYTES[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DOCUMENT_BYTES)}"
+    assert response.headers["content-length"] == "20"
+    assert response.headers["etag"] == content_etag(sources)
+
+
+def test_suffix_range(client):
+    response = client.get("/document", headers={"Range": "bytes=-16"})
+
+    assert response.status_code == 206
+    assert response.content == DOCUMENT_BYTES[-16:]
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/document", headers={"Range": f"bytes={len(DOCUMENT_BYTES)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DOCUMENT_BYTES)}"
+
+
+def test_range_ignored_when_if_range_is_stale(client):
+    etag = client.get("/document").headers["etag"]
+
+    current = client.get("/document", headers={"Range": "bytes=0-9", "If-Range": etag})
+    stale = client.get("/document", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+
+    assert current.status_code == 206
+    assert stale.status_code == 200
+    assert stale.content == DOCUMENT_BYTES
+
+
+def test_range_of_a_single_file(client):
+    response = client.get("/file", headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.content == TEMPLATE_BYTES[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(TEMPLATE_BYTES)}"
+
+
+def test_single_file_is_handed_off_to_nginx(client, sources, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "accel_redirect_uri", functools.partial(
+        pdf_download.accel_redirect_uri, prefix="/protected-data/", data_dir=str(tmp_path)
+    ))
+
+    response = client.get("/file")
+
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == "/protected-data/template.pdf"
+    assert response.headers["etag"] == content_etag(sources[:1])
+    assert 'filename="template.pdf"' in response.headers["content-disposition"]
+    # A template and delta can't be handed off as one file
+    assert "x-accel-redirect" not in client.get("/document").headers
@@ -0,0 +1,67 @@
+import pstats
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+
+# main may have imported its modules by their app. paths, so its own profiling module is patched
+profiling = main.profiling
+
+
+def _blocking_database_work():
+    time.sleep(0.01)
+    return "rows"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "secret")
+    return profiling.ProfileStore(str(tmp_path / "profiles"))
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware, store=store)
+
+    @app.get("/work")
+    async def work():
+        return {"result": await main.run_in_threadpool(_blocking_database_work)}
+
+    return TestClient(app)
+
+
+def _functions(store, profile_id):
+    stats = pstats.Stats(store.path_for(profile_id))
+    return {function for _, _, function in stats.stats}
+
+
+def test_threadpool_work_is_in_the_profile(client, store):
+    response = client.get("/work", headers={"X-Profile": "secret"})
+
+    assert response.json() == {"result": "rows"}
+    assert "_blocking_database_work" in _functions(store, response.headers["x-profile-id"])
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "secreT"}, {"X-Profile": "secret2"}, {"X-Profile": ""}])
+def test_requests_without_the_token_are_not_profiled(client, store, headers):
+    response = client.get("/work", headers=headers)
+
+    assert response.json() == {"result": "rows"}
+    assert "x-profile-id" not in response.headers
+    assert store.list() == []
+
+
+def test_profile_endpoints_need_the_admin_token(monkeypatch):
+    monkeypatch.setattr(main, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(main, "PROFILE_ADMIN_TOKEN", "secret")
+
+    with pytest.raises(main.HTTPException) as error:
+        main.require_profile_admin("secreT")
+    assert error.value.status_code == 403
+    with pytest.raises(main.HTTPException):
+        main.require_profile_admin(None)
+    main.require_profile_admin("secret")
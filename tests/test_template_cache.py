@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+
+import pytest
+
+from services.pdf_service import PDFService
+from services.template_cache import TemplateAnalysis, TemplateCache, template_cache_key
+from utils.create_test_form import create_scaled_test_form
+
+
+def _entry(key):
+    # Only the key matters to the cache; its size is the file size in the key
+    return TemplateAnalysis(key, None, None, {}, {}, {}, {})
+
+
+@pytest.fixture
+def service(tmp_path):
+    return PDFService(str(tmp_path / "templates"), str(tmp_path / "output"))
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    return create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=12, page_count=1)
+
+
+def test_hit_returns_the_same_analysis(service, template_path):
+    first = service.get_template_analysis(template_path)
+
+    assert service.get_template_analysis(os.path.relpath(template_path)) is first
+    assert service.template_cache.stats()["hits"] == 1
+    assert service.template_cache.stats()["misses"] == 1
+
+
+def test_rewritten_file_misses(service, template_path):
+    first = service.get_template_analysis(template_path)
+
+    # Same size, new modification time
+    stat = os.stat(template_path)
+    os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    touched = service.get_template_analysis(template_path)
+    # New content and size at the same path
+    create_scaled_test_form(template_path, field_count=20, page_count=1)
+    rewritten = service.get_template_analysis(template_path)
+
+    assert touched is not first
+    assert rewritten is not touched
+    assert len(rewritten.form_fields) == 20
+    # Older versions of the file are dropped, not kept until evicted
+    assert service.template_cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entry_is_evicted_at_the_entry_limit():
+    cache = TemplateCache(max_entries=2, max_bytes=1000)
+    a, b, c = ("/a.pdf", 1, 10), ("/b.pdf", 1, 10), ("/c.pdf", 1, 10)
+    cache.put(a, _entry(a))
+    cache.put(b, _entry(b))
+    cache.get(a)
+
+    cache.put(c, _entry(c))
+
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_at_the_size_limit():
+    cache = TemplateCache(max_entries=10, max_bytes=100)
+    keys = [(f"/{number}.pdf", 1, 40) for number in range(3)]
+    cache.put(keys[0], _entry(keys[0]))
+    cache.put(keys[1], _entry(keys[1]))
+    cache.get(keys[0])
+
+    cache.put(keys[2], _entry(keys[2]))
+
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+    assert cache.stats()["bytes"] == 80
+    # An entry over the whole budget is never stored
+    huge = ("/huge.pdf", 1, 101)
+    cache.put(huge, _entry(huge))
+    assert cache.get(huge) is None
+    assert cache.stats()["bytes"] == 80
+
+
+def test_concurrent_builds_of_one_key_run_once():
+    cache = TemplateCache()
+    key = ("/form.pdf", 1, 10)
+    builds = []
+
+    def factory():
+        builds.append(threading.get_ident())
+        time.sleep(0.2)
+        return _entry(key)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create(key, factory))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_builds_of_different_keys_run_in_parallel():
+    cache = TemplateCache()
+    keys = [(f"/{number}.pdf", 1, 10) for number in range(4)]
+
+    def build(key):
+        time.sleep(0.3)
+        return _entry(key)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=cache.get_or_create, args=(key, lambda key=key: build(key))) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - started < 0.9
+    assert cache.stats()["entries"] == 4
+
+
+def test_cache_key_follows_the_file(template_path):
+    path, mtime_ns, size = template_cache_key(template_path)
+
+    assert path == os.path.abspath(template_path)
+    assert size == os.path.getsize(template_path)
+    assert mtime_ns == os.stat(template_path).st_mtime_ns
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+import main
+from tests.conftest import create_client, upload_template, widget_values
+from utils.create_test_form import create_scaled_test_form
+
+MAPPINGS = {"First Name 1": "first_name", "ID Number 1": "id_number"}
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    return create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=12, page_count=1)
+
+
+def _stored_templates():
+    return os.listdir(main.pdf_service.upload_dir)
+
+
+def _delete(api, template_id):
+    assert api.delete(f"/pdf-templates/{template_id}").status_code == 204
+
+
+def test_identical_uploads_share_one_file(api, template_path):
+    first = upload_template(api, template_path, name="First")
+    second = upload_template(api, template_path, name="Second")
+
+    assert first["file_path"] == second["file_path"]
+    assert len(_stored_templates()) == 1
+
+
+def test_shared_file_outlives_one_of_its_templates(api, template_path):
+    first = upload_template(api, template_path, name="First")
+    second = upload_template(api, template_path, name="Second", mappings=MAPPINGS)
+    db_client = create_client(api, 1)
+
+    _delete(api, first["id"])
+
+    # The other template still reads and fills from the shared file
+    assert os.path.exists(second["file_path"])
+    assert api.get(f"/pdf-templates/{first['id']}").status_code == 404
+    assert "First Name 1" in api.get(f"/pdf-templates/{second['id']}/fields").json()["fields"]
+    response = api.post("/generate-pdf/", json={"client_id": db_client["id"], "template_id": second["id"]})
+    assert response.status_code == 200, response.text
+    assert widget_values(response.json()["file_path"])["First Name 1"] == db_client["first_name"]
+
+    _delete(api, second["id"])
+
+    assert not os.path.exists(second["file_path"])
+    assert _stored_templates() == []
+
+
+@pytest.mark.parametrize("output_mode", ["delta", "values"])
+def test_shared_file_outlives_its_templates_while_documents_need_it(api, monkeypatch, template_path, output_mode):
+    monkeypatch.setattr(main, "PDF_OUTPUT_MODE", output_mode)
+    template = upload_template(api, template_path, mappings=MAPPINGS)
+    db_client = create_client(api, 1)
+    generated = api.post("/generate-pdf/", json={"client_id": db_client["id"], "template_id": template["id"]}).json()
+    assert generated["storage"] == output_mode
+
+    _delete(api, template["id"])
+
+    # Delta and values documents are rebuilt from the template file on download
+    assert os.path.exists(template["file_path"])
+    response = api.get(f"/generate-pdf/{generated['id']}")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
@@ -0,0 +1,85 @@
+import functools
+import os
+
+import pytest
+
+import main
+from services.template_upload import InvalidPDFError, TemplateTooLargeError, TemplateUpload, template_path_for_hash
+from utils.create_test_form import create_scaled_test_form
+
+MIDDLE = b"1 0 obj\n<< >>\nendobj\n" * 200
+PDF_BYTES = b"%PDF-1.7\n" + MIDDLE + b"%%EOF\n"
+
+
+def _upload(upload_dir, data, chunk_size=100, max_size=None):
+    with TemplateUpload(str(upload_dir), max_size) as upload:
+        for start in range(0, len(data), chunk_size):
+            upload.write(data[start:start + chunk_size])
+        return upload.commit()
+
+
+def test_upload_is_stored_under_its_content_hash(tmp_path):
+    file_path, content_hash = _upload(tmp_path, PDF_BYTES)
+    # Identical content is stored once
+    again = _upload(tmp_path, PDF_BYTES, chunk_size=7)
+
+    assert again == (file_path, content_hash)
+    assert file_path == template_path_for_hash(str(tmp_path), content_hash)
+    with open(file_path, "rb") as f:
+        assert f.read() == PDF_BYTES
+    assert os.listdir(tmp_path) == [os.path.basename(file_path)]
+
+
+@pytest.mark.parametrize("data, message", [
+    (MIDDLE + b"%%EOF\n", "PDF header"),
+    (b"%PDF-1.7\n" + MIDDLE, "PDF trailer"),
+    # The markers count only near the start and the end of the file
+    (b" " * 2048 + b"%PDF-1.7\n" + MIDDLE + b"%%EOF\n", "PDF header"),
+    (b"%PDF-1.7\n%%EOF\n" + MIDDLE, "PDF trailer"),
+])
+def test_upload_without_pdf_header_or_trailer_is_rejected(tmp_path, data, message):
+    with pytest.raises(InvalidPDFError, match=message):
+        _upload(tmp_path, data)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_over_the_size_limit_is_rejected(tmp_path):
+    assert _upload(tmp_path, PDF_BYTES, max_size=len(PDF_BYTES))
+
+    with pytest.raises(TemplateTooLargeError):
+        _upload(tmp_path, b"%PDF-1.7\n" + MIDDLE + b" %%EOF\n", max_size=len(PDF_BYTES))
+
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_template_endpoint_stores_the_upload(api, tmp_path):
+    template_path = create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=6, page_count=1)
+    with open(template_path, "rb") as f:
+        data = f.read()
+
+    response = api.post("/pdf-templates/", data={"name": "Form"}, files={"file": ("form.pdf", data, "application/pdf")})
+
+    assert response.status_code == 200
+    with open(response.json()["file_path"], "rb") as f:
+        assert f.read() == data
+
+
+@pytest.mark.parametrize("data", [MIDDLE + b"%%EOF\n", b"%PDF-1.7\n" + MIDDLE])
+def test_template_endpoint_rejects_content_that_is_not_a_pdf(api, data):
+    response = api.post("/pdf-templates/", data={"name": "Form"}, files={"file": ("form.pdf", data, "application/pdf")})
+
+    assert response.status_code == 400
+    assert os.listdir(main.pdf_service.upload_dir) == []
+
+
+def test_template_endpoint_rejects_uploads_over_the_limit(api, monkeypatch):
+    # The handler reads in chunks, so the limit is hit before the whole upload is on disk
+    monkeypatch.setattr(main, "TEMPLATE_UPLOAD_CHUNK_SIZE", 1024)
+    monkeypatch.setattr(main.pdf_service, "open_template_upload", functools.partial(main.pdf_service.open_template_upload, max_size=4096))
+
+    response = api.post("/pdf-templates/", data={"name": "Form"}, files={"file": ("form.pdf", PDF_BYTES, "application/pdf")})
+
+    assert response.status_code == 413
+    assert "maximum upload size" in response.json()["detail"]
+    assert os.listdir(main.pdf_service.upload_dir) == []
@@ -0,0 +1,100 @@
+import io
+import os
+
+import pytest
+from sqlalchemy.orm import Session
+
+import main
+from tests.conftest import create_client, upload_template, widget_values
+from utils.create_test_form import create_scaled_test_form
+
+MAPPINGS = {"First Name 1": "first_name", "Last Name 1": "last_name", "ID Number 1": "id_number", "Email Address 1": "email"}
+
+
+@pytest.fixture
+def template(api, tmp_path):
+    path = create_scaled_test_form(str(tmp_path / "form.pdf"), field_count=24, page_count=2)
+    return upload_template(api, path, mappings=MAPPINGS)
+
+
+def _generate(api, monkeypatch, output_mode, client_id, template_id):
+    monkeypatch.setattr(main, "PDF_OUTPUT_MODE", output_mode)
+    response = api.post("/generate-pdf/", json={"client_id": client_id, "template_id": template_id})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _download(api, generated_pdf_id, **headers):
+    response = api.get(f"/generate-pdf/{generated_pdf_id}", headers=headers)
+    assert response.status_code in (200, 304), response.text
+    return response
+
+
+def test_values_rendering_matches_the_stored_pdf(api, monkeypatch, sqlite_engine, template):
+    db_client = create_client(api, 1)
+    stored = _generate(api, monkeypatch, "incremental", db_client["id"], template["id"])
+    values_only = _generate(api, monkeypatch, "values", db_client["id"], template["id"])
+
+    assert values_only["storage"] == "values"
+    assert values_only["file_path"] is None
+    with Session(sqlite_engine) as db:
+        field_values = db.get(main.pdf_template.GeneratedPDF, values_only["id"]).field_values
+
+    rendered = _download(api, values_only["id"]).content
+    # The same document the incremental mode writes for the client, from the stored values alone
+    assert rendered.startswith(b"%PDF")
+    assert widget_values(io.BytesIO(rendered)) == widget_values(stored["file_path"]) == field_values
+    assert {field: field_values[field] for field in MAPPINGS} == {field: db_client[attr] for field, attr in MAPPINGS.items()}
+
+
+def test_values_rendering_is_cached_and_does_not_follow_the_client(api, monkeypatch, template):
+    db_client = create_client(api, 1)
+    values_only = _generate(api, monkeypatch, "values", db_client["id"], template["id"])
+
+    first = _download(api, values_only["id"])
+    response = api.put(f"/clients/{db_client['id']}", json={"first_name": "Renamed"})
+    assert response.status_code == 200, response.text
+    second = _download(api, values_only["id"])
+
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert widget_values(io.BytesIO(second.content))["First Name 1"] == db_client["first_name"]
+    assert main.render_cache.stats()["misses"] == 1
+    assert main.render_cache.stats()["hits"] == 1
+    assert _download(api, values_only["id"], **{"If-None-Match": first.headers["etag"]}).status_code == 304
+
+
+def test_values_rendering_after_the_cache_is_cleared(api, monkeypatch, template):
+    db_client = create_client(api, 1)
+    values_only = _generate(api, monkeypatch, "values", db_client["id"], template["id"])
+    first = _download(api, values_only["id"])
+
+    for name in os.listdir(main.render_cache.directory):
+        os.remove(os.path.join(main.render_cache.directory, name))
+
+    rendered_again = _download(api, values_only["id"])
+    assert widget_values(io.BytesIO(rendered_again.content)) == widget_values(io.BytesIO(first.content))
+
+
+def test_batch_in_values_mode(api, monkeypatch, template):
+    monkeypatch.setattr(main, "PDF_OUTPUT_MODE", "values")
+    clients = [create_client(api, number) for number in range(3)]
+
+    response = api.post("/generate-pdf/batch", json={"template_id": template["id"], "client_ids": [c["id"] for c in clients]})
+
+    assert response.status_code == 200, response.text
+    for result, db_client in zip(response.json()["results"], clients):
+        assert result["status"] == "completed"
+        rendered = _download(api, result["generated_pdf_id"]).content
+        assert widget_values(io.BytesIO(rendered))["ID Number 1"] == db_client["id_number"]
+
+
+def test_values_rendering_needs_the_template_file(api, monkeypatch, template):
+    db_client = create_client(api, 1)
+    values_only = _generate(api, monkeypatch, "values", db_client["id"], template["id"])
+
+    os.remove(template["file_path"])
+
+    response = api.get(f"/generate-pdf/{values_only['id']}")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "PDF template file not found"
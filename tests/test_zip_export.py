@@ -0,0 +1,106 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+import main
+from services.zip_stream import stream_zip
+from tests.conftest import create_client, upload_template, widget_values
+from utils.create_test_form import create_scaled_test_form
+
+MAPPINGS = {"First Name 1": "first_name", "ID Number 1": "id_number"}
+
+
+def test_stream_zip_entries(tmp_path):
+    first, template, delta = (tmp_path / "first.pdf", tmp_path / "template.pdf", tmp_path / "client.pdfdelta")
+    first.write_bytes(b"%PDF first " * 1000)
+    template.write_bytes(b"%PDF template " * 500)
+    delta.write_bytes(b"\n1 0 obj << >> endobj\n%%EOF\n")
+
+    pieces = list(stream_zip([
+        ("1_first.pdf", str(first)),
+        ("2_missing.pdf", str(tmp_path / "missing.pdf")),
+        ("3_client.pdf", [str(template), str(delta)]),
+    ], chunk_size=1024))
+
+    # The archive is produced piece by piece, not built in memory first
+    assert len(pieces) > 10
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(pieces)))
+    assert archive.testzip() is None
+    assert archive.namelist() == ["1_first.pdf", "3_client.pdf"]
+    assert archive.read("1_first.pdf") == first.read_bytes()
+    assert archive.read("3_client.pdf") == template.read_bytes() + delta.read_bytes()
+    assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_STORED}
+
+
+@pytest.fixture
+def generated(api, monkeypatch, tmp_path):
+    """Two templates, two clients and a generated PDF of each pair, stored in a different output mode each."""
+    templates = [
+        upload_template(api, create_scaled_test_form(str(tmp_path / f"form{number}.pdf"), field_count=12 + number, page_count=1),
+                        name=f"Form {number}", mappings=MAPPINGS)
+        for number in range(2)
+    ]
+    clients = [create_client(api, number) for number in range(2)]
+    rows = []
+    for number, (db_template, db_client) in enumerate((t, c) for t in templates for c in clients):
+        monkeypatch.setattr(main, "PDF_OUTPUT_MODE", ["rewrite", "incremental", "delta", "values"][number])
+        response = api.post("/generate-pdf/", json={"client_id": db_client["id"], "template_id": db_template["id"]})
+        assert response.status_code == 200, response.text
+        rows.append(response.json())
+    return templates, clients, rows
+
+
+def _export(api, **selection):
+    response = api.post("/generate-pdf/export", json=selection)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["content-disposition"].startswith('attachment; filename="generated_pdfs_')
+    return zipfile.ZipFile(io.BytesIO(response.content))
+
+
+def test_export_by_ids_has_each_document(api, generated):
+    _, clients, rows = generated
+
+    archive = _export(api, ids=[row["id"] for row in rows])
+
+    assert [name.split("_")[0] for name in archive.namelist()] == [str(row["id"]) for row in rows]
+    assert [row["storage"] for row in rows] == ["file", "file", "delta", "values"]
+    for name, row in zip(archive.namelist(), rows):
+        content = archive.read(name)
+        # The same bytes as a single download, whatever the storage
+        assert content == api.get(f"/generate-pdf/{row['id']}").content
+        assert content.startswith(b"%PDF")
+        client_name = next(db_client["first_name"] for db_client in clients if db_client["id"] == row["client_id"])
+        assert widget_values(io.BytesIO(content))["First Name 1"] == client_name
+    assert archive.namelist()[3] == f"{rows[3]['id']}_generated_{rows[3]['id']}.pdf"
+
+
+def test_export_by_filters(api, generated):
+    templates, clients, rows = generated
+
+    by_template = _export(api, template_id=templates[1]["id"])
+    by_client = _export(api, client_id=clients[0]["id"])
+    by_both = _export(api, template_id=templates[0]["id"], client_id=clients[1]["id"])
+
+    def ids(archive):
+        return [int(name.split("_")[0]) for name in archive.namelist()]
+
+    assert ids(by_template) == [row["id"] for row in rows if row["template_id"] == templates[1]["id"]]
+    assert ids(by_client) == [row["id"] for row in rows if row["client_id"] == clients[0]["id"]]
+    assert ids(by_both) == [rows[1]["id"]]
+
+
+def test_export_skips_documents_whose_file_is_gone(api, generated):
+    _, _, rows = generated
+    os.remove(rows[0]["file_path"])
+
+    archive = _export(api, ids=[rows[0]["id"], rows[1]["id"]])
+
+    assert [int(name.split("_")[0]) for name in archive.namelist()] == [rows[1]["id"]]
+
+
+def test_export_needs_a_selection_that_matches(api, generated):
+    assert api.post("/generate-pdf/export", json={}).status_code == 400
+    assert api.post("/generate-pdf/export", json={"ids": [999]}).status_code == 404